@@ -20,9 +20,25 @@ class PraksisNhnNautobotConfig(NautobotAppConfig):
     required_settings = []
     min_version = "2.0.0"
     max_version = "2.9999"
-    default_settings = {}
+    default_settings = {
+        # Named regions for the region filter: {name: GeoJSON Polygon, MultiPolygon, Feature or FeatureCollection}
+        "regions": {},
+        # Days that saved and deleted Samband are remembered for the sync API
+        "change_retention_days": 30,
+        # Redis URL for the live change events; unset uses the Redis of the Nautobot cache or Celery broker
+        "event_redis_url": None,
+        # Live event streams each worker process serves at once, each holding a worker thread; 0 makes the pages poll
+        "event_max_streams": 0,
+    }
     caching_config = {}
+    middleware = ["praksis_nhn_nautobot.middleware.ServerTimingMiddleware"]
     docs_view_name = "plugins:praksis_nhn_nautobot:docs"
 
+    def ready(self):
+        """Connect the signal handlers once the app registry is ready."""
+        super().ready()
+
+        from praksis_nhn_nautobot import signals  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+
 
 config = PraksisNhnNautobotConfig  # pylint:disable=invalid-name
@@ -4,7 +4,19 @@ from nautobot.apps.api import OrderedDefaultRouter
 from django.urls import path
 
 from praksis_nhn_nautobot.api import views
-from praksis_nhn_nautobot.api.views import SambandMapDataAPIView, SambandSearchSuggestionsView
+from praksis_nhn_nautobot.api.views import (
+    SambandChoicesAPIView,
+    SambandDetailsAPIView,
+    SambandEventStreamView,
+    SambandFacetsAPIView,
+    SambandGeoJSONExportView,
+    SambandHeatmapAPIView,
+    SambandMapDataAPIView,
+    SambandMapTileAPIView,
+    SambandNearestAPIView,
+    SambandSearchSuggestionsView,
+    SambandSyncAPIView,
+)
 
 router = OrderedDefaultRouter()
 # Register router viewsets
@@ -16,6 +28,15 @@ app_name = "praksis_nhn_nautobot_api"  # Use underscore instead of hyphen
 urlpatterns = [
     path('samband/search-suggestions/', SambandSearchSuggestionsView.as_view(), name='samband_search_suggestions'),
     path('samband/map-data/', SambandMapDataAPIView.as_view(), name='samband_map_data'),
+    path('samband/choices/', SambandChoicesAPIView.as_view(), name='samband_choices'),
+    path('samband/details/', SambandDetailsAPIView.as_view(), name='samband_details'),
+    path('samband/events/', SambandEventStreamView.as_view(), name='samband_events'),
+    path('samband/facets/', SambandFacetsAPIView.as_view(), name='samband_facets'),
+    path('samband/sync/', SambandSyncAPIView.as_view(), name='samband_sync'),
+    path('samband/nearest/', SambandNearestAPIView.as_view(), name='samband_nearest'),
+    path('samband/heatmap/', SambandHeatmapAPIView.as_view(), name='samband_heatmap'),
+    path('samband/geojson/', SambandGeoJSONExportView.as_view(), name='samband_geojson'),
+    path('samband/map-tiles/<int:z>/<int:x>/<int:y>/', SambandMapTileAPIView.as_view(), name='samband_map_tile'),
 ]
 
 # Extend with router URLs - don't override
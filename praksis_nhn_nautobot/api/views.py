@@ -1,17 +1,58 @@
 """API views for praksis_nhn_nautobot."""
 
-from math import radians, cos, sin, asin, sqrt
+import logging
+import uuid
 
-from django.db.models import Q
-from django.http import JsonResponse
+import numpy as np
+from django.db.models import Max, Min, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.views import View
 
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from nautobot.apps.api import NautobotModelViewSet
 
 from praksis_nhn_nautobot import filters, models
 from praksis_nhn_nautobot.api import serializers
 from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.cache_service import (
+    conditional_on_dataset,
+    get_dataset_version,
+    get_or_build,
+    versioned_cache_key,
+)
+from praksis_nhn_nautobot.services.event_service import open_stream
+from praksis_nhn_nautobot.services.export_service import iter_geojson, parse_geojson_properties
+from praksis_nhn_nautobot.services.facet_service import FACET_FIELDS, compute_facets
+from praksis_nhn_nautobot.services.geo_service import (
+    bounding_box,
+    clamp_zoom,
+    cluster_cell_size,
+    cluster_points,
+    grid_density,
+    parse_bbox,
+)
+from praksis_nhn_nautobot.services.region_service import (
+    filter_by_polygons,
+    filter_by_regions,
+    get_samband_regions,
+    parse_polygon,
+)
+from praksis_nhn_nautobot.services.spatial_index import (
+    endpoints_in_bbox_q,
+    get_spatial_index,
+    lines_in_bbox_q,
+    nearest_sambands,
+    restrict_to_matches,
+)
+from praksis_nhn_nautobot.services.sync_service import current_sync_token, get_changes, parse_sync_token
+from praksis_nhn_nautobot.services.tile_service import build_tile, is_valid_tile
+from praksis_nhn_nautobot.services.timing_service import timed
+
+logger = logging.getLogger(__name__)
+
 
 class SambandViewSet(NautobotModelViewSet):  # pylint: disable=too-many-ancestors
     """Samband viewset."""
@@ -21,262 +62,942 @@ class SambandViewSet(NautobotModelViewSet):  # pylint: disable=too-many-ancestor
     filterset_class = filters.SambandFilterSet
 
 
-def parse_geo_coordinates(geo_string):
-    """Parse geographic coordinates in various formats."""
-    if not geo_string:
-        return None, None
-        
-    try:
-        # Handle format: "60.3927° N, 5.3245° E"
-        if '°' in geo_string:
-            # Split into lat and lng parts
-            parts = geo_string.split(',')
-            if len(parts) < 2:
-                return None, None
-                
-            # Parse latitude
-            lat_part = parts[0].strip()
-            lat_value = float(lat_part.split('°')[0].strip())
-            if 'S' in lat_part:
-                lat_value = -lat_value  # Southern hemisphere is negative
-                
-            # Parse longitude
-            lng_part = parts[1].strip()
-            lng_value = float(lng_part.split('°')[0].strip())
-            if 'W' in lng_part:
-                lng_value = -lng_value  # Western hemisphere is negative
-                
-            return lat_value, lng_value
-            
-        # Handle simple "lat, lng" format
-        else:
-            parts = geo_string.split(',')
-            if len(parts) >= 2:
-                return float(parts[0].strip()), float(parts[1].strip())
-                
-    except (ValueError, IndexError) as e:
-        print(f"Error parsing geo_string '{geo_string}': {e}")
-        
-    return None, None
+# Zoom levels up to and including this one get point clusters instead of connections
+CLUSTER_MAX_ZOOM = 10
 
+# Columnar map-data sends coordinates as integers of degrees * this, about 1 m precision
+COORDINATE_SCALE = 100000
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate the distance between two points using Haversine formula."""
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371
-    return c * r
+# Multi-value map filters: query parameter and the lookup it filters on
+MAP_FILTERS = (
+    ('vendor', 'vendor__in'),
+    ('status', 'status__in'),
+    ('location', 'location__in'),
+    ('location_type', 'location_type__in'),
+    ('transporttype', 'transporttype__in'),
+    ('type', 'type__in'),
+)
+
+# Every query parameter that changes which connections match the map filters
+MAP_FILTER_PARAMS = tuple(param for param, _ in MAP_FILTERS) + ('lat', 'lng', 'radius', 'polygon', 'region')
+
+# Output fields of a map-data connection: key -> (columns it is built from, function building it from a row)
+MAP_FIELDS = {
+    'id': (('pk',), lambda row: str(row['pk'])),
+    'name': (('name',), lambda row: row['name']),
+    'point_a': (
+        ('name', 'pop_a_latitude', 'pop_a_longitude', 'pop_a_category'),
+        lambda row: {
+            'name': row['name'],
+            'location': [row['pop_a_latitude'], row['pop_a_longitude']],
+            'category': row['pop_a_category'],
+        },
+    ),
+    'point_b': (
+        ('name', 'pop_b_latitude', 'pop_b_longitude', 'pop_b_category'),
+        lambda row: {
+            'name': row['name'],
+            'location': [row['pop_b_latitude'], row['pop_b_longitude']],
+            'category': row['pop_b_category'],
+        },
+    ),
+    'status': (('status',), lambda row: row['status']),
+    'location_type': (('location_type',), lambda row: row['location_type']),
+    'length_km': (('length_km',), lambda row: row['length_km']),
+}
+
+# Optional map-data fields: include_fields option -> (output key, column), only sent when not empty
+MAP_INCLUDE_FIELDS = {
+    'vendor': ('vendor', 'vendor'),
+    'bandwidth': ('bandwidth', 'bandwidth_string'),
+    'reference': ('reference', 'sambandsnummer'),
+    'type': ('type', 'type'),
+    'location': ('location', 'location'),
+    'transporttype': ('transporttype', 'transporttype'),
+}
+
+
+def connection_columns(include_fields):
+    """
+    Get the columns to read for map connections with the given optional fields.
+
+    Args:
+        include_fields (list): include_fields options, see MAP_INCLUDE_FIELDS
+
+    Returns:
+        set: Column names for QuerySet.values()
+    """
+    columns = {column for field_columns, _ in MAP_FIELDS.values() for column in field_columns}
+    columns.update(MAP_INCLUDE_FIELDS[field][1] for field in include_fields)
+    return columns
+
+
+def build_connection(row, include_fields):
+    """
+    Build a map connection from a row of the columns from connection_columns.
+
+    Args:
+        row (dict): The row
+        include_fields (list): include_fields options, see MAP_INCLUDE_FIELDS
+
+    Returns:
+        dict: The connection, with the optional fields that have a value
+    """
+    connection = {key: build(row) for key, (_, build) in MAP_FIELDS.items()}
+    for field in include_fields:
+        key, column = MAP_INCLUDE_FIELDS[field]
+        if row[column]:
+            connection[key] = row[column]
+    return connection
+
+
+# Every query parameter that changes a map-data response
+MAP_DATA_PARAMS = MAP_FILTER_PARAMS + (
+    'sort', 'bbox', 'zoom', 'extent', 'include_fields', 'points', 'format', 'page_size', 'cursor'
+)
+
+# Connection detail fields shown in the map popups and the single connection page: key -> column
+CONNECTION_DETAIL_FIELDS = {
+    'name': 'name',
+    'vendor': 'vendor',
+    'status': 'status',
+    'bandwidth': 'bandwidth_string',
+    'reference': 'sambandsnummer',
+    'type_name': 'type',
+    'pop_a_address': 'pop_a_address_string',
+    'pop_a_category': 'pop_a_category',
+    'pop_a_room': 'pop_a_room',
+    'pop_b_address': 'pop_b_address_string',
+    'pop_b_category': 'pop_b_category',
+    'pop_b_room': 'pop_b_room',
+    'location': 'location',
+    'location_type': 'location_type',
+    'transport_type': 'transporttype',
+    'length_km': 'length_km',
+}
+
+
+def get_connection_details(pks, sambands=None):
+    """
+    Get the connection details for many connections in one query.
+
+    Args:
+        pks (list): Primary keys of the connections
+        sambands (QuerySet, optional): The sambands to look in. Defaults to all sambands.
+
+    Returns:
+        dict: Details keyed by the string pk, connections that do not exist are left out
+    """
+    columns = (
+        'pk', 'pop_a_latitude', 'pop_a_longitude', 'pop_b_latitude', 'pop_b_longitude',
+        *CONNECTION_DETAIL_FIELDS.values(),
+    )
+    samband_regions = get_samband_regions()
+    details = {}
+    if sambands is None:
+        sambands = Samband.objects.all()
+    for row in sambands.filter(pk__in=pks).values(*columns):
+        connection = {key: row[column] for key, column in CONNECTION_DETAIL_FIELDS.items()}
+        for end in ('pop_a', 'pop_b'):
+            coords = [row[f'{end}_latitude'], row[f'{end}_longitude']]
+            connection[f'{end}_coords'] = None if None in coords else coords
+        connection['regions'] = samband_regions.get(str(row['pk']), [])
+        details[str(row['pk'])] = connection
+    return details
+
+
+def parse_connection_ids(values):
+    """
+    Read connection ids from query parameter values, each holding one id or a comma separated list.
+
+    Args:
+        values (list): The query parameter values
+
+    Returns:
+        list: The ids as UUIDs, without duplicates, in request order
+
+    Raises:
+        ValueError: If a value is not a valid id
+    """
+    ids = {}
+    for value in values:
+        for connection_id in value.split(','):
+            if connection_id.strip():
+                ids[uuid.UUID(connection_id.strip())] = None
+    return list(ids)
+
+
+def validate_map_filters(params):
+    """
+    Check the map filters that cannot be applied when they are malformed.
+
+    Args:
+        params (QueryDict): The request query parameters
+
+    Raises:
+        ValueError: If the polygon is not a GeoJSON polygon
+    """
+    polygon = params.get('polygon')
+    if polygon:
+        parse_polygon(polygon)
+
+
+def filter_map_sambands(params):
+    """
+    Apply the map filters from the query parameters.
+
+    Only connections with coordinates for both PoPs are shown on the map, so others are left out.
 
+    Args:
+        params (QueryDict): The request query parameters
 
+    Returns:
+        tuple: (queryset, distances) where distances holds the distance in km from the
+            lat/lng/radius centre to the nearest PoP, keyed by pk, or is empty without a radius
+    """
+    sambands = Samband.objects.filter(
+        pop_a_latitude__isnull=False,
+        pop_a_longitude__isnull=False,
+        pop_b_latitude__isnull=False,
+        pop_b_longitude__isnull=False,
+    )
+
+    for param, lookup in MAP_FILTERS:
+        values = params.getlist(param)
+        if values:
+            sambands = sambands.filter(**{lookup: values})
+
+    distances = {}
+    lat = params.get('lat')
+    lng = params.get('lng')
+    radius = params.get('radius')
+    if lat and lng and radius:
+        try:
+            center_lat = float(lat)
+            center_lng = float(lng)
+            radius_km = float(radius)
+
+            # Ask the spatial index which connections have a PoP in the circle, out of those with a
+            # PoP in the box around it that the database can find on its own
+            box = bounding_box(center_lat, center_lng, radius_km)
+            with timed('geo'):
+                index = get_spatial_index()
+                distances = index.within_radius(center_lat, center_lng, radius_km)
+                candidates = index.within_bbox(*box)
+            sambands = restrict_to_matches(sambands, endpoints_in_bbox_q(*box), candidates, distances)
+
+        except (ValueError, TypeError) as e:
+            logger.warning("Error processing geo filter: %s", e)
+
+    # Connections with a PoP inside a GeoJSON polygon or a named region
+    polygon = params.get('polygon')
+    if polygon:
+        try:
+            with timed('geo'):
+                sambands = filter_by_polygons(sambands, parse_polygon(polygon))
+        except ValueError as e:
+            # Views reject invalid polygons with validate_map_filters, so never fall back to everything
+            logger.warning("Error processing polygon filter: %s", e)
+            sambands = sambands.none()
+    regions = params.getlist('region')
+    if regions:
+        try:
+            sambands = filter_by_regions(sambands, regions)
+        except (KeyError, ValueError) as e:
+            logger.warning("Error processing region filter: %s", e)
+            sambands = sambands.none()
+
+    return sambands, distances
+
+
+@method_decorator(conditional_on_dataset, name='get')
 class SambandMapDataAPIView(View):
     """API view that returns sambands data as JSON for client-side rendering."""
-    
+
+    # Upper limit for page_size, to keep each page small enough to render at once
+    MAX_PAGE_SIZE = 10000
+
+    @staticmethod
+    def get_extent(sambands):
+        """Get the [[south, west], [north, east]] bounds of all PoPs of the sambands, or None if empty."""
+        bounds = sambands.aggregate(
+            a_south=Min('pop_a_latitude'),
+            a_north=Max('pop_a_latitude'),
+            a_west=Min('pop_a_longitude'),
+            a_east=Max('pop_a_longitude'),
+            b_south=Min('pop_b_latitude'),
+            b_north=Max('pop_b_latitude'),
+            b_west=Min('pop_b_longitude'),
+            b_east=Max('pop_b_longitude'),
+        )
+        if bounds['a_south'] is None:
+            return None
+        return [
+            [min(bounds['a_south'], bounds['b_south']), min(bounds['a_west'], bounds['b_west'])],
+            [max(bounds['a_north'], bounds['b_north']), max(bounds['a_east'], bounds['b_east'])],
+        ]
+
+    @staticmethod
+    def get_page(sambands, cursor, page_size):
+        """
+        Get one page of the sambands in pk order, starting after the cursor.
+
+        Keyset pagination keeps every page one index range scan, however deep the client has paged.
+
+        Args:
+            sambands (QuerySet): The filtered sambands
+            cursor (str): The pk of the last samband on the previous page, or None for the first page
+            page_size (int): The number of sambands in a page
+
+        Returns:
+            tuple: (queryset, next_cursor) where next_cursor is None on the last page
+        """
+        if cursor:
+            sambands = sambands.filter(pk__gt=cursor)
+        pks = list(sambands.order_by('pk').values_list('pk', flat=True)[:page_size + 1])
+        next_cursor = str(pks[page_size - 1]) if len(pks) > page_size else None
+        return Samband.objects.filter(pk__in=pks[:page_size]).order_by('pk'), next_cursor
+
+    @staticmethod
+    def get_clusters(sambands, zoom, view_box=None):
+        """
+        Group the PoPs of the sambands into grid clusters sized for the zoom level.
+
+        Args:
+            sambands (QuerySet): The filtered sambands
+            zoom (int): Map zoom level
+            view_box (tuple, optional): (min_lat, max_lat, min_lng, max_lng) of the viewport,
+                PoPs outside it are left out
+
+        Returns:
+            dict: Response fields with the 'clusters' and the matching connection 'count'
+        """
+        rows = np.array(
+            sambands.values_list('pop_a_latitude', 'pop_a_longitude', 'pop_b_latitude', 'pop_b_longitude'),
+            dtype=float,
+        ).reshape(-1, 4)
+        lats = np.concatenate([rows[:, 0], rows[:, 2]])
+        lngs = np.concatenate([rows[:, 1], rows[:, 3]])
+
+        if view_box is not None:
+            min_lat, max_lat, min_lng, max_lng = view_box
+            inside = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+            lats = lats[inside]
+            lngs = lngs[inside]
+            center_lat = (min_lat + max_lat) / 2
+        else:
+            center_lat = float(np.mean(lats)) if len(lats) else 0.0
+
+        cell_lat, cell_lng = cluster_cell_size(zoom, center_lat)
+        return {
+            'clustered': True,
+            'clusters': cluster_points(lats, lngs, cell_lat, cell_lng),
+            'connections': [],
+            'count': len(rows),
+        }
+
+    @staticmethod
+    def share_points(connections):
+        """
+        Replace the point_a/point_b objects of connections by indexes into a list of unique points.
+
+        Many connections end at the same site, so each location is only sent once.
+
+        Args:
+            connections (list): Connection dicts as built by get(), changed in place
+
+        Returns:
+            list: The unique points with their 'location', 'category' and 'location_type'
+        """
+        points = []
+        point_index = {}
+        for connection in connections:
+            for end in ('point_a', 'point_b'):
+                point = connection[end]
+                key = tuple(point['location'])
+                if key not in point_index:
+                    point_index[key] = len(points)
+                    points.append({
+                        'location': point['location'],
+                        'category': point['category'],
+                        'location_type': connection['location_type'],
+                    })
+                connection[end] = point_index[key]
+        return points
+
+    @staticmethod
+    def get_columns(sambands, distances, sort_by_distance=False, shared_points=False):
+        """
+        Build the columnar map-data response: one array per field instead of one dict per connection.
+
+        Status and location type are sent as indexes into 'dictionaries', and coordinates as
+        integers of degrees * COORDINATE_SCALE.
+
+        Args:
+            sambands (QuerySet): The filtered sambands
+            distances (dict): Distance in km to the radius centre, keyed by pk
+            sort_by_distance (bool, optional): Order the connections by distance. Defaults to False.
+            shared_points (bool, optional): Send unique PoP locations in 'points' and let the
+                connections refer to them by index, see share_points. Defaults to False.
+
+        Returns:
+            dict: Response fields with the 'columns', 'dictionaries' and 'count'
+        """
+        rows = list(sambands.values_list(
+            'pk', 'name', 'status', 'location_type', 'length_km',
+            'pop_a_latitude', 'pop_a_longitude', 'pop_a_category',
+            'pop_b_latitude', 'pop_b_longitude', 'pop_b_category',
+        ))
+        if sort_by_distance and distances:
+            # Rows committed before the spatial index was refreshed have no distance yet and go last
+            rows.sort(key=lambda row: distances.get(row[0], float('inf')))
+
+        dictionaries = {'status': [], 'location_type': []}
+        codes = {name: {} for name in dictionaries}
+
+        def encode(name, value):
+            if value not in codes[name]:
+                codes[name][value] = len(dictionaries[name])
+                dictionaries[name].append(value)
+            return codes[name][value]
+
+        columns = {
+            'id': [str(row[0]) for row in rows],
+            'name': [row[1] for row in rows],
+            'status': [encode('status', row[2]) for row in rows],
+            'location_type': [encode('location_type', row[3]) for row in rows],
+            'length_km': [None if row[4] is None else round(row[4], 1) for row in rows],
+        }
+        if distances:
+            columns['distance_km'] = [
+                round(distances[row[0]], 3) if row[0] in distances else None for row in rows
+            ]
+
+        coordinates = np.rint(
+            np.array([row[5:7] + row[8:10] for row in rows], dtype=float).reshape(-1, 4) * COORDINATE_SCALE
+        ).astype(np.int64)
+        result = {
+            'format': 'columnar',
+            'scale': COORDINATE_SCALE,
+            'dictionaries': dictionaries,
+            'columns': columns,
+            'count': len(rows),
+        }
+
+        if not shared_points:
+            for i, name in enumerate(('a_lat', 'a_lng', 'b_lat', 'b_lng')):
+                columns[name] = coordinates[:, i].tolist()
+            return result
+
+        # Unique PoP locations, numbered in order of first use
+        points = {'lat': [], 'lng': [], 'category': [], 'location_type': []}
+        point_index = {}
+        columns['point_a'] = []
+        columns['point_b'] = []
+        for row, (a_lat, a_lng, b_lat, b_lng) in zip(rows, coordinates.tolist()):
+            for end, key, category in (('point_a', (a_lat, a_lng), row[7]), ('point_b', (b_lat, b_lng), row[10])):
+                if key not in point_index:
+                    point_index[key] = len(points['lat'])
+                    points['lat'].append(key[0])
+                    points['lng'].append(key[1])
+                    points['category'].append(category)
+                    points['location_type'].append(encode('location_type', row[3]))
+                columns[end].append(point_index[key])
+        result['points'] = points
+        return result
+
     def get(self, request):
-        # Get filter parameters from request
-        lat = request.GET.get('lat')
-        lng = request.GET.get('lng')
-        radius = request.GET.get('radius')
-        
         # Handle connection detail request
         connection_id = request.GET.get('connection_id')
 
         # this is for 1 specific connection
         if connection_id:
             try:
-                samband = Samband.objects.get(pk=connection_id)
-                
-                # Parse coordinates - only do this once
-                point_a_coords = None
-                if samband.pop_a_geo_string:
-                    a_lat, a_lng = parse_geo_coordinates(samband.pop_a_geo_string)
-                    if a_lat is not None and a_lng is not None:
-                        point_a_coords = [a_lat, a_lng]
-                
-                point_b_coords = None
-                if samband.pop_b_geo_string:
-                    b_lat, b_lng = parse_geo_coordinates(samband.pop_b_geo_string)
-                    if b_lat is not None and b_lng is not None:
-                        point_b_coords = [b_lat, b_lng]
-                
-                # Return simplified connection information
-                return JsonResponse({
-                    'name': samband.name,
-                    'vendor': samband.vendor,
-                    'status': samband.status,
-                    'bandwidth': samband.bandwidth_string,
-                    'reference': samband.sambandsnummer,
-                    'type_name': samband.type,
-                    'pop_a_address': samband.pop_a_address_string,
-                    'pop_a_category': samband.pop_a_category,
-                    'pop_a_room': samband.pop_a_room,
-                    'pop_a_coords': point_a_coords,  # Just include coordinates directly
-                    'pop_b_address': samband.pop_b_address_string,
-                    'pop_b_category': samband.pop_b_category,
-                    'pop_b_room': samband.pop_b_room,
-                    'pop_b_coords': point_b_coords,  # Just include coordinates directly
-                    'location': samband.location,
-                    'location_type': samband.location_type,
-                    'transport_type': samband.transporttype
-                })
-            except Samband.DoesNotExist:
+                details = get_connection_details(parse_connection_ids([connection_id]))
+            except ValueError:
+                details = {}
+            if not details:
                 return JsonResponse({'error': 'Connection not found'}, status=404)
-        
-        # Handle multiple filter selections (keep existing filter code)
-        vendors = request.GET.getlist('vendor')
-        statuses = request.GET.getlist('status')
-        citylist = request.GET.getlist('location')
-        location_types = request.GET.getlist('location_type')
-        transport_types = request.GET.getlist('transporttype')
-        type = request.GET.getlist('type')
-
-        print(f"Vendors: {vendors}")
-        print(f"Statuses: {statuses}")
-        print(f"Citylist: {citylist}")
-        print(f"Location Types: {location_types}")
-        print(f"Transport Types: {transport_types}")
-        print(f"Type: {type}")
-        
-        # Start with all connections
-        sambands = Samband.objects.all()
-        
-        # Apply vendor and status filters (keep existing filter code)
-        if vendors:
-            sambands = sambands.filter(vendor__in=vendors)
-            
-        if statuses:
-            sambands = sambands.filter(status__in=statuses)
-        
-        if citylist:
-            sambands = sambands.filter(location__in=citylist)
-        
-        if location_types:
-            sambands = sambands.filter(location_type__in=location_types)
+            return JsonResponse(next(iter(details.values())))
 
-        if transport_types:
-            sambands = sambands.filter(transporttype__in=transport_types)
-        
-        if type:
-            sambands = sambands.filter(type__in=type)
-        
+        try:
+            page_size = int(request.GET.get('page_size') or 0)
+            if request.GET.get('cursor'):
+                uuid.UUID(request.GET['cursor'])
+        except ValueError:
+            return JsonResponse({'error': 'page_size must be a number and cursor a connection id'}, status=400)
+        if not 0 <= page_size <= self.MAX_PAGE_SIZE:
+            return JsonResponse({'error': f'page_size can be at most {self.MAX_PAGE_SIZE}'}, status=400)
+        try:
+            validate_map_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
-        # Process distance filtering (keep existing distance calculation code)
-        if lat and lng and radius:
+        # Full responses are cached per normalized query until the dataset changes
+        cache_key = versioned_cache_key('map-data', request.GET, MAP_DATA_PARAMS)
+        response_data = get_or_build('map-data', cache_key, lambda: self.get_map_data(request.GET))
+        with timed('serialize'):
+            return JsonResponse(response_data)
+
+    def get_map_data(self, params):
+        """
+        Build the map-data response for the filters, viewport and format in the query parameters.
+
+        Args:
+            params (QueryDict): The request query parameters
+
+        Returns:
+            dict: The response data
+        """
+        lat = params.get('lat')
+        lng = params.get('lng')
+        radius = params.get('radius')
+
+        sort = params.get('sort')
+        bbox = params.get('bbox')
+
+        sambands, distances = filter_map_sambands(params)
+
+        # Bounds of everything that matches the filters, so the client can fit the map to it
+        extent = None
+        if params.get('extent'):
+            extent = self.get_extent(sambands)
+
+        # Only keep connections with a PoP inside the viewport bounding box
+        view_box = None
+        if bbox:
             try:
-                center_lat = float(lat)
-                center_lng = float(lng)
-                radius_km = float(radius)
-                
-                # Filter by distance
-                filtered_by_distance = []
-                
-                for samband in sambands:
-                    points_in_radius = False
-                    
-                    # Check point A
-                    if samband.pop_a_geo_string:
-                        a_lat, a_lng = parse_geo_coordinates(samband.pop_a_geo_string)
-                        if a_lat is not None and a_lng is not None:
-                            distance = calculate_distance(center_lat, center_lng, a_lat, a_lng)
-                            if distance <= radius_km:
-                                points_in_radius = True
-                    
-                    # Check point B
-                    if not points_in_radius and samband.pop_b_geo_string:
-                        b_lat, b_lng = parse_geo_coordinates(samband.pop_b_geo_string)
-                        if b_lat is not None and b_lng is not None:
-                            distance = calculate_distance(center_lat, center_lng, b_lat, b_lng)
-                            if distance <= radius_km:
-                                points_in_radius = True
-                    
-                    if points_in_radius:
-                        filtered_by_distance.append(samband)
-                
-                sambands = filtered_by_distance
-                
-            except (ValueError, TypeError) as e:
-                # Log the error for debugging
-                print(f"Error processing geo filter: {e}")
-        
-        include_fields = request.GET.getlist('include_fields', [])
-        
-        connections = []
-        
-        for samband in sambands:
-            # Extract coordinates for both points
-            point_a_coords = None
-            if samband.pop_a_geo_string:
-                a_lat, a_lng = parse_geo_coordinates(samband.pop_a_geo_string)
-                if a_lat is not None and a_lng is not None:
-                    point_a_coords = [a_lat, a_lng]
-            
-            point_b_coords = None
-            if samband.pop_b_geo_string:
-                b_lat, b_lng = parse_geo_coordinates(samband.pop_b_geo_string)
-                if b_lat is not None and b_lng is not None:
-                    point_b_coords = [b_lat, b_lng]
-            
-            # Only include the connection if both points have valid coordinates
-            if point_a_coords and point_b_coords:
-                # Create the basic connection object with minimal data
-                connection = {
-                    'id': str(samband.pk),
-                    'name': samband.name,
-                    'point_a': {
-                        'name': samband.name,
-                        'location': point_a_coords,
-                        'category': samband.pop_a_category,
-                        # Remove address and room fields to reduce payload size
-                    },
-                    'point_b': {
-                        'name': samband.name,
-                        'location': point_b_coords,
-                        'category': samband.pop_b_category,
-                        # Remove address and room fields to reduce payload size
-                    },
-                    'status': samband.status,
-                    'location_type': samband.location_type,
-                }
-                
-                # Add any additional requested fields
-                for field in include_fields:
-                    # if field == 'status' and samband.status:
-                    #     connection['status'] = samband.status
-                    if field == 'vendor' and samband.vendor:
-                        connection['vendor'] = samband.vendor
-                    elif field == 'bandwidth' and samband.bandwidth_string:
-                        connection['bandwidth'] = samband.bandwidth_string
-                    elif field == 'reference' and samband.sambandsnummer:
-                        connection['reference'] = samband.sambandsnummer
-                    elif field == 'type' and samband.type:
-                        connection['type'] = samband.type
-                    elif field == 'location' and samband.location:
-                        connection['location'] = samband.location
-                    # elif field == 'location_type' and samband.location_type:
-                    #     connection['location_type'] = samband.location_type
-                    elif field == 'transporttype' and samband.transporttype:
-                        connection['transporttype'] = samband.transporttype
-                
-                connections.append(connection)
-        
+                view_box = parse_bbox(bbox)
+                # Connections with a PoP in view, and long lines that cross the view with both PoPs outside it,
+                # out of those whose line bounding box overlaps the view
+                with timed('geo'):
+                    index = get_spatial_index()
+                    in_view = index.within_bbox(*view_box) | index.lines_in_bbox(*view_box)
+                    candidates = index.lines_near_bbox(*view_box)
+                sambands = restrict_to_matches(sambands, lines_in_bbox_q(*view_box), candidates, in_view)
+            except ValueError as e:
+                view_box = None
+                logger.warning("Error processing bbox filter: %s", e)
+
         response_data = {
-            'connections': connections,
-            'count': len(connections),
-            'filter_active': bool(vendors or statuses or citylist or location_types or transport_types or (lat and lng and radius))
+            'filter_active': (
+                any(params.getlist(param) for param in ('polygon', 'region', *dict(MAP_FILTERS)))
+                or bool(lat and lng and radius)
+            ),
+            'version': get_dataset_version(),
+            # Any later change starts a new version, so a cached response's token stays valid
+            'sync_token': current_sync_token(),
         }
-        
+        if extent is not None:
+            response_data['extent'] = extent
+
         # Add a radius circle if filtering by location
         if lat and lng and radius:
             response_data['radius'] = {
                 'location': [float(lat), float(lng)],
                 'radius_km': float(radius)
             }
-        
+
+        # At low zoom, send point clusters instead of individual connections
+        try:
+            zoom = int(params.get('zoom', ''))
+        except ValueError:
+            zoom = None
+        if zoom is not None and zoom <= CLUSTER_MAX_ZOOM:
+            response_data.update(self.get_clusters(sambands, zoom, view_box))
+            return response_data
+
+        # With a page size the connections are sent in pages in pk order, each continuing after the
+        # cursor from the one before
+        page_size = int(params.get('page_size') or 0)
+        if page_size:
+            sambands, response_data['next_cursor'] = self.get_page(sambands, params.get('cursor'), page_size)
+            sort = None
+
+        if params.get('format') == 'columnar':
+            if sort == 'length':
+                sambands = sambands.order_by('-length_km')
+            response_data.update(
+                self.get_columns(sambands, distances, sort == 'distance', bool(params.get('points')))
+            )
+            return response_data
+
+        # Only read the columns that the requested output fields are built from
+        include_fields = [field for field in params.getlist('include_fields', []) if field in MAP_INCLUDE_FIELDS]
+        rows = sambands.values(*connection_columns(include_fields))
+
+        if sort == 'distance' and distances:
+            # Rows committed before the spatial index was refreshed have no distance yet and go last
+            rows = sorted(rows, key=lambda row: distances.get(row['pk'], float('inf')))
+        elif sort == 'length':
+            # Longest spans first, sorted by the database on the indexed column
+            rows = rows.order_by('-length_km')
+
+        connections = []
+
+        # filter_map_sambands only matches connections with coordinates for both points
+        for row in rows:
+            connection = build_connection(row, include_fields)
+            if row['pk'] in distances:
+                connection['distance_km'] = round(distances[row['pk']], 3)
+            connections.append(connection)
+
+        # Send each site once and let the connections refer to it by index
+        if params.get('points'):
+            response_data['points'] = self.share_points(connections)
+
+        response_data['connections'] = connections
+        response_data['count'] = len(connections)
+
+        return response_data
+
+
+@method_decorator(conditional_on_dataset, name='get')
+class SambandDetailsAPIView(APIView):
+    """API view that returns the details of many connections in one request."""
+
+    # Token or session authentication as for the REST API, and only the sambands the user may view
+    permission_classes = [IsAuthenticated]
+
+    # Upper limit for the number of ids, to keep the URL and the response small
+    MAX_IDS = 100
+
+    def get(self, request):
+        """Return the details of the requested connections that the user may view."""
+        try:
+            ids = parse_connection_ids(request.GET.getlist('ids'))
+        except ValueError:
+            return JsonResponse({'error': 'ids must be connection ids separated by commas'}, status=400)
+        if not ids:
+            return JsonResponse({'error': 'ids is required'}, status=400)
+        if len(ids) > self.MAX_IDS:
+            return JsonResponse({'error': f'At most {self.MAX_IDS} ids can be requested at once'}, status=400)
+
+        details = get_connection_details(ids, Samband.objects.restrict(request.user, 'view'))
+        return JsonResponse({
+            'details': details,
+            'missing': [str(connection_id) for connection_id in ids if str(connection_id) not in details],
+        })
+
+
+class SambandSyncAPIView(APIView):
+    """API view that returns the connections changed and removed since a sync token."""
+
+    # Token or session authentication as for the REST API, and only the sambands the user may view
+    permission_classes = [IsAuthenticated]
+
+    # Upper limit for the changed connections in one response, the rest follow with the next token
+    MAX_CHANGES = 5000
+
+    def get(self, request):
+        """Return the viewable connections changed since the token, and those removed from the user's set."""
+        since = request.GET.get('since')
+        try:
+            since = parse_sync_token(since) if since else None
+            validate_map_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        response_data = {'version': get_dataset_version()}
+        sambands, _ = filter_map_sambands(request.GET)
+        # Sambands the user may no longer view are sent as removed
+        sambands = sambands.restrict(request.user, 'view')
+
+        # Without a token the client starts from a full load, and syncs from this point on
+        if since is None:
+            response_data.update({
+                'changed': [],
+                'removed': [],
+                'sync_token': current_sync_token(),
+                'more': False,
+                'reset': True,
+            })
+            return JsonResponse(response_data)
+
+        changes = get_changes(sambands, since, self.MAX_CHANGES)
+        include_fields = [field for field in request.GET.getlist('include_fields') if field in MAP_INCLUDE_FIELDS]
+        rows = changes['changed'].values(*connection_columns(include_fields))
+
+        response_data.update({
+            'changed': [build_connection(row, include_fields) for row in rows],
+            'removed': changes['removed'],
+            'sync_token': changes['sync_token'],
+            'more': changes['more'],
+            'reset': changes['reset'],
+        })
         return JsonResponse(response_data)
 
+
+class SambandEventStreamView(View):
+    """API view that streams Samband change events as Server-Sent Events."""
+
+    # Seconds between comments that keep idle connections open through proxies
+    KEEPALIVE_SECONDS = 15
+
+    # Seconds before the stream ends, so it does not hold a worker forever; browsers reconnect
+    STREAM_SECONDS = 300
+
+    def get(self, request):
+        """Stream the change events of the sambands the user may view."""
+        # EventSource sends the session cookie but no token, and does not accept a REST framework response
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=403)
+        stream = open_stream(request.user, self.STREAM_SECONDS, self.KEEPALIVE_SECONDS)
+        if stream is None:
+            # Without a stream the pages poll the sync API
+            return JsonResponse({'error': 'Live events are not available, use the sync API'}, status=503)
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@method_decorator(conditional_on_dataset, name='get')
+class SambandFacetsAPIView(View):
+    """API view that returns the number of map connections per value of each filter field."""
+
+    def get(self, request):
+        """Return the connection counts per value of each filter field."""
+        try:
+            validate_map_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        cache_key = versioned_cache_key('facets', request.GET, MAP_FILTER_PARAMS)
+        return JsonResponse(get_or_build('facets', cache_key, lambda: self.get_facets(request.GET)))
+
+    @staticmethod
+    def get_facets(params):
+        """
+        Count the connections matching the filters, leaving each field's own selection out of its counts.
+
+        Args:
+            params (QueryDict): The request query parameters
+
+        Returns:
+            dict: The facets, see compute_facets
+        """
+        # The facet fields are counted against their selections, the other filters narrow the connections
+        base_params = params.copy()
+        for field in FACET_FIELDS:
+            base_params.pop(field, None)
+        sambands, _ = filter_map_sambands(base_params)
+        selected = {field: params.getlist(field) for field in FACET_FIELDS}
+        return {'facets': compute_facets(sambands, selected)}
+
+
+class SambandChoicesAPIView(View):
+    """API view that searches the distinct values of a filter field, for typeahead filter inputs."""
+
+    # Upper limit for the values in one response
+    MAX_LIMIT = 100
+
+    def get(self, request):
+        """Return a page of the distinct values of the field that contain the query."""
+        field = request.GET.get('field')
+        if field not in FACET_FIELDS:
+            return JsonResponse({'error': f'field must be one of {", ".join(FACET_FIELDS)}'}, status=400)
+        try:
+            limit = min(int(request.GET.get('limit') or 50), self.MAX_LIMIT)
+            offset = int(request.GET.get('offset') or 0)
+        except ValueError:
+            return JsonResponse({'error': 'limit and offset must be numbers'}, status=400)
+        if limit < 1 or offset < 0:
+            return JsonResponse({'error': 'limit must be at least 1 and offset at least 0'}, status=400)
+
+        values = Samband.objects.exclude(**{field: ''})
+        query = request.GET.get('q', '').strip()
+        if query:
+            values = values.filter(**{f'{field}__icontains': query})
+        values = list(values.order_by(field).values_list(field, flat=True).distinct()[offset:offset + limit + 1])
+
+        # Results in the format of the Nautobot REST API, which the select widgets page through
+        next_url = None
+        if len(values) > limit:
+            params = request.GET.copy()
+            params['offset'] = offset + limit
+            next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+        return JsonResponse({
+            'next': next_url,
+            'results': [{'id': value, 'display': value} for value in values[:limit]],
+        })
+
+
+class SambandNearestAPIView(View):
+    """API view that returns the k connections with a PoP nearest to a point."""
+
+    # Upper limit for k, to keep the response small
+    MAX_K = 500
+
+    def get(self, request):
+        """Return the nearest connections matching the map filters, closest first."""
+        try:
+            lat = float(request.GET['lat'])
+            lng = float(request.GET['lng'])
+            k = min(int(request.GET.get('k', 20)), self.MAX_K)
+            max_distance_km = float(request.GET['radius']) if request.GET.get('radius') else None
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'lat and lng are required, k and radius must be numbers'}, status=400)
+        if k < 1:
+            return JsonResponse({'error': 'k must be at least 1'}, status=400)
+        try:
+            validate_map_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # The radius only limits the search here, it is not a separate filter
+        params = request.GET.copy()
+        params.pop('radius', None)
+        sambands, _ = filter_map_sambands(params)
+
+        connections = []
+        for distance, samband in nearest_sambands(sambands, lat, lng, k, max_distance_km):
+            connections.append({
+                'id': str(samband.pk),
+                'name': samband.name,
+                'point_a': {
+                    'name': samband.name,
+                    'location': [samband.pop_a_latitude, samband.pop_a_longitude],
+                    'category': samband.pop_a_category,
+                },
+                'point_b': {
+                    'name': samband.name,
+                    'location': [samband.pop_b_latitude, samband.pop_b_longitude],
+                    'category': samband.pop_b_category,
+                },
+                'status': samband.status,
+                'vendor': samband.vendor,
+                'type': samband.type,
+                'location_type': samband.location_type,
+                'distance_km': round(distance, 3),
+            })
+
+        return JsonResponse({
+            'location': [lat, lng],
+            'k': k,
+            'connections': connections,
+            'count': len(connections),
+        })
+
+
+@method_decorator(conditional_on_dataset, name='get')
+class SambandHeatmapAPIView(View):
+    """API view that returns connection density per grid cell for a heatmap layer."""
+
+    # Numeric fields a heatmap can be weighted by
+    WEIGHTS = {
+        'bandwidth': 'bandwidth_down',
+        'cost': 'cost_in',
+    }
+
+    # Cell edge length in screen pixels, the cells shrink in degrees as the map zooms in
+    CELL_PX = 32
+
+    def get(self, request):
+        """Return the density cells of the connections matching the map filters."""
+        weight = request.GET.get('weight')
+        if weight and weight not in self.WEIGHTS:
+            return JsonResponse({'error': f"weight must be one of: {', '.join(self.WEIGHTS)}"}, status=400)
+        try:
+            # Zoom levels beyond the grid range are clamped, as for the clusters
+            zoom = clamp_zoom(int(request.GET.get('zoom', 5)))
+            view_box = parse_bbox(request.GET['bbox']) if request.GET.get('bbox') else None
+            validate_map_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        sambands, _ = filter_map_sambands(request.GET)
+        fields = ['pop_a_latitude', 'pop_a_longitude', 'pop_b_latitude', 'pop_b_longitude']
+        if weight:
+            fields.append(self.WEIGHTS[weight])
+        rows = np.array(sambands.values_list(*fields), dtype=float).reshape(-1, len(fields))
+
+        # Both ends of a connection add to the density of the site they are at
+        lats = np.concatenate([rows[:, 0], rows[:, 2]])
+        lngs = np.concatenate([rows[:, 1], rows[:, 3]])
+        weights = np.concatenate([rows[:, 4], rows[:, 4]]) if weight else None
+
+        if view_box is not None:
+            min_lat, max_lat, min_lng, max_lng = view_box
+            inside = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+            lats, lngs = lats[inside], lngs[inside]
+            if weights is not None:
+                weights = weights[inside]
+            center_lat = (min_lat + max_lat) / 2
+        else:
+            center_lat = float(np.mean(lats)) if len(lats) else 0.0
+
+        cell_lat, cell_lng = cluster_cell_size(zoom, center_lat, cell_px=self.CELL_PX)
+        cell_lats, cell_lngs, counts, totals = grid_density(lats, lngs, cell_lat, cell_lng, weights)
+
+        return JsonResponse({
+            'zoom': zoom,
+            'weight': weight or 'count',
+            'cell_size': [cell_lat, cell_lng],
+            'max': float(totals.max()) if len(totals) else 0,
+            # [lat, lng, value, connection endpoints] per non-empty cell
+            'cells': [
+                [round(float(lat), 5), round(float(lng), 5), float(total), int(count)]
+                for lat, lng, total, count in zip(cell_lats, cell_lngs, totals, counts)
+            ],
+        })
+
+
+class SambandMapTileAPIView(View):
+    """API view that returns the PoPs and connection lines intersecting one z/x/y map tile."""
+
+    def get(self, request, z, x, y):
+        """Return the tile, cached per filter combination and dataset version."""
+        if not is_valid_tile(z, x, y):
+            return JsonResponse({'error': 'Tile out of range'}, status=404)
+        try:
+            validate_map_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        cache_key = versioned_cache_key('map-tile', request.GET, MAP_FILTER_PARAMS, z, x, y)
+        tile = get_or_build('map-tile', cache_key, lambda: build_tile(filter_map_sambands(request.GET)[0], z, x, y))
+
+        response = JsonResponse(tile)
+        # A tile URL that names the current dataset version can be kept by the browser
+        if request.GET.get('v') == str(get_dataset_version()):
+            response['Cache-Control'] = 'private, max-age=86400'
+        else:
+            response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+
+class SambandGeoJSONExportView(APIView):
+    """Streams sambands as a GeoJSON FeatureCollection of lines from PoP A to PoP B."""
+
+    # Token or session authentication as for the REST API, and only the sambands the user may view
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Stream the sambands the user may view that match the list filters."""
+        try:
+            properties = parse_geojson_properties(request.GET.getlist('properties'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Everything except our own parameters is passed on to the list filters
+        filter_data = request.GET.copy()
+        filter_data.pop('properties', None)
+        filterset = filters.SambandFilterSet(
+            data=filter_data, queryset=Samband.objects.restrict(request.user, 'view'), request=request
+        )
+        if not filterset.is_valid():
+            return JsonResponse({'error': filterset.errors}, status=400)
+
+        response = StreamingHttpResponse(
+            iter_geojson(filterset.qs.order_by(), properties),
+            content_type='application/geo+json',
+        )
+        response['Content-Disposition'] = 'attachment; filename="samband.geojson"'
+        return response
+
+
+@method_decorator(conditional_on_dataset, name='get')
 class SambandSearchSuggestionsView(View):
     """Returns connection name suggestions for autocomplete."""
     
@@ -301,4 +1022,5 @@ class SambandSearchSuggestionsView(View):
                 'status': conn.status
             })
             
-        return JsonResponse({'suggestions': suggestions})
+        with timed('serialize'):
+            return JsonResponse({'suggestions': suggestions})
@@ -1,10 +1,31 @@
 """Filtering for praksis_nhn_nautobot."""
 
 import django_filters
+from django.core.exceptions import ValidationError
 from django.db.models import Q
 from nautobot.apps.filters import NautobotFilterSet
 
 from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.region_service import (
+    filter_by_polygons,
+    filter_by_regions,
+    get_regions,
+    parse_polygon,
+)
+
+
+def validate_polygon(value):
+    """Reject values that are not a GeoJSON polygon."""
+    try:
+        parse_polygon(value)
+    except ValueError as e:
+        raise ValidationError(str(e)) from e
+
+
+def validate_region(value):
+    """Reject region names that are not configured."""
+    if value not in get_regions():
+        raise ValidationError(f"Unknown region '{value}'")
 
 
 # pylint: disable=nb-use-fields-all
@@ -25,6 +46,20 @@ class SambandFilterSet(NautobotFilterSet):  # pylint: disable=too-many-ancestors
     type = django_filters.CharFilter(label="Type")
     name = django_filters.CharFilter(field_name="name", lookup_expr="icontains", label="Name (contains)")
 
+    # Geographic filters, matching connections with PoP A or PoP B inside the area
+    polygon = django_filters.CharFilter(
+        method="filter_polygon", validators=[validate_polygon], label="Polygon (GeoJSON)"
+    )
+    region = django_filters.CharFilter(method="filter_region", validators=[validate_region], label="Region")
+
+    # Span length range filters
+    length_km__gte = django_filters.NumberFilter(
+        field_name="length_km", lookup_expr="gte", label="Length in km (at least)"
+    )
+    length_km__lte = django_filters.NumberFilter(
+        field_name="length_km", lookup_expr="lte", label="Length in km (at most)"
+    )
+
     # Date range filters (greater-than or equal and less-than or equal):
     live_date__gte = django_filters.DateFilter(
         field_name="live_date", lookup_expr="gte", label="Live Date (after or on)"
@@ -55,3 +90,11 @@ class SambandFilterSet(NautobotFilterSet):  # pylint: disable=too-many-ancestors
         This filter allows searching across multiple fields in the model.
         """
         return queryset.filter(Q(name__icontains=value) | Q(location__icontains=value) | Q(vendor__icontains=value))
+
+    def filter_polygon(self, queryset, name, value):
+        """Filter on connections with a PoP inside a GeoJSON polygon."""
+        return filter_by_polygons(queryset, parse_polygon(value))
+
+    def filter_region(self, queryset, name, value):
+        """Filter on connections with a PoP inside a named region from the app settings."""
+        return filter_by_regions(queryset, [value])
@@ -1,9 +1,17 @@
 """Forms for praksis_nhn_nautobot."""
 
 from django import forms
-from nautobot.apps.forms import NautobotBulkEditForm, NautobotFilterForm, NautobotModelForm, TagsBulkEditFormMixin
+from django.urls import reverse
+from nautobot.apps.forms import (
+    APISelect,
+    NautobotBulkEditForm,
+    NautobotFilterForm,
+    NautobotModelForm,
+    TagsBulkEditFormMixin,
+)
 
 from praksis_nhn_nautobot import models
+from praksis_nhn_nautobot.services.facet_service import get_facets
 
 
 # pylint: disable=too-many-ancestors, nb-use-fields-all
@@ -127,6 +135,8 @@ class SambandFilterForm(NautobotFilterForm):
         required=False,
         label="Transport Type",
     )
+    length_km__gte = forms.FloatField(required=False, min_value=0, label="Length in km (at least)")
+    length_km__lte = forms.FloatField(required=False, min_value=0, label="Length in km (at most)")
     live_date__gte = forms.DateField(
         required=False,
         label="Live Date (after or on)",
@@ -148,22 +158,31 @@ class SambandFilterForm(NautobotFilterForm):
         widget=forms.DateInput(attrs={"type": "date"}),
     )
 
+    # Fields whose choices are the distinct values in the database
+    choice_fields = ("location", "vendor", "transporttype", "type")
+
+    # Fields with more distinct values than this are picked with a typeahead instead of a dropdown
+    max_choices = 500
+
     def __init__(self, *args, **kwargs):
         """Initialize the form and set up choices for fields.
-        
-        The choises for the fields are dynamically populated from the database.
+
+        The choices come from the cached facets, which are only rebuilt when the data changes.
         """
         super().__init__(*args, **kwargs)
-        # Fetch distinct location values from the Samband model
-        locations = models.Samband.objects.values_list("location", flat=True)
-        vendors = models.Samband.objects.values_list("vendor", flat=True).distinct()
-        transporttypes = models.Samband.objects.values_list("transporttype", flat=True).distinct()
-        types = models.Samband.objects.values_list("type", flat=True).distinct()
-        location_choices = sorted([("", "Any")] + [(loc, loc) for loc in set(locations) if loc])
-        vendor_choices = sorted([("", "Any")] + [(ven, ven) for ven in set(vendors) if ven])
-        transporttype_choices = sorted([("", "Any")] + [(tpt, tpt) for tpt in set(transporttypes) if tpt])
-        type_choices = sorted([("", "Any")] + [(tpt, tpt) for tpt in set(types) if tpt])
-        self.fields["location"].choices = location_choices
-        self.fields["vendor"].choices = vendor_choices
-        self.fields["transporttype"].choices = transporttype_choices
-        self.fields["type"].choices = type_choices
+        facets = get_facets()
+        for name in self.choice_fields:
+            values = [item["value"] for item in facets[name]]
+            if len(values) <= self.max_choices:
+                self.fields[name].choices = [("", "Any")] + [(value, value) for value in values]
+            else:
+                self.fields[name] = self.typeahead_field(name, self.fields[name].label)
+
+    def typeahead_field(self, name, label):
+        """Get a field that searches the distinct values of a Samband field through the choices API."""
+        widget = APISelect(api_url=reverse("plugins-api:praksis_nhn_nautobot-api:samband_choices"))
+        widget.add_query_param("field", name)
+        # The widget only needs the selected value as an option, the rest are fetched while typing
+        value = self.data.get(name) if self.is_bound else None
+        widget.choices = [(value, value)] if value else []
+        return forms.CharField(required=False, label=label, widget=widget)
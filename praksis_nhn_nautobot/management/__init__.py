@@ -0,0 +1 @@
+"""Management commands for praksis_nhn_nautobot."""
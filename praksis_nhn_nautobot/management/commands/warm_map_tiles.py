@@ -0,0 +1,40 @@
+"""Precompute the unfiltered map tiles so the first map loads are served from the cache."""
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from praksis_nhn_nautobot.api.views import MAP_FILTER_PARAMS, SambandMapDataAPIView, filter_map_sambands
+from praksis_nhn_nautobot.services.cache_service import get_or_build, versioned_cache_key
+from praksis_nhn_nautobot.services.tile_service import build_tile, tile_for_point
+
+
+class Command(BaseCommand):
+    """Build and cache the unfiltered map tiles covering every connection."""
+
+    help = "Precompute the unfiltered map tiles up to a zoom level."
+
+    def add_arguments(self, parser):
+        """Add the --max-zoom option."""
+        parser.add_argument("--max-zoom", type=int, default=8, help="Highest zoom level to build (default: 8)")
+
+    def handle(self, *args, **options):
+        """Build the tiles."""
+        params = QueryDict()
+        sambands, _ = filter_map_sambands(params)
+        extent = SambandMapDataAPIView.get_extent(sambands)
+        if extent is None:
+            self.stdout.write("No located connections, nothing to build.")
+            return
+
+        (south, west), (north, east) = extent
+        built = 0
+        for z in range(options["max_zoom"] + 1):
+            min_x, min_y = tile_for_point(north, west, z)
+            max_x, max_y = tile_for_point(south, east, z)
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    cache_key = versioned_cache_key("map-tile", params, MAP_FILTER_PARAMS, z, x, y)
+                    get_or_build("map-tile", cache_key, lambda z=z, x=x, y=y: build_tile(sambands, z, x, y))
+                    built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Cached {built} map tiles up to zoom {options['max_zoom']}."))
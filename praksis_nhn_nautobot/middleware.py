@@ -0,0 +1,84 @@
+"""Middleware for praksis_nhn_nautobot."""
+
+import logging
+
+from django.db import connection
+
+from praksis_nhn_nautobot.services.timing_service import (
+    PHASES,
+    begin_request,
+    end_request,
+    get_request_timings,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _count_query(execute, sql, params, many, context):
+    timings = get_request_timings()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute_wrapper(execute, sql, params, many, context)
+
+
+class ServerTimingMiddleware:
+    """
+    Report where the app's views spend their time.
+
+    Requests to views of this app get a Server-Timing header, shown in the browser devtools, and a
+    log record with the same numbers as fields. Requests to other views pass through untouched.
+    """
+
+    def __init__(self, get_response):
+        """Wrap the next handler."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle the request, timing database queries while a view of this app runs."""
+        with connection.execute_wrapper(_count_query):
+            response = self.get_response(request)
+
+        timing = getattr(request, "_praksis_timing", None)
+        if timing is None:
+            return response
+        view_name, timings, token = timing
+        end_request(token)
+        total = timings.finish()
+
+        metrics = [f'db;dur={timings.durations["db"] * 1000:.1f};desc="{PHASES["db"]} ({timings.queries} queries)"']
+        metrics += [
+            f'{phase};dur={timings.durations[phase] * 1000:.1f};desc="{description}"'
+            for phase, description in PHASES.items()
+            if phase != "db" and timings.durations[phase]
+        ]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(metrics)
+
+        fields = {
+            "view": view_name,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "db_queries": timings.queries,
+            **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in timings.durations.items()},
+        }
+        # The fields go in the message for plain text logs and as a record attribute for structured ones
+        message = " ".join(f"{key}={value}" for key, value in fields.items())
+        logger.info("Server timing %s", message, extra={"server_timing": fields})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # pylint: disable=unused-argument
+        """Start timing when the view belongs to this app."""
+        if getattr(view_func, "__module__", "").startswith("praksis_nhn_nautobot."):
+            view_class = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None) or view_func
+            request._praksis_timing = (view_class.__name__, *begin_request())  # pylint: disable=protected-access
+
+    def process_template_response(self, request, response):
+        """Time the rendering of template responses, which happens after the view has returned."""
+        timing = getattr(request, "_praksis_timing", None)
+        if timing is not None:
+            timings = timing[1]
+            timings.start("render")
+            response.add_post_render_callback(lambda _: timings.stop("render"))
+        return response
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.19 on 2025-04-22 10:03
+
+from django.db import migrations, models
+
+from praksis_nhn_nautobot.services.geo_service import parse_geo_coordinates_batch
+
+COORDINATE_FIELDS = ["pop_a_latitude", "pop_a_longitude", "pop_b_latitude", "pop_b_longitude"]
+
+
+def update_coordinates(Samband, batch):
+    """Parse the geo strings of a batch of rows, each distinct string once, and save the coordinates."""
+    pop_a = parse_geo_coordinates_batch(samband.pop_a_geo_string for samband in batch)
+    pop_b = parse_geo_coordinates_batch(samband.pop_b_geo_string for samband in batch)
+    for samband, (a_lat, a_lng), (b_lat, b_lng) in zip(batch, pop_a, pop_b):
+        samband.pop_a_latitude, samband.pop_a_longitude = a_lat, a_lng
+        samband.pop_b_latitude, samband.pop_b_longitude = b_lat, b_lng
+    Samband.objects.bulk_update(batch, COORDINATE_FIELDS)
+
+
+def populate_pop_coordinates(apps, schema_editor):
+    """Fill the coordinate columns of existing rows from their geo strings."""
+    Samband = apps.get_model("praksis_nhn_nautobot", "Samband")
+
+    batch = []
+    queryset = Samband.objects.only("pk", "pop_a_geo_string", "pop_b_geo_string")
+    for samband in queryset.iterator(chunk_size=2000):
+        batch.append(samband)
+        if len(batch) >= 2000:
+            update_coordinates(Samband, batch)
+            batch = []
+
+    if batch:
+        update_coordinates(Samband, batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("praksis_nhn_nautobot", "0005_alter_samband_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="samband",
+            name="pop_a_latitude",
+            field=models.FloatField(blank=True, editable=False, help_text="Latitude of Point of Presence A", null=True),
+        ),
+        migrations.AddField(
+            model_name="samband",
+            name="pop_a_longitude",
+            field=models.FloatField(
+                blank=True, editable=False, help_text="Longitude of Point of Presence A", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="samband",
+            name="pop_b_latitude",
+            field=models.FloatField(blank=True, editable=False, help_text="Latitude of Point of Presence B", null=True),
+        ),
+        migrations.AddField(
+            model_name="samband",
+            name="pop_b_longitude",
+            field=models.FloatField(
+                blank=True, editable=False, help_text="Longitude of Point of Presence B", null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="samband",
+            index=models.Index(fields=["pop_a_latitude", "pop_a_longitude"], name="samband_pop_a_coords_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="samband",
+            index=models.Index(fields=["pop_b_latitude", "pop_b_longitude"], name="samband_pop_b_coords_idx"),
+        ),
+        migrations.RunPython(populate_pop_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.19 on 2025-04-24 09:12
+
+from django.db import migrations, models
+
+from praksis_nhn_nautobot.services.geo_service import calculate_distance
+
+
+def populate_length_km(apps, schema_editor):
+    """Fill the length of existing rows from their stored coordinates."""
+    Samband = apps.get_model("praksis_nhn_nautobot", "Samband")
+
+    batch = []
+    queryset = Samband.objects.filter(
+        pop_a_latitude__isnull=False,
+        pop_a_longitude__isnull=False,
+        pop_b_latitude__isnull=False,
+        pop_b_longitude__isnull=False,
+    ).only("pk", "pop_a_latitude", "pop_a_longitude", "pop_b_latitude", "pop_b_longitude")
+    for samband in queryset.iterator(chunk_size=2000):
+        samband.length_km = calculate_distance(
+            samband.pop_a_latitude, samband.pop_a_longitude, samband.pop_b_latitude, samband.pop_b_longitude
+        )
+        batch.append(samband)
+        if len(batch) >= 2000:
+            Samband.objects.bulk_update(batch, ["length_km"])
+            batch = []
+
+    if batch:
+        Samband.objects.bulk_update(batch, ["length_km"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("praksis_nhn_nautobot", "0006_samband_pop_coordinates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="samband",
+            name="length_km",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Great-circle distance between Point of Presence A and B in km",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(populate_length_km, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.19 on 2025-05-05 09:12
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("praksis_nhn_nautobot", "0007_samband_length_km"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SambandChange",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                ("samband_id", models.UUIDField(db_index=True, help_text="Primary key of the changed samband")),
+                ("deleted", models.BooleanField(default=False, help_text="Whether the samband was deleted")),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(
+                        blank=True, db_index=True, help_text="Dataset version the change committed as", null=True
+                    ),
+                ),
+                ("changed", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "verbose_name": "Samband change",
+                "verbose_name_plural": "Samband changes",
+                "ordering": ["changed"],
+            },
+        ),
+    ]
@@ -5,9 +5,11 @@ We assume that we know all 51 fields that come from the test data (Jinja).
 
 from django.core.validators import MinValueValidator
 from django.db import models
-from nautobot.apps.models import PrimaryModel
+from nautobot.apps.models import BaseModel, PrimaryModel
 from nautobot.extras.utils import extras_features
 
+from praksis_nhn_nautobot.services.geo_service import calculate_distance, parse_geo_coordinates
+
 
 # pylint: disable=too-many-ancestors
 @extras_features("custom_fields", "custom_validators", "relationships", "graphql")
@@ -62,6 +64,27 @@ class Samband(PrimaryModel):
     pop_b_map_url = models.URLField(null=True, blank=True, help_text="Map URL for Point of Presence B")
     pop_b_room = models.CharField(max_length=50, blank=True, help_text="Room identifier for Point of Presence B")
 
+    # Parsed coordinates (kept in sync with the geo strings on save)
+    pop_a_latitude = models.FloatField(
+        null=True, blank=True, editable=False, help_text="Latitude of Point of Presence A"
+    )
+    pop_a_longitude = models.FloatField(
+        null=True, blank=True, editable=False, help_text="Longitude of Point of Presence A"
+    )
+    pop_b_latitude = models.FloatField(
+        null=True, blank=True, editable=False, help_text="Latitude of Point of Presence B"
+    )
+    pop_b_longitude = models.FloatField(
+        null=True, blank=True, editable=False, help_text="Longitude of Point of Presence B"
+    )
+    length_km = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Great-circle distance between Point of Presence A and B in km",
+    )
+
     # Bandwidth Information
     bandwidth_down = models.IntegerField(
         validators=[MinValueValidator(0)], null=True, blank=True, help_text="Download bandwidth in Mbps"
@@ -135,7 +158,65 @@ class Samband(PrimaryModel):
         ordering = ["name"]
         verbose_name = "Samband"
         verbose_name_plural = "Samband"
+        indexes = [
+            models.Index(fields=["pop_a_latitude", "pop_a_longitude"], name="samband_pop_a_coords_idx"),
+            models.Index(fields=["pop_b_latitude", "pop_b_longitude"], name="samband_pop_b_coords_idx"),
+        ]
 
     def __str__(self):
         """Stringify instance."""
         return f"{self.name}"
+
+    def save(self, *args, **kwargs):
+        """Parse the PoP geo strings into the coordinate columns and the length before saving."""
+        self.pop_a_latitude, self.pop_a_longitude = parse_geo_coordinates(self.pop_a_geo_string)
+        self.pop_b_latitude, self.pop_b_longitude = parse_geo_coordinates(self.pop_b_geo_string)
+        self.length_km = self.calculate_length_km()
+
+        # Partial saves of a geo string must also write the derived columns
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "pop_a_geo_string" in update_fields:
+                update_fields |= {"pop_a_latitude", "pop_a_longitude"}
+            if "pop_b_geo_string" in update_fields:
+                update_fields |= {"pop_b_latitude", "pop_b_longitude"}
+            if update_fields & {"pop_a_geo_string", "pop_b_geo_string"}:
+                update_fields.add("length_km")
+            kwargs["update_fields"] = update_fields
+
+        super().save(*args, **kwargs)
+
+    def calculate_length_km(self):
+        """Get the great-circle distance between the PoPs, or None if either has no coordinates."""
+        coordinates = (self.pop_a_latitude, self.pop_a_longitude, self.pop_b_latitude, self.pop_b_longitude)
+        if None in coordinates:
+            return None
+        return calculate_distance(*coordinates)
+
+
+class SambandChange(BaseModel):
+    """
+    A saved or deleted samband, so that sync clients can fetch what changed since their last sync.
+
+    The change is written in the same transaction as the samband, and gets the dataset version it
+    committed as once the transaction commits.
+    """
+
+    samband_id = models.UUIDField(db_index=True, help_text="Primary key of the changed samband")
+    deleted = models.BooleanField(default=False, help_text="Whether the samband was deleted")
+    version = models.PositiveBigIntegerField(
+        null=True, blank=True, db_index=True, help_text="Dataset version the change committed as"
+    )
+    changed = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        """Meta class."""
+
+        ordering = ["changed"]
+        verbose_name = "Samband change"
+        verbose_name_plural = "Samband changes"
+
+    def __str__(self):
+        """Stringify instance."""
+        return f"{self.samband_id} ({'deleted' if self.deleted else 'saved'} in version {self.version})"
@@ -0,0 +1,182 @@
+"""Module for the shared Samband dataset version used to invalidate derived data."""
+
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+from prometheus_client import Counter
+
+from praksis_nhn_nautobot.models import SambandChange
+
+DATASET_VERSION_KEY = "praksis_nhn_nautobot:samband:version"
+DATASET_MODIFIED_KEY = "praksis_nhn_nautobot:samband:modified"
+
+# Everything cached under a dataset version key only needs to expire to free space
+VERSIONED_CACHE_TIMEOUT = 60 * 60 * 24
+
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "praksis_nhn_nautobot_response_cache_lookups_total",
+    "Lookups in the versioned response cache",
+    ["namespace", "result"],
+)
+
+
+def get_dataset_version():
+    """
+    Get the current version of the Samband dataset.
+
+    The version is stored in the Django cache so that every process sees the same value.
+
+    Returns:
+        int: The dataset version
+    """
+    version = cache.get(DATASET_VERSION_KEY)
+    if version is None:
+        # add() only sets the key if no other process beat us to it
+        cache.add(DATASET_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(DATASET_VERSION_KEY, 1)
+    return version
+
+
+def _initial_version():
+    # Continue after the last recorded change, so sync tokens stay ordered when the cache is cleared
+    return (SambandChange.objects.aggregate(Max("version"))["version__max"] or 0) + 1
+
+
+def bump_dataset_version():
+    """
+    Mark the Samband dataset as changed.
+
+    Returns:
+        int: The new dataset version
+    """
+    cache.set(DATASET_MODIFIED_KEY, timezone.now(), timeout=None)
+    try:
+        return cache.incr(DATASET_VERSION_KEY)
+    except ValueError:
+        # The key has expired or was never set
+        cache.add(DATASET_VERSION_KEY, _initial_version(), timeout=None)
+        return cache.incr(DATASET_VERSION_KEY)
+
+
+def normalize_params(params, keys):
+    """
+    Get the query parameters that matter for a cached result in a stable order.
+
+    Multi-value parameters are sorted, so ?vendor=A&vendor=B and ?vendor=B&vendor=A give the same result.
+    Empty values are kept, since ?vendor= filters on a blank vendor rather than on none.
+
+    Args:
+        params (QueryDict): The request query parameters
+        keys (iterable): Names of the parameters to keep
+
+    Returns:
+        list: Sorted (key, sorted values) tuples, leaving out parameters that are not given
+    """
+    normalized = []
+    for key in sorted(set(keys)):
+        values = sorted(params.getlist(key))
+        if values:
+            normalized.append((key, values))
+    return normalized
+
+
+def versioned_cache_key(namespace, params, keys, *parts):
+    """
+    Build a cache key that changes with the dataset version and the normalized query parameters.
+
+    Args:
+        namespace (str): What is being cached, e.g. "map-tile"
+        params (QueryDict): The request query parameters
+        keys (iterable): Names of the parameters that change the cached result
+        *parts (str): Extra key parts, e.g. the tile coordinates
+
+    Returns:
+        str: The cache key
+    """
+    query = urlencode(normalize_params(params, keys), doseq=True)
+    digest = hashlib.sha256(query.encode()).hexdigest()[:32]
+    return ":".join(["praksis_nhn_nautobot", namespace, str(get_dataset_version()), *map(str, parts), digest])
+
+
+def get_or_build(namespace, cache_key, build, timeout=VERSIONED_CACHE_TIMEOUT):
+    """
+    Get a response from the cache, building and caching it on a miss.
+
+    Hits and misses are counted in the RESPONSE_CACHE_LOOKUPS metric.
+
+    Args:
+        namespace (str): What is being cached, the metric label, e.g. "map-data"
+        cache_key (str): Cache key, see versioned_cache_key
+        build (callable): Called without arguments to build the response on a miss
+        timeout (int, optional): Seconds to keep the response. Defaults to VERSIONED_CACHE_TIMEOUT.
+
+    Returns:
+        The cached or newly built response
+    """
+    value = cache.get(cache_key)
+    if value is not None:
+        RESPONSE_CACHE_LOOKUPS.labels(namespace=namespace, result="hit").inc()
+        return value
+
+    RESPONSE_CACHE_LOOKUPS.labels(namespace=namespace, result="miss").inc()
+    value = build()
+    cache.set(cache_key, value, timeout)
+    return value
+
+
+def get_dataset_modified():
+    """
+    Get when the Samband dataset last changed.
+
+    Returns:
+        datetime: Time of the last change, or None if none has been seen since the cache was cleared
+    """
+    return cache.get(DATASET_MODIFIED_KEY)
+
+
+def dataset_etag(request, *args, **kwargs):
+    """
+    Build a weak ETag for a response that only depends on the dataset, the URL and the user.
+
+    Args:
+        request (HttpRequest): The request
+        *args: Positional arguments of the view, unused
+        **kwargs: Keyword arguments of the view, unused
+
+    Returns:
+        str: The ETag
+    """
+    query = urlencode(normalize_params(request.GET, request.GET.keys()), doseq=True)
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and user.is_authenticated else ""
+    digest = hashlib.sha256(f"{request.path}?{query}|{user_id}".encode()).hexdigest()[:32]
+    return f'W/"{get_dataset_version()}-{digest}"'
+
+
+def dataset_last_modified(request, *args, **kwargs):  # pylint: disable=unused-argument
+    """Last-Modified time of a response that only depends on the dataset, see get_dataset_modified."""
+    return get_dataset_modified()
+
+
+def conditional_on_dataset(view_func):
+    """
+    Decorate a view so that unchanged GET requests are answered with 304 Not Modified.
+
+    The ETag and Last-Modified headers come from the dataset version, so a response is reused
+    until a Samband is saved or deleted. Clients are asked to revalidate on every use.
+    """
+    conditional_view = condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified)(view_func)
+
+    @wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapped_view
@@ -0,0 +1,336 @@
+"""Module for publishing Samband change events to live subscribers, such as the map and graph pages."""
+
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from praksis_nhn_nautobot.models import Samband
+
+logger = logging.getLogger(__name__)
+
+# Name of the Redis channel that carries the events
+EVENT_CHANNEL = "praksis_nhn_nautobot:samband-events"
+
+# Event streams a worker process serves at once unless the app settings say otherwise
+DEFAULT_MAX_STREAMS = 0
+
+# Samband fields sent with a save event, as named in the graph nodes: key -> field
+EVENT_FIELDS = {
+    "name": "name",
+    "type": "type",
+    "status": "status",
+    "sambandsnummer": "sambandsnummer",
+    "bandwidth": "bandwidth_string",
+    "vendor": "vendor",
+    "location": "location",
+    "transporttype": "transporttype",
+}
+
+
+class RedisBroker:
+    """Broker that sends events through Redis pub/sub, so every worker process receives them."""
+
+    def __init__(self, url):
+        """
+        Connect the broker to Redis.
+
+        Args:
+            url (str): The Redis URL, e.g. redis://localhost:6379/0
+        """
+        import redis  # pylint: disable=import-outside-toplevel
+
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, event):
+        """
+        Send an event to every subscriber.
+
+        Args:
+            event (dict): The event
+        """
+        self.client.publish(EVENT_CHANNEL, json.dumps(event))
+
+    def subscribe(self):
+        """
+        Start receiving events.
+
+        Returns:
+            RedisSubscription: The subscription, to be closed when done
+        """
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(EVENT_CHANNEL)
+        return RedisSubscription(pubsub)
+
+
+class RedisSubscription:
+    """Events published to a RedisBroker since subscribing."""
+
+    def __init__(self, pubsub):
+        """Wrap a subscribed Redis PubSub."""
+        self.pubsub = pubsub
+
+    def get(self, timeout):
+        """
+        Wait for the next event.
+
+        Args:
+            timeout (float): Seconds to wait
+
+        Returns:
+            dict: The event, or None if none came in time
+        """
+        message = self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    def close(self):
+        """Stop receiving events."""
+        self.pubsub.close()
+
+
+class EventStream:
+    """Server-Sent Events for one client, holding one of the process's stream slots until closed."""
+
+    def __init__(self, user, subscription, slots, seconds, keepalive):
+        """
+        Create the stream.
+
+        Args:
+            user (User): The user the stream is for, who only gets events for sambands they may view
+            subscription (RedisSubscription): The subscription the events come from
+            slots (BoundedSemaphore): The stream slots of the process, one of them acquired for this stream
+            seconds (float): Seconds before the stream ends, so it does not hold a worker forever
+            keepalive (float): Seconds between comments that keep idle connections open through proxies
+        """
+        self.user = user
+        self.subscription = subscription
+        self.slots = slots
+        self.seconds = seconds
+        self.keepalive = keepalive
+        self.closed = False
+
+    def __iter__(self):
+        """
+        Yield the events published while the client is connected.
+
+        Yields:
+            str: Server-Sent Events messages and keepalive comments
+        """
+        yield "retry: 5000\n\n"
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            event = self.subscription.get(timeout=self.keepalive)
+            if event is None:
+                yield ": keepalive\n\n"
+            elif can_view(self.user, event):
+                yield format_sse(event)
+
+    def close(self):
+        """Stop receiving events and free the slot, called by Django when the response is closed."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.subscription.close()
+        finally:
+            self.slots.release()
+
+
+_broker = None
+_broker_checked = False
+_broker_lock = threading.Lock()
+_stream_slots = None
+
+
+def get_redis_url():
+    """
+    Get the URL of the Redis that carries the events between worker processes.
+
+    PLUGINS_CONFIG["praksis_nhn_nautobot"]["event_redis_url"] when set, otherwise the Redis that
+    Nautobot already uses for its cache or Celery broker.
+
+    Returns:
+        str: The Redis URL, or None if there is no Redis
+    """
+    url = settings.PLUGINS_CONFIG.get("praksis_nhn_nautobot", {}).get("event_redis_url")
+    if url:
+        return url
+    cache = getattr(settings, "CACHES", {}).get("default", {})
+    location = cache.get("LOCATION")
+    if "redis" in cache.get("BACKEND", "").lower() and isinstance(location, str):
+        return location
+    broker_url = getattr(settings, "CELERY_BROKER_URL", None)
+    if isinstance(broker_url, str) and broker_url.startswith(("redis://", "rediss://", "unix://")):
+        return broker_url
+    return None
+
+
+def get_broker():
+    """
+    Get the event broker of this process.
+
+    Events only go through Redis, since events published in one worker process must reach the
+    streams of every other one.
+
+    Returns:
+        RedisBroker: The broker, or None if there is no Redis
+    """
+    global _broker, _broker_checked  # pylint: disable=global-statement
+
+    if not _broker_checked:
+        with _broker_lock:
+            if not _broker_checked:
+                url = get_redis_url()
+                _broker = RedisBroker(url) if url else None
+                _broker_checked = True
+    return _broker
+
+
+def get_max_streams():
+    """
+    Get how many event streams a worker process serves at once.
+
+    Each stream holds a worker thread for as long as it is open, so this must stay below the
+    threads of a worker process. Configured as PLUGINS_CONFIG["praksis_nhn_nautobot"]["event_max_streams"],
+    0 turns the streams off and the pages poll the sync API instead.
+
+    Returns:
+        int: The number of streams
+    """
+    max_streams = settings.PLUGINS_CONFIG.get("praksis_nhn_nautobot", {}).get("event_max_streams")
+    return DEFAULT_MAX_STREAMS if max_streams is None else max_streams
+
+
+def open_stream(user, seconds, keepalive):
+    """
+    Open an event stream for a client, if this process can serve one.
+
+    Args:
+        user (User): The user the stream is for
+        seconds (float): Seconds before the stream ends
+        keepalive (float): Seconds between keepalive comments
+
+    Returns:
+        EventStream: The stream, or None if there is no broker or every stream slot is taken
+    """
+    global _stream_slots  # pylint: disable=global-statement
+
+    broker = get_broker()
+    max_streams = get_max_streams()
+    if broker is None or max_streams <= 0:
+        return None
+    with _broker_lock:
+        if _stream_slots is None:
+            _stream_slots = threading.BoundedSemaphore(max_streams)
+    if not _stream_slots.acquire(blocking=False):
+        return None
+    try:
+        subscription = broker.subscribe()
+    except Exception:  # pylint: disable=broad-exception-caught
+        _stream_slots.release()
+        logger.warning("Could not subscribe to the samband events", exc_info=True)
+        return None
+    return EventStream(user, subscription, _stream_slots, seconds, keepalive)
+
+
+def publish(event):
+    """
+    Publish an event to the live subscribers.
+
+    Called once the change has committed, so subscribers never see rolled back changes. Nothing is
+    published while the streams are off or without a broker, and a broker that cannot be reached is
+    logged and does not fail the change.
+
+    Args:
+        event (dict): The event
+    """
+    if get_max_streams() <= 0:
+        return
+    broker = get_broker()
+    if broker is None:
+        return
+    try:
+        broker.publish(event)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.warning("Could not publish %s event for samband %s", event["type"], event["id"], exc_info=True)
+
+
+def saved_event(samband, version):
+    """
+    Build the event for a saved samband.
+
+    Args:
+        samband (Samband): The saved samband
+        version (int): The dataset version after the save
+
+    Returns:
+        dict: The event
+    """
+    event = {"type": "saved", "id": str(samband.pk), "version": version}
+    event.update({key: getattr(samband, field) for key, field in EVENT_FIELDS.items()})
+    return event
+
+
+def deleted_event(pk, version):
+    """
+    Build the event for a deleted samband.
+
+    Args:
+        pk (UUID): Primary key of the deleted samband
+        version (int): The dataset version after the delete
+
+    Returns:
+        dict: The event
+    """
+    return {"type": "deleted", "id": str(pk), "version": version}
+
+
+def parents_event(pk, parent_pks, version):
+    """
+    Build the event for a samband whose parents changed.
+
+    Args:
+        pk (UUID): Primary key of the samband
+        parent_pks (iterable): Primary keys of all its parents after the change
+        version (int): The dataset version after the change
+
+    Returns:
+        dict: The event
+    """
+    return {"type": "parents", "id": str(pk), "parents": [str(parent) for parent in parent_pks], "version": version}
+
+
+def can_view(user, event):
+    """
+    Check whether a user may receive an event.
+
+    Args:
+        user (User): The user of the stream
+        event (dict): The event
+
+    Returns:
+        bool: True if the user may view the samband of the event. Deleted sambands can no longer be
+            checked, and their events only hold the id, so they are sent to everyone.
+    """
+    if event["type"] == "deleted":
+        return True
+    return Samband.objects.restrict(user, "view").filter(pk=event["id"]).exists()
+
+
+def format_sse(event):
+    """
+    Format an event as a Server-Sent Events message.
+
+    The dataset version is the message id and the event type is the SSE event name.
+
+    Args:
+        event (dict): The event
+
+    Returns:
+        str: The message
+    """
+    return f"id: {event['version']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
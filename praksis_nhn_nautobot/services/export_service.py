@@ -0,0 +1,93 @@
+"""Module for exporting Samband connections to other formats."""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from praksis_nhn_nautobot.models import Samband
+
+# Properties written for each connection when the caller does not pick any
+GEOJSON_DEFAULT_PROPERTIES = (
+    "name",
+    "status",
+    "type",
+    "vendor",
+    "location",
+    "location_type",
+    "transporttype",
+    "bandwidth_string",
+    "sambandsnummer",
+)
+
+
+def geojson_property_choices():
+    """Get the Samband fields that can be exported as GeoJSON properties."""
+    return [field.name for field in Samband._meta.concrete_fields if not field.is_relation]
+
+
+def parse_geojson_properties(values):
+    """
+    Resolve the requested GeoJSON properties.
+
+    Args:
+        values (list): Field names from the request, each may also be a comma-separated list
+
+    Returns:
+        list: The field names to export, the defaults if none were requested
+
+    Raises:
+        ValueError: If a field name is not an exportable Samband field
+    """
+    properties = [name.strip() for value in values for name in value.split(",") if name.strip()]
+    if not properties:
+        return list(GEOJSON_DEFAULT_PROPERTIES)
+
+    unknown = sorted(set(properties) - set(geojson_property_choices()))
+    if unknown:
+        raise ValueError(f"Unknown properties: {', '.join(unknown)}")
+    # Keep the requested order but drop duplicates
+    return list(dict.fromkeys(properties))
+
+
+def iter_geojson(sambands, properties, chunk_size=2000):
+    """
+    Stream sambands as a GeoJSON FeatureCollection of LineStrings from PoP A to PoP B.
+
+    Rows are read with queryset.iterator() and written one feature at a time, so memory use stays
+    flat for any number of connections. Connections without coordinates for both PoPs are skipped.
+
+    Args:
+        sambands (QuerySet): The sambands to export
+        properties (list): Field names to write as feature properties
+        chunk_size (int, optional): Rows fetched from the database at a time. Defaults to 2000.
+
+    Yields:
+        str: Consecutive pieces of the GeoJSON document
+    """
+    rows = sambands.filter(
+        pop_a_latitude__isnull=False,
+        pop_a_longitude__isnull=False,
+        pop_b_latitude__isnull=False,
+        pop_b_longitude__isnull=False,
+    ).values_list(
+        "pk",
+        "pop_a_latitude",
+        "pop_a_longitude",
+        "pop_b_latitude",
+        "pop_b_longitude",
+        *properties,
+    )
+
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ""
+    for pk, a_lat, a_lng, b_lat, b_lng, *values in rows.iterator(chunk_size=chunk_size):
+        feature = {
+            "type": "Feature",
+            "id": str(pk),
+            # GeoJSON positions are [longitude, latitude]
+            "geometry": {"type": "LineString", "coordinates": [[a_lng, a_lat], [b_lng, b_lat]]},
+            "properties": dict(zip(properties, values)),
+        }
+        yield separator + json.dumps(feature, cls=DjangoJSONEncoder)
+        separator = ","
+    yield "]}"
@@ -0,0 +1,55 @@
+"""Module for counting the Samband connections per value of the filter fields."""
+
+from collections import Counter
+
+from django.db.models import Count
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.cache_service import get_dataset_version, get_or_build
+
+# Fields that the map and list filters offer the values of
+FACET_FIELDS = ("vendor", "status", "location", "location_type", "transporttype", "type")
+
+
+def compute_facets(sambands, selected=None):
+    """
+    Count the sambands per value of every facet field in one grouped query.
+
+    The database groups the sambands by the combination of all facet fields, and the counts per
+    field are summed from those groups. With selected values, the counts of each field only
+    include the sambands that match the selections in the other fields, so every value shows how
+    many sambands there would be if it was selected as well.
+
+    Args:
+        sambands (QuerySet): The sambands to count
+        selected (dict, optional): Selected values by facet field. Defaults to None.
+
+    Returns:
+        dict: For each facet field, a list of {"value", "count"} sorted by value. Empty values are left out.
+    """
+    selected = {field: set(values) for field, values in (selected or {}).items() if values}
+    counts = {field: Counter() for field in FACET_FIELDS}
+
+    groups = sambands.order_by().values(*FACET_FIELDS).annotate(count=Count("pk"))
+    for group in groups:
+        unmatched = [field for field, values in selected.items() if group[field] not in values]
+        for field in FACET_FIELDS:
+            # A group counts for a field when every other field's selection matches it
+            if not unmatched or unmatched == [field]:
+                counts[field][group[field]] += group["count"]
+
+    return {
+        field: [{"value": value, "count": count} for value, count in sorted(counts[field].items()) if value]
+        for field in FACET_FIELDS
+    }
+
+
+def get_facets():
+    """
+    Get the facets of all sambands, cached until the dataset changes.
+
+    Returns:
+        dict: Facets, see compute_facets
+    """
+    cache_key = f"praksis_nhn_nautobot:facets:{get_dataset_version()}"
+    return get_or_build("facets", cache_key, lambda: compute_facets(Samband.objects.all()))
@@ -0,0 +1,394 @@
+"""Module for parsing and measuring the geographic coordinates of Samband instances."""
+
+import logging
+import re
+from functools import lru_cache
+from math import asin, cos, degrees, radians, sin, sqrt
+
+import numpy as np
+from prometheus_client import Counter
+
+from praksis_nhn_nautobot.services.timing_service import timed
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371
+
+# Deepest zoom level the grid cells are sized for, the cell indices of any latitude fit an int64 well below it
+MAX_ZOOM = 30
+
+
+# One coordinate: optional hemisphere, signed degrees, optional minutes and seconds, optional hemisphere
+_COORDINATE_PATTERN = r"""
+    (?:(?P<{name}_hemisphere_before>[NSEW])\s*)?
+    (?P<{name}_degrees>[-+]?\d+(?:\.\d+)?)\s*
+    (?:[°º]\s*
+        (?:(?P<{name}_minutes>\d+(?:\.\d+)?)\s*['′’]\s*
+            (?:(?P<{name}_seconds>\d+(?:\.\d+)?)\s*(?:["″”]|'')\s*)?
+        )?
+    )?
+    (?P<{name}_hemisphere_after>[NSEW])?
+"""
+
+# "59.9139, 10.7522", "60.3927° N, 5.3245° E" and "59°54'50.0\"N 10°45'08.0\"E" in a single match,
+# optionally followed by an altitude that is ignored, as in "59.9139,10.7522,100"
+GEO_STRING_RE = re.compile(
+    r"^\s*"
+    + _COORDINATE_PATTERN.format(name="first")
+    + r"\s*(?:[,;]\s*|\s+)"
+    + _COORDINATE_PATTERN.format(name="second")
+    + r"(?:\s*,\s*[-+]?\d+(?:\.\d+)?\s*m?)?"
+    + r"\s*$",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+GEO_PARSE_ERRORS = Counter(
+    "praksis_nhn_nautobot_geo_parse_errors_total",
+    "Geo strings that could not be parsed into coordinates",
+    ["reason"],
+)
+
+
+def parse_geo_coordinates(geo_string):
+    r"""
+    Parse geographic coordinates in various formats.
+
+    Handles decimal degrees ("59.9139, 10.7522"), degrees with hemispheres ("60.3927° N, 5.3245° E")
+    and degrees, minutes and seconds ("59°54'50.0\"N 10°45'08.0\"E"). A trailing altitude after a
+    comma ("59.9139, 10.7522, 100") is ignored. Results are memoized on the raw string. Strings that
+    cannot be parsed are counted in the GEO_PARSE_ERRORS metric.
+
+    Args:
+        geo_string (str): The geo string
+
+    Returns:
+        tuple: (latitude, longitude), or (None, None) if the string is empty or cannot be parsed
+    """
+    if not geo_string:
+        return None, None
+
+    with timed("geo"):
+        lat, lng, error = _parse_geo_string(geo_string)
+    if error:
+        GEO_PARSE_ERRORS.labels(reason=error).inc()
+        logger.debug("Could not parse geo string %r: %s", geo_string, error)
+    return lat, lng
+
+
+def parse_geo_coordinates_batch(geo_strings):
+    """
+    Parse many geo strings, see parse_geo_coordinates.
+
+    Args:
+        geo_strings (iterable): The geo strings, duplicates are only parsed once
+
+    Returns:
+        list: (latitude, longitude) tuples in the order of geo_strings
+    """
+    parsed = {}
+    result = []
+    for geo_string in geo_strings:
+        if geo_string not in parsed:
+            parsed[geo_string] = parse_geo_coordinates(geo_string)
+        result.append(parsed[geo_string])
+    return result
+
+
+@lru_cache(maxsize=8192)
+def _parse_geo_string(geo_string):
+    """Parse a non-empty geo string into (lat, lng, error), where error names why parsing failed."""
+    match = GEO_STRING_RE.match(geo_string)
+    if not match:
+        return None, None, "format"
+
+    first, first_hemisphere = _coordinate_value(match, "first")
+    second, second_hemisphere = _coordinate_value(match, "second")
+    if first is None or second is None:
+        return None, None, "format"
+
+    # "10.7522° E, 59.9139° N" names its hemispheres, so the order can be swapped safely
+    if first_hemisphere in ("E", "W") and second_hemisphere in (None, "N", "S"):
+        first, second = second, first
+        first_hemisphere, second_hemisphere = second_hemisphere, first_hemisphere
+    if first_hemisphere in ("E", "W") or second_hemisphere in ("N", "S"):
+        return None, None, "hemisphere"
+
+    if not (-90 <= first <= 90 and -180 <= second <= 180):
+        return None, None, "range"
+    return first, second, None
+
+
+def _coordinate_value(match, name):
+    """Get the signed decimal degrees and the hemisphere letter of one matched coordinate."""
+    before = match.group(f"{name}_hemisphere_before")
+    after = match.group(f"{name}_hemisphere_after")
+    if before and after:
+        return None, None
+    hemisphere = (before or after or "").upper() or None
+
+    minutes = float(match.group(f"{name}_minutes") or 0)
+    seconds = float(match.group(f"{name}_seconds") or 0)
+    if minutes >= 60 or seconds >= 60:
+        return None, None
+
+    degrees_text = match.group(f"{name}_degrees")
+    value = abs(float(degrees_text)) + minutes / 60 + seconds / 3600
+    if degrees_text.startswith("-") or hemisphere in ("S", "W"):
+        value = -value
+    return value, hemisphere
+
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """Calculate the distance between two points using Haversine formula."""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * asin(sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Get the latitude/longitude box that encloses a circle on the earth's surface.
+
+    Every point within radius_km of (lat, lng) lies inside the box, so it can be used as a
+    cheap database prefilter before the exact Haversine check.
+
+    Args:
+        lat (float): Latitude of the circle centre
+        lng (float): Longitude of the circle centre
+        radius_km (float): Radius of the circle in kilometres
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng)
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    delta_lat = degrees(angular_radius)
+    min_lat = lat - delta_lat
+    max_lat = lat + delta_lat
+
+    # Near the poles or across the antimeridian the circle spans every longitude
+    if min_lat <= -90 or max_lat >= 90 or angular_radius >= radians(90):
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    delta_lng = degrees(asin(min(1.0, sin(angular_radius) / cos(radians(lat)))))
+    min_lng = lng - delta_lng
+    max_lng = lng + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def parse_bbox(bbox_string):
+    """
+    Parse a Leaflet style "west,south,east,north" bounding box string.
+
+    Args:
+        bbox_string (str): The bounding box, as produced by LatLngBounds.toBBoxString()
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng)
+
+    Raises:
+        ValueError: If the string is not four numbers or describes an empty box
+    """
+    parts = bbox_string.split(",")
+    if len(parts) != 4:
+        raise ValueError(f"Expected 'west,south,east,north', got '{bbox_string}'")
+
+    west, south, east, north = (float(part) for part in parts)
+    if south > north or west > east:
+        raise ValueError(f"Empty bounding box '{bbox_string}'")
+
+    return max(south, -90.0), min(north, 90.0), max(west, -180.0), min(east, 180.0)
+
+
+def haversine_distances(center_lat, center_lng, lats, lngs):
+    """
+    Calculate the Haversine distance from one centre to many points in a single NumPy pass.
+
+    Args:
+        center_lat (float): Latitude of the centre
+        center_lng (float): Longitude of the centre
+        lats (numpy.ndarray): Latitudes of the points
+        lngs (numpy.ndarray): Longitudes of the points
+
+    Returns:
+        numpy.ndarray: Distances in kilometres, NaN where a coordinate is missing
+    """
+    lat1 = radians(center_lat)
+    lng1 = radians(center_lng)
+    lat2 = np.radians(lats)
+    lng2 = np.radians(lngs)
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def clamp_zoom(zoom):
+    """
+    Limit a zoom level to the levels the grids are sized for.
+
+    Args:
+        zoom (int): Web map zoom level
+
+    Returns:
+        int: The zoom level within 0..MAX_ZOOM
+    """
+    return min(max(zoom, 0), MAX_ZOOM)
+
+
+def cluster_cell_size(zoom, latitude, cell_px=64):
+    """
+    Get the grid cell size in degrees that covers roughly cell_px screen pixels at a zoom level.
+
+    Args:
+        zoom (int): Web map zoom level, where the world is 256 * 2**zoom pixels wide, clamped to 0..MAX_ZOOM
+        latitude (float): Latitude the cells are viewed at, to keep them square on screen
+        cell_px (int, optional): Cell size in pixels. Defaults to 64.
+
+    Returns:
+        tuple: (cell_lat, cell_lng) in degrees
+    """
+    zoom = clamp_zoom(zoom)
+    cell_lng = 360.0 / (2**zoom) * cell_px / 256
+    # Web Mercator stretches latitude by 1/cos(latitude), so shrink the cell height to match
+    cell_lat = cell_lng * max(cos(radians(latitude)), 0.01)
+    return cell_lat, cell_lng
+
+
+def cluster_points(lats, lngs, cell_lat, cell_lng):
+    """
+    Group points into grid cells in a single NumPy pass.
+
+    Args:
+        lats (numpy.ndarray): Latitudes of the points
+        lngs (numpy.ndarray): Longitudes of the points
+        cell_lat (float): Cell height in degrees
+        cell_lng (float): Cell width in degrees
+
+    Returns:
+        list: One dict per non-empty cell with the centroid 'location', the point 'count' and
+            the 'bounds' [[south, west], [north, east]] of its points
+    """
+    if len(lats) == 0:
+        return []
+
+    cells = np.stack([np.floor(lats / cell_lat), np.floor(lngs / cell_lng)], axis=1).astype(np.int64)
+    _, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    group_count = inverse.max() + 1
+
+    counts = np.bincount(inverse, minlength=group_count)
+    mean_lats = np.bincount(inverse, weights=lats, minlength=group_count) / counts
+    mean_lngs = np.bincount(inverse, weights=lngs, minlength=group_count) / counts
+
+    south = np.full(group_count, np.inf)
+    north = np.full(group_count, -np.inf)
+    west = np.full(group_count, np.inf)
+    east = np.full(group_count, -np.inf)
+    np.minimum.at(south, inverse, lats)
+    np.maximum.at(north, inverse, lats)
+    np.minimum.at(west, inverse, lngs)
+    np.maximum.at(east, inverse, lngs)
+
+    return [
+        {
+            "location": [float(mean_lats[i]), float(mean_lngs[i])],
+            "count": int(counts[i]),
+            "bounds": [[float(south[i]), float(west[i])], [float(north[i]), float(east[i])]],
+        }
+        for i in range(group_count)
+    ]
+
+
+def grid_density(lats, lngs, cell_lat, cell_lng, weights=None):
+    """
+    Sum points per grid cell in a single NumPy pass.
+
+    Args:
+        lats (numpy.ndarray): Latitudes of the points
+        lngs (numpy.ndarray): Longitudes of the points
+        cell_lat (float): Cell height in degrees
+        cell_lng (float): Cell width in degrees
+        weights (numpy.ndarray, optional): Weight of each point, NaN counts as 0. Defaults to 1 per point.
+
+    Returns:
+        tuple: (center_lats, center_lngs, counts, totals) arrays with one entry per non-empty cell
+    """
+    if len(lats) == 0:
+        empty = np.array([], dtype=float)
+        return empty, empty, np.array([], dtype=np.int64), empty
+
+    cells = np.stack([np.floor(lats / cell_lat), np.floor(lngs / cell_lng)], axis=1).astype(np.int64)
+    unique_cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    counts = np.bincount(inverse, minlength=len(unique_cells))
+    if weights is None:
+        totals = counts.astype(float)
+    else:
+        totals = np.bincount(inverse, weights=np.nan_to_num(weights), minlength=len(unique_cells))
+
+    center_lats = (unique_cells[:, 0] + 0.5) * cell_lat
+    center_lngs = (unique_cells[:, 1] + 0.5) * cell_lng
+    return center_lats, center_lngs, counts, totals
+
+
+def mercator_y(lats):
+    """
+    Project latitudes to Web Mercator y, in radians.
+
+    Leaflet draws a connection as a straight line in this projection, so line/box checks are done in it.
+
+    Args:
+        lats (numpy.ndarray): Latitudes, clamped to the Web Mercator limit of about 85.05 degrees
+
+    Returns:
+        numpy.ndarray: The projected y values, growing northwards
+    """
+    return np.arcsinh(np.tan(np.radians(np.clip(lats, -85.0511, 85.0511))))
+
+
+def segments_intersect_bbox(a_lats, a_lngs, b_lats, b_lngs, min_lat, max_lat, min_lng, max_lng):
+    """
+    Find the PoP A to PoP B lines that touch a latitude/longitude box, as drawn on a Web Mercator map.
+
+    Uses a vectorized Liang-Barsky clip, so lines that cross the box with both PoPs outside it match too.
+
+    Args:
+        a_lats (numpy.ndarray): Latitudes of PoP A, NaN where a coordinate is missing
+        a_lngs (numpy.ndarray): Longitudes of PoP A, NaN where a coordinate is missing
+        b_lats (numpy.ndarray): Latitudes of PoP B, NaN where a coordinate is missing
+        b_lngs (numpy.ndarray): Longitudes of PoP B, NaN where a coordinate is missing
+        min_lat (float): South edge of the box
+        max_lat (float): North edge of the box
+        min_lng (float): West edge of the box
+        max_lng (float): East edge of the box
+
+    Returns:
+        numpy.ndarray: True for the lines that touch the box, False where a coordinate is missing
+    """
+    x0 = np.asarray(a_lngs, dtype=float)
+    y0 = mercator_y(np.asarray(a_lats, dtype=float))
+    dx = np.asarray(b_lngs, dtype=float) - x0
+    dy = mercator_y(np.asarray(b_lats, dtype=float)) - y0
+    min_y, max_y = mercator_y(np.array([min_lat, max_lat]))
+
+    t_enter = np.zeros(len(x0))
+    t_exit = np.ones(len(x0))
+    # NaN comparisons are False, so lines with a missing coordinate are rejected
+    touches = ~(np.isnan(x0) | np.isnan(y0) | np.isnan(dx) | np.isnan(dy))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x0 - min_lng), (dx, max_lng - x0), (-dy, y0 - min_y), (dy, max_y - y0)):
+            # A line parallel to this edge touches the box only if it runs on the inner side
+            touches &= (p != 0) | (q >= 0)
+            t = q / p
+            t_enter = np.where(p < 0, np.maximum(t_enter, t), t_enter)
+            t_exit = np.where(p > 0, np.minimum(t_exit, t), t_exit)
+
+    return touches & (t_enter <= t_exit)
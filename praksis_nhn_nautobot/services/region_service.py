@@ -0,0 +1,263 @@
+"""Module for filtering Samband connections by polygons and named regions."""
+
+import hashlib
+import json
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.cache_service import get_dataset_version, get_or_build
+
+# Upper limit for points x polygon edges compared in one NumPy operation
+_PIP_CHUNK_CELLS = 1_000_000
+
+
+def parse_polygon(geojson):
+    """
+    Read the polygons of a GeoJSON object.
+
+    Args:
+        geojson (str | dict): A Polygon or MultiPolygon geometry, a Feature with one, or a
+            FeatureCollection of those
+
+    Returns:
+        list: Polygons, each a list of closed rings as (n, 2) arrays of [longitude, latitude]
+
+    Raises:
+        ValueError: If the object is not valid JSON or holds no polygon
+    """
+    if isinstance(geojson, str):
+        try:
+            geojson = json.loads(geojson)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid GeoJSON: {e}") from e
+    if not isinstance(geojson, dict):
+        raise ValueError("GeoJSON must be an object")
+
+    geometry_type = geojson.get("type")
+    if geometry_type == "FeatureCollection":
+        polygons = [polygon for feature in geojson.get("features") or [] for polygon in parse_polygon(feature)]
+        if not polygons:
+            raise ValueError("FeatureCollection has no polygons")
+        return polygons
+    if geometry_type == "Feature":
+        return parse_polygon(geojson.get("geometry") or {})
+    if geometry_type == "Polygon":
+        polygons = [geojson.get("coordinates")]
+    elif geometry_type == "MultiPolygon":
+        polygons = geojson.get("coordinates")
+    else:
+        raise ValueError(f"Expected a Polygon or MultiPolygon, got {geometry_type}")
+
+    try:
+        result = [[_closed_ring(ring) for ring in polygon] for polygon in polygons]
+    except (TypeError, ValueError, IndexError) as e:
+        raise ValueError(f"Invalid polygon coordinates: {e}") from e
+    if not result or not all(result):
+        raise ValueError("Polygon has no rings")
+    return result
+
+
+def _closed_ring(ring):
+    ring = np.asarray(ring, dtype=float)[:, :2]
+    if len(ring) < 3:
+        raise ValueError("A ring needs at least three positions")
+    if not np.array_equal(ring[0], ring[-1]):
+        ring = np.vstack([ring, ring[:1]])
+    return ring
+
+
+def polygons_bbox(polygons):
+    """
+    Get the latitude/longitude box around polygons.
+
+    Args:
+        polygons (list): Polygons, see parse_polygon
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng)
+    """
+    # The outer ring of each polygon encloses its holes
+    points = np.vstack([polygon[0] for polygon in polygons])
+    return points[:, 1].min(), points[:, 1].max(), points[:, 0].min(), points[:, 0].max()
+
+
+def points_in_polygons(lats, lngs, polygons):
+    """
+    Test many points against polygons in NumPy passes using the even-odd rule.
+
+    Holes are handled by counting crossings over every ring of a polygon.
+
+    Args:
+        lats (numpy.ndarray): Latitudes of the points
+        lngs (numpy.ndarray): Longitudes of the points
+        polygons (list): Polygons, see parse_polygon
+
+    Returns:
+        numpy.ndarray: True for the points inside any of the polygons
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    inside = np.zeros(len(lats), dtype=bool)
+
+    for polygon in polygons:
+        edges = np.vstack([np.hstack([ring[:-1], ring[1:]]) for ring in polygon])
+        x1, y1, x2, y2 = (edges[:, i] for i in range(4))
+        # Edges parallel to the ray never cross it, avoid dividing by zero for them
+        dy = np.where(y1 == y2, np.inf, y2 - y1)
+
+        chunk = max(1, _PIP_CHUNK_CELLS // len(edges))
+        for start in range(0, len(lats), chunk):
+            py = lats[start : start + chunk, None]
+            px = lngs[start : start + chunk, None]
+            # A ray going east from the point crosses the edge
+            with np.errstate(invalid="ignore"):
+                crosses = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * (x2 - x1) / dy)
+            inside[start : start + chunk] |= np.count_nonzero(crosses, axis=1) % 2 == 1
+
+    return inside
+
+
+def filter_by_polygons(sambands, polygons):
+    """
+    Keep the sambands with PoP A or PoP B inside the polygons.
+
+    The database first narrows the sambands down to those with a PoP in the polygons' bounding
+    box, then the remaining PoPs are tested against the polygons in one NumPy pass.
+
+    Args:
+        sambands (QuerySet): The sambands to filter
+        polygons (list): Polygons, see parse_polygon
+
+    Returns:
+        QuerySet: The matching sambands
+    """
+    return sambands.filter(pk__in=_pks_in_polygons(sambands, polygons))
+
+
+def _pks_in_polygons(sambands, polygons):
+    min_lat, max_lat, min_lng, max_lng = polygons_bbox(polygons)
+    rows = sambands.filter(
+        Q(
+            pop_a_latitude__range=(min_lat, max_lat),
+            pop_a_longitude__range=(min_lng, max_lng),
+        )
+        | Q(
+            pop_b_latitude__range=(min_lat, max_lat),
+            pop_b_longitude__range=(min_lng, max_lng),
+        )
+    ).values_list("pk", "pop_a_latitude", "pop_a_longitude", "pop_b_latitude", "pop_b_longitude")
+
+    pks = []
+    coordinates = []
+    for pk, *row in rows.iterator(chunk_size=2000):
+        pks.append(pk)
+        coordinates.append([np.nan if value is None else value for value in row])
+    if not pks:
+        return []
+
+    coordinates = np.array(coordinates, dtype=float)
+    # NaN coordinates never cross an edge, so PoPs without coordinates are never inside
+    inside = points_in_polygons(coordinates[:, 0], coordinates[:, 1], polygons) | points_in_polygons(
+        coordinates[:, 2], coordinates[:, 3], polygons
+    )
+    return [pk for pk, match in zip(pks, inside) if match]
+
+
+def get_regions():
+    """
+    Get the named regions from the app settings.
+
+    Regions are configured as PLUGINS_CONFIG["praksis_nhn_nautobot"]["regions"], a dict of
+    region name to a GeoJSON Polygon, MultiPolygon, Feature or FeatureCollection.
+
+    Returns:
+        dict: GeoJSON objects keyed by region name
+    """
+    return settings.PLUGINS_CONFIG.get("praksis_nhn_nautobot", {}).get("regions") or {}
+
+
+def get_region_members(name):
+    """
+    Get the sambands with a PoP inside a named region.
+
+    Membership is computed once per dataset version and region geometry and shared through the
+    Django cache.
+
+    Args:
+        name (str): The region name
+
+    Returns:
+        list: Primary keys of the member sambands
+
+    Raises:
+        KeyError: If no region has that name
+        ValueError: If the configured region is not a valid polygon
+    """
+    geojson = get_regions()[name]
+    digest = hashlib.sha256(json.dumps(geojson, sort_keys=True).encode()).hexdigest()[:16]
+    cache_key = f"praksis_nhn_nautobot:region:{get_dataset_version()}:{name}:{digest}"
+    return get_or_build(
+        "region",
+        cache_key,
+        lambda: [str(pk) for pk in _pks_in_polygons(Samband.objects.all(), parse_polygon(geojson))],
+    )
+
+
+def filter_by_regions(sambands, names):
+    """
+    Keep the sambands with a PoP inside any of the named regions.
+
+    Args:
+        sambands (QuerySet): The sambands to filter
+        names (list): Region names
+
+    Returns:
+        QuerySet: The matching sambands
+
+    Raises:
+        KeyError: If a region name is unknown
+    """
+    members = set()
+    for name in names:
+        members.update(get_region_members(name))
+    return sambands.filter(pk__in=members)
+
+
+def get_samband_regions():
+    """
+    Get the regions of every samband with a PoP in one.
+
+    Computed once per dataset version and region settings and shared through the Django cache, so
+    the regions of any samband are one dict lookup.
+
+    Returns:
+        dict: Region names in settings order, keyed by the string pk of the samband
+    """
+    regions = get_regions()
+    digest = hashlib.sha256(json.dumps(regions, sort_keys=True).encode()).hexdigest()[:16]
+    cache_key = f"praksis_nhn_nautobot:samband-regions:{get_dataset_version()}:{digest}"
+
+    def build():
+        samband_regions = {}
+        for name in regions:
+            for pk in get_region_members(name):
+                samband_regions.setdefault(pk, []).append(name)
+        return samband_regions
+
+    return get_or_build("samband-regions", cache_key, build)
+
+
+def regions_for_samband(samband):
+    """
+    Get the names of the regions a samband has a PoP in.
+
+    Args:
+        samband (Samband): The samband
+
+    Returns:
+        list: Region names, in settings order
+    """
+    return get_samband_regions().get(str(samband.pk), [])
@@ -0,0 +1,523 @@
+"""Module for the process-local spatial index of Samband PoP endpoints."""
+
+import heapq
+import threading
+from collections import defaultdict
+from itertools import islice
+from math import asin, cos, floor, inf, radians, sin
+
+import numpy as np
+from django.db.models import Q
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.cache_service import get_dataset_version
+from praksis_nhn_nautobot.services.geo_service import (
+    EARTH_RADIUS_KM,
+    bounding_box,
+    haversine_distances,
+    segments_intersect_bbox,
+)
+
+POINT_A = "a"
+POINT_B = "b"
+
+# nearest_sambands ranks a filtered queryset directly when it matches at most this many sambands
+DIRECT_RANK_LIMIT = 5000
+
+# Largest batch of index candidates nearest_sambands checks against the queryset in one query
+MAX_NEAREST_BATCH = 5000
+
+
+class SambandSpatialIndex:
+    """
+    Grid-bucketed index of the PoP A and PoP B coordinates of every Samband.
+
+    Endpoints are stored in square latitude/longitude cells so that radius, bounding-box and
+    nearest-point questions only look at the cells near the query instead of every connection.
+    The grid does not wrap around the antimeridian.
+
+    Connections with both PoPs located are also kept as lines with a precomputed bounding box,
+    so viewport queries can find lines that cross the view without an endpoint inside it.
+    """
+
+    def __init__(self, cell_size=0.25):
+        """
+        Create an empty index.
+
+        Args:
+            cell_size (float, optional): Cell edge length in degrees. Defaults to 0.25.
+        """
+        self.cell_size = cell_size
+        self.version = None
+        self.lock = threading.RLock()
+        self._cells = defaultdict(dict)  # (row, col) -> {(pk, endpoint): (lat, lng)}
+        self._endpoints = {}  # pk -> {endpoint: (lat, lng)}
+        self._line_arrays = None  # Built from _endpoints on first line query after a change
+
+    def __len__(self):
+        """Number of indexed connections."""
+        return len(self._endpoints)
+
+    def __contains__(self, pk):
+        """Whether a connection has at least one indexed PoP."""
+        return pk in self._endpoints
+
+    def load(self, rows, version=None):
+        """
+        Replace the index content.
+
+        Args:
+            rows (iterable): Tuples of (pk, a_lat, a_lng, b_lat, b_lng)
+            version (int, optional): Dataset version the rows were read at
+        """
+        with self.lock:
+            self._cells.clear()
+            self._endpoints.clear()
+            self._line_arrays = None
+            for row in rows:
+                self._add(*row)
+            self.version = version
+
+    def update(self, pk, a_lat, a_lng, b_lat, b_lng):
+        """Insert or move the endpoints of one connection."""
+        with self.lock:
+            self._remove(pk)
+            self._add(pk, a_lat, a_lng, b_lat, b_lng)
+
+    def remove(self, pk):
+        """Drop the endpoints of one connection."""
+        with self.lock:
+            self._remove(pk)
+
+    def within_radius(self, lat, lng, radius_km):
+        """
+        Find the connections with PoP A or PoP B inside a circle.
+
+        Args:
+            lat (float): Latitude of the circle centre
+            lng (float): Longitude of the circle centre
+            radius_km (float): Radius of the circle in kilometres
+
+        Returns:
+            dict: Distance in kilometres to the nearest PoP inside the circle, keyed by pk
+        """
+        keys, lats, lngs = self._gather(self._buckets_in_box(*bounding_box(lat, lng, radius_km)))
+        distances = haversine_distances(lat, lng, lats, lngs)
+
+        result = {}
+        for i in np.flatnonzero(distances <= radius_km):
+            pk = keys[i][0]
+            distance = float(distances[i])
+            if distance < result.get(pk, inf):
+                result[pk] = distance
+        return result
+
+    def within_bbox(self, min_lat, max_lat, min_lng, max_lng):
+        """
+        Find the connections with PoP A or PoP B inside a latitude/longitude box.
+
+        Returns:
+            set: Primary keys of the matching connections
+        """
+        keys, lats, lngs = self._gather(self._buckets_in_box(min_lat, max_lat, min_lng, max_lng))
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+        return {keys[i][0] for i in np.flatnonzero(inside)}
+
+    def lines_in_bbox(self, min_lat, max_lat, min_lng, max_lng):
+        """
+        Find the connections whose PoP A to PoP B line touches a latitude/longitude box.
+
+        This includes lines that cross the box with both PoPs outside it.
+
+        Returns:
+            set: Primary keys of the matching connections
+        """
+        # One snapshot, so a refresh from a signal cannot swap the arrays between the steps
+        lines = self._lines()
+        pks, coordinates = lines[:2]
+        # Cheap overlap check against the line bounding boxes before the exact segment test
+        candidates = self._line_boxes_overlapping(lines, min_lat, max_lat, min_lng, max_lng)
+        a_lats, a_lngs, b_lats, b_lngs = coordinates[candidates].T
+        touches = segments_intersect_bbox(a_lats, a_lngs, b_lats, b_lngs, min_lat, max_lat, min_lng, max_lng)
+        return {pks[i] for i in candidates[touches]}
+
+    def lines_near_bbox(self, min_lat, max_lat, min_lng, max_lng):
+        """
+        Find the connections whose line bounding box overlaps a latitude/longitude box.
+
+        These are the candidates of lines_in_bbox, the same rows that lines_in_bbox_q selects in SQL.
+
+        Returns:
+            set: Primary keys of the matching connections
+        """
+        lines = self._lines()
+        return {lines[0][i] for i in self._line_boxes_overlapping(lines, min_lat, max_lat, min_lng, max_lng)}
+
+    def nearest(self, lat, lng, k=1):
+        """
+        Find the k connections with a PoP closest to a point.
+
+        Returns:
+            list: Tuples of (distance_km, pk), closest first
+        """
+        return list(islice(self.iter_nearest(lat, lng), k))
+
+    def nearest_among(self, lat, lng, pks, k):
+        """
+        Find the k connections out of a given set with a PoP closest to a point.
+
+        Args:
+            lat (float): Latitude of the point
+            lng (float): Longitude of the point
+            pks (iterable): Primary keys of the connections to rank
+            k (int): Number of connections to return
+
+        Returns:
+            list: Tuples of (distance_km, pk), closest first
+        """
+        keys = []
+        lats = []
+        lngs = []
+        with self.lock:
+            for pk in pks:
+                for point_lat, point_lng in self._endpoints.get(pk, {}).values():
+                    keys.append(pk)
+                    lats.append(point_lat)
+                    lngs.append(point_lng)
+
+        closest = {}
+        distances = haversine_distances(lat, lng, np.array(lats, dtype=float), np.array(lngs, dtype=float))
+        for pk, distance in zip(keys, distances):
+            closest[pk] = min(float(distance), closest.get(pk, inf))
+        return heapq.nsmallest(k, ((distance, pk) for pk, distance in closest.items()), key=lambda item: item[0])
+
+    def iter_nearest(self, lat, lng):
+        """
+        Yield connections in order of the distance from a point to their nearest PoP.
+
+        The grid is searched in growing square rings around the point. A candidate is only
+        yielded once no unsearched cell can hold anything closer, so callers can stop early.
+
+        Yields:
+            tuple: (distance_km, pk)
+        """
+        row0, col0 = self._cell(lat, lng)
+        heap = []
+        yielded = set()
+        ring = 0
+        exhausted = False
+
+        while True:
+            if not exhausted:
+                with self.lock:
+                    if 8 * ring > len(self._cells):
+                        # The ring is larger than the occupied grid, take everything that is left
+                        buckets = [
+                            bucket
+                            for (row, col), bucket in self._cells.items()
+                            if max(abs(row - row0), abs(col - col0)) >= ring
+                        ]
+                        exhausted = True
+                    else:
+                        buckets = [
+                            self._cells[cell] for cell in self._ring_cells(row0, col0, ring) if cell in self._cells
+                        ]
+                    keys, lats, lngs = self._gather(buckets)
+
+                for (pk, _), distance in zip(keys, haversine_distances(lat, lng, lats, lngs)):
+                    heapq.heappush(heap, (float(distance), pk))
+
+            bound = inf if exhausted else self._unsearched_distance(lat, lng, row0, col0, ring)
+            while heap and heap[0][0] <= bound:
+                distance, pk = heapq.heappop(heap)
+                if pk not in yielded:
+                    yielded.add(pk)
+                    yield distance, pk
+
+            if exhausted:
+                return
+            ring += 1
+
+    def _cell(self, lat, lng):
+        return floor(lat / self.cell_size), floor(lng / self.cell_size)
+
+    def _lines(self):
+        # The arrays are rebuilt rather than changed, so the returned tuple stays consistent without the lock
+        with self.lock:
+            if self._line_arrays is None:
+                pks = []
+                coordinates = []
+                for pk, endpoints in self._endpoints.items():
+                    if len(endpoints) == 2:
+                        pks.append(pk)
+                        coordinates.append((*endpoints[POINT_A], *endpoints[POINT_B]))
+                coordinates = np.array(coordinates, dtype=float).reshape(-1, 4)
+                self._line_arrays = (
+                    pks,
+                    coordinates,
+                    np.minimum(coordinates[:, 0], coordinates[:, 2]),
+                    np.maximum(coordinates[:, 0], coordinates[:, 2]),
+                    np.minimum(coordinates[:, 1], coordinates[:, 3]),
+                    np.maximum(coordinates[:, 1], coordinates[:, 3]),
+                )
+            return self._line_arrays
+
+    @staticmethod
+    def _line_boxes_overlapping(lines, min_lat, max_lat, min_lng, max_lng):
+        _, _, south, north, west, east = lines
+        return np.flatnonzero((south <= max_lat) & (north >= min_lat) & (west <= max_lng) & (east >= min_lng))
+
+    def _add(self, pk, a_lat, a_lng, b_lat, b_lng):
+        self._line_arrays = None
+        endpoints = {}
+        for endpoint, lat, lng in ((POINT_A, a_lat, a_lng), (POINT_B, b_lat, b_lng)):
+            if lat is None or lng is None:
+                continue
+            endpoints[endpoint] = (lat, lng)
+            self._cells[self._cell(lat, lng)][(pk, endpoint)] = (lat, lng)
+        if endpoints:
+            self._endpoints[pk] = endpoints
+
+    def _remove(self, pk):
+        self._line_arrays = None
+        for endpoint, (lat, lng) in self._endpoints.pop(pk, {}).items():
+            cell = self._cell(lat, lng)
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop((pk, endpoint), None)
+                if not bucket:
+                    del self._cells[cell]
+
+    def _buckets_in_box(self, min_lat, max_lat, min_lng, max_lng):
+        min_row, min_col = self._cell(min_lat, min_lng)
+        max_row, max_col = self._cell(max_lat, max_lng)
+        with self.lock:
+            # Walk whichever is smaller: the cells covered by the box or the occupied cells
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+                return [
+                    bucket
+                    for (row, col), bucket in self._cells.items()
+                    if min_row <= row <= max_row and min_col <= col <= max_col
+                ]
+            return [
+                self._cells[(row, col)]
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (row, col) in self._cells
+            ]
+
+    def _gather(self, buckets):
+        keys = []
+        lats = []
+        lngs = []
+        with self.lock:
+            for bucket in buckets:
+                for key, (lat, lng) in bucket.items():
+                    keys.append(key)
+                    lats.append(lat)
+                    lngs.append(lng)
+        return keys, np.array(lats, dtype=float), np.array(lngs, dtype=float)
+
+    @staticmethod
+    def _ring_cells(row0, col0, ring):
+        if ring == 0:
+            yield row0, col0
+            return
+        for col in range(col0 - ring, col0 + ring + 1):
+            yield row0 - ring, col
+            yield row0 + ring, col
+        for row in range(row0 - ring + 1, row0 + ring):
+            yield row, col0 - ring
+            yield row, col0 + ring
+
+    def _unsearched_distance(self, lat, lng, row0, col0, ring):
+        """Lower bound in km for the distance from (lat, lng) to any cell outside the searched square."""
+        size = self.cell_size
+        lat_gap = min(lat - (row0 - ring) * size, (row0 + ring + 1) * size - lat)
+        lng_gap = min(lng - (col0 - ring) * size, (col0 + ring + 1) * size - lng)
+
+        lat_km = radians(lat_gap) * EARTH_RADIUS_KM
+        # Distance to the nearest meridian outside the square, and to the pole where all meridians meet
+        lng_km = asin(min(1.0, cos(radians(lat)) * sin(radians(min(lng_gap, 90))))) * EARTH_RADIUS_KM
+        pole_km = radians(90 - abs(lat)) * EARTH_RADIUS_KM
+        return min(lat_km, lng_km, pole_km)
+
+
+_spatial_index = SambandSpatialIndex()
+
+
+def get_spatial_index():
+    """
+    Get the process-local spatial index, building it on first use.
+
+    The index is rebuilt from the database when the shared dataset version shows that another
+    process has changed Samband rows since it was loaded.
+
+    Returns:
+        SambandSpatialIndex: The index
+    """
+    version = get_dataset_version()
+    if _spatial_index.version != version:
+        with _spatial_index.lock:
+            if _spatial_index.version != version:
+                rows = Samband.objects.values_list(
+                    "pk", "pop_a_latitude", "pop_a_longitude", "pop_b_latitude", "pop_b_longitude"
+                )
+                _spatial_index.load(rows.iterator(chunk_size=2000), version=version)
+    return _spatial_index
+
+
+def refresh_samband(instance, version):
+    """
+    Move a saved Samband in the spatial index.
+
+    Args:
+        instance (Samband): The saved instance
+        version (int): Dataset version after the save
+    """
+    with _spatial_index.lock:
+        if _spatial_index.version is None:
+            return  # Not built yet, the first query loads the current rows
+        _spatial_index.update(
+            instance.pk,
+            instance.pop_a_latitude,
+            instance.pop_a_longitude,
+            instance.pop_b_latitude,
+            instance.pop_b_longitude,
+        )
+        _advance_version(version)
+
+
+def discard_samband(pk, version):
+    """
+    Drop a deleted Samband from the spatial index.
+
+    Args:
+        pk: Primary key of the deleted instance
+        version (int): Dataset version after the delete
+    """
+    with _spatial_index.lock:
+        if _spatial_index.version is None:
+            return
+        _spatial_index.remove(pk)
+        _advance_version(version)
+
+
+def _advance_version(version):
+    # Only claim the new version if this change was the only one we missed
+    if _spatial_index.version == version - 1:
+        _spatial_index.version = version
+
+
+def endpoints_in_bbox_q(min_lat, max_lat, min_lng, max_lng):
+    """
+    Build the SQL condition for connections with PoP A or PoP B inside a latitude/longitude box.
+
+    Selects the same connections as SambandSpatialIndex.within_bbox.
+
+    Returns:
+        Q: The condition
+    """
+    return Q(pop_a_latitude__range=(min_lat, max_lat), pop_a_longitude__range=(min_lng, max_lng)) | Q(
+        pop_b_latitude__range=(min_lat, max_lat), pop_b_longitude__range=(min_lng, max_lng)
+    )
+
+
+def lines_in_bbox_q(min_lat, max_lat, min_lng, max_lng):
+    """
+    Build the SQL condition for connections whose line bounding box overlaps a latitude/longitude box.
+
+    Selects the same connections as SambandSpatialIndex.lines_near_bbox, for connections with both PoPs located.
+
+    Returns:
+        Q: The condition
+    """
+    return (
+        (Q(pop_a_latitude__lte=max_lat) | Q(pop_b_latitude__lte=max_lat))
+        & (Q(pop_a_latitude__gte=min_lat) | Q(pop_b_latitude__gte=min_lat))
+        & (Q(pop_a_longitude__lte=max_lng) | Q(pop_b_longitude__lte=max_lng))
+        & (Q(pop_a_longitude__gte=min_lng) | Q(pop_b_longitude__gte=min_lng))
+    )
+
+
+def restrict_to_matches(sambands, condition, candidates, matches):
+    """
+    Narrow a queryset to the connections the spatial index matched.
+
+    The SQL condition selects the candidates that the index checked, so only the smaller of the
+    matches and the rejected candidates is sent to the database as a list of primary keys. A
+    large radius or a zoomed out viewport then costs a range scan instead of an IN clause with
+    most of the table.
+
+    Args:
+        sambands (QuerySet): The sambands to narrow
+        condition (Q): SQL condition for the candidates, see endpoints_in_bbox_q and lines_in_bbox_q
+        candidates (set): Primary keys of the candidates checked by the index
+        matches (iterable): Primary keys of the candidates that matched
+
+    Returns:
+        QuerySet: The narrowed sambands
+    """
+    matches = set(matches)
+    rejected = candidates - matches
+    sambands = sambands.filter(condition)
+    if len(rejected) <= len(matches):
+        return sambands.exclude(pk__in=list(rejected)) if rejected else sambands
+    return sambands.filter(pk__in=list(matches))
+
+
+def nearest_sambands(sambands, lat, lng, k, max_distance_km=None):
+    """
+    Find the k sambands in a queryset with a PoP closest to a point.
+
+    Candidates come from the spatial index in distance order and are checked against the
+    queryset in batches that double in size, so only the neighbourhood of the point is looked at
+    when the queryset matches most sambands. When the first batch comes up short and the queryset
+    matches few sambands, those are ranked directly instead.
+
+    Args:
+        sambands (QuerySet): The filtered sambands to choose from
+        lat (float): Latitude of the point
+        lng (float): Longitude of the point
+        k (int): Number of sambands to return
+        max_distance_km (float, optional): Ignore sambands further away than this
+
+    Returns:
+        list: Tuples of (distance_km, samband), closest first
+    """
+    index = get_spatial_index()
+    found = []
+    candidates = index.iter_nearest(lat, lng)
+    batch_size = max(2 * k, 50)
+    first_batch = True
+
+    while len(found) < k:
+        batch = []
+        for distance, pk in islice(candidates, batch_size):
+            if max_distance_km is not None and distance > max_distance_km:
+                break
+            batch.append((distance, pk))
+        if not batch:
+            break
+
+        matches = sambands.in_bulk([pk for _, pk in batch])
+        found.extend((distance, matches[pk]) for distance, pk in batch if pk in matches)
+        if len(batch) < batch_size:
+            break
+
+        if first_batch and len(found) < k:
+            first_batch = False
+            # A selective filter would have the walk go through most of the index
+            pks = list(sambands.values_list("pk", flat=True)[: DIRECT_RANK_LIMIT + 1])
+            if len(pks) <= DIRECT_RANK_LIMIT:
+                ranked = [
+                    (distance, pk)
+                    for distance, pk in index.nearest_among(lat, lng, pks, k)
+                    if max_distance_km is None or distance <= max_distance_km
+                ]
+                matches = sambands.in_bulk([pk for _, pk in ranked])
+                return [(distance, matches[pk]) for distance, pk in ranked if pk in matches]
+
+        batch_size = min(2 * batch_size, MAX_NEAREST_BATCH)
+
+    return found[:k]
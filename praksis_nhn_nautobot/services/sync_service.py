@@ -0,0 +1,176 @@
+"""Module for syncing a client's copy of the Samband connections with the changes since its last sync."""
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import count
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from praksis_nhn_nautobot.models import SambandChange
+from praksis_nhn_nautobot.services.cache_service import get_dataset_version
+
+# Changes are kept this many days unless the app settings say otherwise
+DEFAULT_CHANGE_RETENTION_DAYS = 30
+
+# Changes older than the retention period are pruned once every this many recorded changes per process
+PRUNE_INTERVAL = 100
+
+_recorded = count(1)
+
+
+def get_change_retention():
+    """
+    Get how long the recorded changes are kept.
+
+    Configured as PLUGINS_CONFIG["praksis_nhn_nautobot"]["change_retention_days"].
+
+    Returns:
+        timedelta: The retention period
+    """
+    days = settings.PLUGINS_CONFIG.get("praksis_nhn_nautobot", {}).get("change_retention_days")
+    return timedelta(days=days or DEFAULT_CHANGE_RETENTION_DAYS)
+
+
+def record_change(pk, deleted=False):
+    """
+    Record that a samband was saved or deleted, in the transaction that changes it.
+
+    The change gets its version from stamp_changes once the transaction commits.
+
+    Args:
+        pk (UUID): Primary key of the samband
+        deleted (bool, optional): Whether the samband was deleted. Defaults to False.
+
+    Returns:
+        UUID: Primary key of the recorded change
+    """
+    change = SambandChange.objects.create(samband_id=pk, deleted=deleted)
+    if next(_recorded) % PRUNE_INTERVAL == 0:
+        prune_changes()
+    return change.pk
+
+
+def stamp_changes(change_pks, version):
+    """
+    Give committed changes the dataset version they committed as.
+
+    Args:
+        change_pks (list): Primary keys from record_change
+        version (int): The dataset version bumped after the commit
+    """
+    # The time is reset too, so a change is kept for the whole retention period after it is visible
+    SambandChange.objects.filter(pk__in=change_pks).update(version=version, changed=timezone.now())
+
+
+def prune_changes():
+    """Drop the changes older than the retention period."""
+    SambandChange.objects.filter(changed__lt=timezone.now() - get_change_retention()).delete()
+
+
+def make_sync_token(version):
+    """
+    Build a sync token for the changes up to and including a dataset version.
+
+    Args:
+        version (int): The dataset version
+
+    Returns:
+        str: The sync token, the version and when the token was issued
+    """
+    return f"{version}-{int(timezone.now().timestamp())}"
+
+
+def parse_sync_token(value):
+    """
+    Read a sync token.
+
+    Args:
+        value (str): The sync token from an earlier response
+
+    Returns:
+        tuple: (version, issued) with the dataset version and the aware time the token was issued
+
+    Raises:
+        ValueError: If the value is not a sync token
+    """
+    try:
+        version, issued = (int(part) for part in value.strip().split("-"))
+    except ValueError as e:
+        raise ValueError(f"Invalid sync token: {value}") from e
+    return version, datetime.fromtimestamp(issued, tz=dt_timezone.utc)
+
+
+def current_sync_token():
+    """
+    Get a sync token for the present, for clients that are about to load everything.
+
+    Must be taken before the data is read, so changes that commit meanwhile come with the next sync.
+
+    Returns:
+        str: The sync token
+    """
+    return make_sync_token(get_dataset_version())
+
+
+def get_changes(sambands, since, limit):
+    """
+    Get the changes to a set of sambands since a sync token.
+
+    A samband that was saved but no longer is in the set, for example because it no longer
+    matches a filter, is reported as removed along with the deleted ones.
+
+    Args:
+        sambands (QuerySet): The sambands the client keeps a copy of
+        since (tuple): The sync token, from parse_sync_token
+        limit (int): The most dataset versions to return the changes of, the rest follow with the next sync token
+
+    Returns:
+        dict: 'changed' (QuerySet) with the saved sambands in the set, 'removed' (list) with the
+            string pks of the others, 'sync_token' (str) for the next request, 'more' (bool) if
+            changes were left out because of the limit, and 'reset' (bool) if changes from that
+            time may be gone so the client must reload everything
+    """
+    since_version, issued = since
+    # The version is read before the changes, anything committing later is stamped with a higher one
+    version = get_dataset_version()
+    if since_version > version or issued < timezone.now() - get_change_retention():
+        return {
+            "changed": sambands.none(),
+            "removed": [],
+            "sync_token": make_sync_token(version),
+            "more": False,
+            "reset": True,
+        }
+
+    # Changes that have committed but are not stamped yet are sent now and may come again later
+    changes = SambandChange.objects.filter(Q(version__gt=since_version) | Q(version__isnull=True))
+    versions = list(
+        SambandChange.objects.filter(version__gt=since_version)
+        .order_by("version")
+        .values_list("version", flat=True)
+        .distinct()[: limit + 1]
+    )
+    more = len(versions) > limit
+    if more:
+        # With more to come, the next request continues after the last version sent
+        version = versions[limit - 1]
+        changes = changes.filter(Q(version__lte=version) | Q(version__isnull=True))
+
+    # The latest change of each samband decides whether it was saved or deleted
+    latest = {}
+    for samband_id, deleted in changes.order_by(F("version").asc(nulls_last=True), "changed").values_list(
+        "samband_id", "deleted"
+    ):
+        latest[samband_id] = deleted
+
+    saved = [pk for pk, deleted in latest.items() if not deleted]
+    matching = set(sambands.filter(pk__in=saved).values_list("pk", flat=True))
+    return {
+        "changed": sambands.filter(pk__in=matching),
+        "removed": [str(pk) for pk in latest if pk not in matching],
+        "sync_token": make_sync_token(version),
+        "more": more,
+        "reset": False,
+    }
@@ -0,0 +1,127 @@
+"""Module for building and caching web map tiles of Samband connections."""
+
+from math import asinh, atan, degrees, floor, pi, radians, sinh, tan
+
+import numpy as np
+from django.db.models import Q
+
+from praksis_nhn_nautobot.services.geo_service import segments_intersect_bbox
+
+# Zoom levels above this are not served as tiles
+MAX_TILE_ZOOM = 18
+
+
+def tile_bounds(z, x, y):
+    """
+    Get the latitude/longitude bounds of a Web Mercator (slippy map) tile.
+
+    Args:
+        z (int): Zoom level
+        x (int): Tile column, counted from the west
+        y (int): Tile row, counted from the north
+
+    Returns:
+        tuple: (south, north, west, east) in degrees
+    """
+    n = 2**z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = degrees(atan(sinh(pi * (1 - 2 * y / n))))
+    south = degrees(atan(sinh(pi * (1 - 2 * (y + 1) / n))))
+    return south, north, west, east
+
+
+def tile_for_point(lat, lng, z):
+    """
+    Get the tile that contains a point.
+
+    Args:
+        lat (float): Latitude, clamped to the Web Mercator limit of about 85.05 degrees
+        lng (float): Longitude
+        z (int): Zoom level
+
+    Returns:
+        tuple: (x, y) of the tile
+    """
+    n = 2**z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = floor((lng + 180) / 360 * n)
+    y = floor((1 - asinh(tan(radians(lat))) / pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def is_valid_tile(z, x, y):
+    """Whether z/x/y addresses an existing tile."""
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def build_tile(sambands, z, x, y):
+    """
+    Collect the PoPs and connection lines that intersect a tile.
+
+    Args:
+        sambands (QuerySet): The filtered sambands, all with coordinates for both PoPs
+        z (int): Zoom level
+        x (int): Tile column
+        y (int): Tile row
+
+    Returns:
+        dict: The tile with its 'bounds', the 'points' inside it and the 'lines' crossing it
+    """
+    south, north, west, east = tile_bounds(z, x, y)
+
+    # The bounding box of the line from PoP A to PoP B overlaps the tile
+    candidates = sambands.filter(
+        Q(pop_a_latitude__lte=north) | Q(pop_b_latitude__lte=north),
+        Q(pop_a_latitude__gte=south) | Q(pop_b_latitude__gte=south),
+        Q(pop_a_longitude__lte=east) | Q(pop_b_longitude__lte=east),
+        Q(pop_a_longitude__gte=west) | Q(pop_b_longitude__gte=west),
+    ).values_list(
+        "pk",
+        "name",
+        "status",
+        "location_type",
+        "pop_a_latitude",
+        "pop_a_longitude",
+        "pop_b_latitude",
+        "pop_b_longitude",
+    )
+
+    rows = list(candidates.iterator(chunk_size=2000))
+    if rows:
+        # Only keep the lines that actually cross the tile, not just their bounding box
+        a_lats, a_lngs, b_lats, b_lngs = np.array([row[4:] for row in rows], dtype=float).T
+        touches = segments_intersect_bbox(a_lats, a_lngs, b_lats, b_lngs, south, north, west, east)
+        rows = [row for row, keep in zip(rows, touches) if keep]
+
+    points = []
+    lines = []
+    for pk, name, status, location_type, a_lat, a_lng, b_lat, b_lng in rows:
+        pk = str(pk)
+        lines.append(
+            {
+                "id": pk,
+                "name": name,
+                "status": status,
+                "coordinates": [[a_lat, a_lng], [b_lat, b_lng]],
+            }
+        )
+        for endpoint, lat, lng in (("a", a_lat, a_lng), ("b", b_lat, b_lng)):
+            if south <= lat <= north and west <= lng <= east:
+                points.append(
+                    {
+                        "id": pk,
+                        "end": endpoint,
+                        "location": [lat, lng],
+                        "location_type": location_type,
+                    }
+                )
+
+    return {
+        "z": z,
+        "x": x,
+        "y": y,
+        "bounds": [[south, west], [north, east]],
+        "points": points,
+        "lines": lines,
+    }
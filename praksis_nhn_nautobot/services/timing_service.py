@@ -0,0 +1,143 @@
+"""Module for timing the phases of a request, reported by the Server-Timing middleware."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Phases with the description shown in browser devtools, in report order
+PHASES = {
+    "db": "Database",
+    "geo": "Geo filtering and parsing",
+    "serialize": "Serialization",
+    "graph": "Graph build",
+    "render": "Template render",
+}
+
+_current = ContextVar("praksis_nhn_nautobot_request_timings", default=None)
+
+
+class RequestTimings:
+    """Time spent per phase of one request, and the number of database queries."""
+
+    def __init__(self):
+        """Start timing the request."""
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self._open = {}
+
+    def add(self, phase, seconds):
+        """
+        Add time to a phase.
+
+        Args:
+            phase (str): The phase, see PHASES
+            seconds (float): The time spent
+        """
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+
+    def start(self, phase):
+        """
+        Start a phase that ends with stop() or when the request is finished.
+
+        Args:
+            phase (str): The phase, see PHASES
+        """
+        self._open.setdefault(phase, time.perf_counter())
+
+    def stop(self, phase):
+        """
+        End a phase started with start().
+
+        Args:
+            phase (str): The phase, see PHASES
+        """
+        started = self._open.pop(phase, None)
+        if started is not None:
+            self.add(phase, time.perf_counter() - started)
+
+    def finish(self):
+        """
+        End the open phases and get the total time of the request.
+
+        Returns:
+            float: Seconds since the request started
+        """
+        for phase in list(self._open):
+            self.stop(phase)
+        return time.perf_counter() - self.started
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Count and time a database query, see django.db.connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add("db", time.perf_counter() - started)
+
+
+def begin_request():
+    """
+    Start collecting the timings of the current request.
+
+    Returns:
+        tuple: (RequestTimings, token) where the token is passed to end_request
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    """
+    Stop collecting timings for the request started with begin_request.
+
+    Args:
+        token (Token): The token from begin_request
+    """
+    _current.reset(token)
+
+
+def get_request_timings():
+    """
+    Get the timings of the current request.
+
+    Returns:
+        RequestTimings: The timings, or None outside a timed request
+    """
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block to a phase of the current request.
+
+    Does nothing outside a timed request.
+
+    Args:
+        phase (str): The phase, see PHASES
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def start_phase(phase):
+    """
+    Start a phase of the current request that lasts until the response is returned.
+
+    For work that is not one block in the plugin's code, such as rendering in a Nautobot base view.
+
+    Args:
+        phase (str): The phase, see PHASES
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.start(phase)
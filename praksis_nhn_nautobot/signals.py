@@ -0,0 +1,65 @@
+"""Signal handlers for praksis_nhn_nautobot."""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services import spatial_index
+from praksis_nhn_nautobot.services.cache_service import bump_dataset_version
+from praksis_nhn_nautobot.services.event_service import deleted_event, parents_event, publish, saved_event
+from praksis_nhn_nautobot.services.sync_service import record_change, stamp_changes
+
+# The dataset version is only bumped once the change has committed. Bumped earlier, a request
+# running alongside the transaction could read the old rows and cache them, or load them into
+# its spatial index, under the new version. The change itself is recorded for the sync API in
+# the transaction, and stamped with the new version after it.
+
+
+@receiver(post_save, sender=Samband)
+def samband_saved(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Record the change and, once it commits, update the dataset version, the spatial index and live subscribers."""
+    change = record_change(instance.pk)
+
+    def saved():
+        version = bump_dataset_version()
+        stamp_changes([change], version)
+        spatial_index.refresh_samband(instance, version)
+        publish(saved_event(instance, version))
+
+    transaction.on_commit(saved)
+
+
+@receiver(post_delete, sender=Samband)
+def samband_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Record the deletion, mark the dataset as changed and drop the deleted Samband from the spatial index."""
+    pk = instance.pk
+    change = record_change(pk, deleted=True)
+
+    def deleted():
+        version = bump_dataset_version()
+        stamp_changes([change], version)
+        spatial_index.discard_samband(pk, version)
+        publish(deleted_event(pk, version))
+
+    transaction.on_commit(deleted)
+
+
+@receiver(m2m_changed, sender=Samband.parents.through)
+def samband_parents_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Mark the dataset as changed when the parent/child links between Samband change, and tell live subscribers."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    # From the parent side the changed sambands are the children in pk_set, which a clear does not give
+    children = list(pk_set or []) if reverse else [instance.pk]
+    changes = [record_change(pk) for pk in children]
+
+    def parents_changed():
+        version = bump_dataset_version()
+        stamp_changes(changes, version)
+        for pk in children:
+            parent_pks = Samband.objects.filter(children__pk=pk).values_list("pk", flat=True)
+            publish(parents_event(pk, parent_pks, version))
+
+    transaction.on_commit(parents_changed)
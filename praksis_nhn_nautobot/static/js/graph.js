@@ -75,9 +75,10 @@ const NetworkGraphRenderer = {
     );
 
     // Set up event handlers
-    this.setupLabelHandlers(nodes, nodeDataMap);
+    const updateNodeLabels = this.setupLabelHandlers(nodes, nodeDataMap);
     this.setupHoverEffects(network, nodes, edges, focusNodeId);
     this.setupClickHandler(network);
+    this.subscribeToChanges(nodes, edges, nodeDataMap, updateNodeLabels);
 
     return { network, nodes, edges, nodeDataMap };
   },
@@ -165,6 +166,7 @@ const NetworkGraphRenderer = {
 
     // Initialize labels
     updateNodeLabels();
+    return updateNodeLabels;
   },
 
   /**
@@ -253,6 +255,102 @@ const NetworkGraphRenderer = {
     });
   },
 
+  /**
+   * Patch the nodes and edges in place when connections in the graph change on the server
+   * @param {DataSet} nodes - vis.js nodes dataset
+   * @param {DataSet} edges - vis.js edges dataset
+   * @param {Object} nodeDataMap - Map of node IDs to node data
+   * @param {Function} updateNodeLabels - Rebuilds the node labels from nodeDataMap
+   */
+  subscribeToChanges: function (nodes, edges, nodeDataMap, updateNodeLabels) {
+    if (!window.EventSource) {
+      this.pollChanges(nodes);
+      return;
+    }
+
+    const source = new EventSource("/plugins/praksis-nhn-nautobot/api/samband/events/");
+    // The server turns the stream down when it has no broker or no free stream, so poll instead
+    source.addEventListener("error", () => {
+      if (source.readyState === EventSource.CLOSED) this.pollChanges(nodes);
+    });
+    const read = (handler) => (message) => {
+      const event = JSON.parse(message.data);
+      // Connections outside this graph are left out
+      if (nodes.get(event.id)) handler(event);
+    };
+
+    source.addEventListener(
+      "saved",
+      read((event) => {
+        Object.keys(nodeDataMap[event.id]).forEach((key) => {
+          if (key in event) nodeDataMap[event.id][key] = event[key];
+        });
+        updateNodeLabels();
+      })
+    );
+
+    source.addEventListener(
+      "deleted",
+      read((event) => {
+        edges.remove(edges.getIds({ filter: (edge) => edge.from === event.id || edge.to === event.id }));
+        nodes.remove(event.id);
+        delete nodeDataMap[event.id];
+      })
+    );
+
+    source.addEventListener(
+      "parents",
+      read((event) => {
+        edges.remove(edges.getIds({ filter: (edge) => edge.to === event.id }));
+        edges.add(
+          event.parents
+            .filter((parentId) => nodes.get(parentId))
+            .map((parentId) => ({ from: parentId, to: event.id, arrows: "to" }))
+        );
+      })
+    );
+  },
+
+  /**
+   * Poll the sync API and reload the page when connections in the graph change on the server
+   * @param {DataSet} nodes - vis.js nodes dataset
+   */
+  pollChanges: function (nodes) {
+    const url = "/plugins/praksis-nhn-nautobot/api/samband/sync/";
+    let syncToken = null;
+
+    const poll = () => {
+      if (document.hidden) return;
+      fetch(syncToken ? `${url}?since=${encodeURIComponent(syncToken)}` : url)
+        .then((response) => {
+          if (!response.ok) {
+            throw new Error(`Network response was not ok (${response.status})`);
+          }
+          return response.json();
+        })
+        .then((data) => {
+          // The first request only gives the token to sync from
+          const started = syncToken !== null;
+          syncToken = data.sync_token;
+          if (!started) return;
+
+          // The graph is built by the server, so it is reloaded rather than patched
+          const ids = data.removed.concat(data.changed.map((connection) => connection.id));
+          if (data.reset || ids.some((id) => nodes.get(id))) {
+            window.location.reload();
+          } else if (data.more) {
+            poll();
+          }
+        })
+        .catch((error) => {
+          console.error("Error syncing graph:", error);
+        });
+    };
+
+    poll();
+    setInterval(poll, 60000);
+  },
+
   /**
    * Set up node click handler
    * @param {Network} network - vis.js network instance
@@ -1,6 +1,7 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Global variables
-    let map, pointsLayer, connectionsLayer, radiusLayer;
+    let map, pointsLayer, connectionsLayer, radiusLayer, clusterLayer, tileLayer, heatmapLayer;
+    let heatmapRequestId = 0;
     let activeLines = [];
     let featureIdToMarkers = {};
     let featureIdToLines = {};
@@ -13,6 +14,27 @@ document.addEventListener('DOMContentLoaded', function() {
     let selectedConnectionId = null;
     let searchTimeout = null;
     let last_used_params = null;
+    let viewportTimeout = null;
+    let mapRequestId = 0;
+    let datasetVersion = null;
+    // Site markers by location and the connections drawn so far, across the pages of one load
+    let siteMarkers = new Map();
+    let loadedConnections = [];
+    let showingClusters = false;
+    // Token of the last map-data load or sync, changes after it are fetched from the sync API
+    let syncToken = null;
+    let syncTimeout = null;
+    // Connection details by id, kept until the dataset version changes
+    let detailCache = new Map();
+    // Callbacks waiting for details by id, fetched together in the next batch
+    let pendingDetails = new Map();
+    let detailBatchTimeout = null;
+    
+    // Connections per map-data page, small enough for the first page to draw quickly
+    const MAP_PAGE_SIZE = 2000;
+    
+    // How often the map asks for connections changed since it was loaded
+    const SYNC_INTERVAL = 60000;
     
     // Status color mapping
     const statusColors = {
@@ -57,8 +79,14 @@ document.addEventListener('DOMContentLoaded', function() {
     // Set up event handlers
     setupEventHandlers();
     
-    // Load initial data
-    loadMapData(getURLParameters());
+    // Load initial data and fit the map to it
+    loadMapData(getURLParameters(), { fit: true });
+    
+    // Keep the map current without reloading it: sync when the server reports a change, or poll
+    if (!subscribeToChanges()) {
+      setInterval(syncMapData, SYNC_INTERVAL);
+    }
+    document.addEventListener('visibilitychange', scheduleSync);
     
     // Set up legend toggle functionality
     document.getElementById('toggle-legend').addEventListener('click', function() {
@@ -83,10 +111,10 @@ document.addEventListener('DOMContentLoaded', function() {
      * Initialize the map and layers
      */
     function initializeMap() {
-      // Create the map
+      // Create the map, starting with an overview of Norway until the data tells us where to look
       map = new L.Map('leaflet', {
         preferCanvas: true
-      });
+      }).setView([65, 13], 5);
   
       // Add basemap layer
       L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
@@ -97,11 +125,152 @@ document.addEventListener('DOMContentLoaded', function() {
       pointsLayer = L.layerGroup().addTo(map);
       connectionsLayer = L.layerGroup().addTo(map);
       radiusLayer = L.layerGroup().addTo(map);
+      clusterLayer = L.layerGroup().addTo(map);
+      
+      // Optional overlay that draws connections from cached z/x/y tiles
+      tileLayer = createConnectionTileLayer();
+      
+      // Optional overlay with the connection density per grid cell
+      heatmapLayer = L.layerGroup();
+      map.on('overlayadd', function(e) {
+        if (e.layer === heatmapLayer) loadHeatmap();
+      });
+      
+      L.control.layers(null, {
+        'Connection tiles': tileLayer,
+        'Density heatmap': heatmapLayer
+      }).addTo(map);
       
       // Populate location type legend
       populateLocationTypeLegend();
     }
     
+    /**
+     * Create a grid layer that loads connection tiles on demand and draws them on canvas
+     */
+    function createConnectionTileLayer() {
+      const ConnectionTileLayer = L.GridLayer.extend({
+        createTile: function(coords, done) {
+          const tile = L.DomUtil.create('canvas', 'leaflet-tile');
+          const size = this.getTileSize();
+          tile.width = size.x;
+          tile.height = size.y;
+          
+          // The dataset version in the URL lets the browser cache the tile until the data changes
+          const params = new URLSearchParams(last_used_params || '');
+          if (datasetVersion !== null) {
+            params.set('v', datasetVersion);
+          }
+          
+          fetch(`/plugins/praksis-nhn-nautobot/api/samband/map-tiles/${coords.z}/${coords.x}/${coords.y}/?${params.toString()}`)
+            .then(response => {
+              if (!response.ok) {
+                throw new Error(`Network response was not ok (${response.status})`);
+              }
+              return response.json();
+            })
+            .then(data => {
+              drawConnectionTile(tile, coords, size, data);
+              done(null, tile);
+            })
+            .catch(error => {
+              console.error("Error loading connection tile:", error);
+              done(error, tile);
+            });
+          
+          return tile;
+        }
+      });
+      
+      return new ConnectionTileLayer();
+    }
+    
+    /**
+     * Draw the lines and PoPs of one connection tile
+     */
+    function drawConnectionTile(tile, coords, size, data) {
+      const ctx = tile.getContext('2d');
+      const origin = coords.scaleBy(size);
+      const toPixel = latlng => map.project(latlng, coords.z).subtract(origin);
+      
+      ctx.lineWidth = 2;
+      ctx.globalAlpha = 0.8;
+      (data.lines || []).forEach(function(line) {
+        const start = toPixel(line.coordinates[0]);
+        const end = toPixel(line.coordinates[1]);
+        ctx.strokeStyle = getStatusColor(line.status || 'Unknown');
+        ctx.beginPath();
+        ctx.moveTo(start.x, start.y);
+        ctx.lineTo(end.x, end.y);
+        ctx.stroke();
+      });
+      
+      ctx.globalAlpha = 1;
+      ctx.strokeStyle = 'white';
+      (data.points || []).forEach(function(point) {
+        const config = locationTypeIcons[point.location_type] || { color: '#3186cc' };
+        const position = toPixel(point.location);
+        ctx.fillStyle = config.color;
+        ctx.beginPath();
+        ctx.arc(position.x, position.y, 4, 0, 2 * Math.PI);
+        ctx.fill();
+        ctx.stroke();
+      });
+    }
+    
+    /**
+     * Get the padded viewport rounded outwards to a grid of one tile width at the current zoom,
+     * so small pans send the same bbox and are answered from the server cache
+     */
+    function snappedBounds() {
+      const bounds = map.getBounds().pad(0.25);
+      const step = 360 / Math.pow(2, map.getZoom());
+      const snap = (value, round) => round(value / step) * step;
+      return L.latLngBounds(
+        [snap(bounds.getSouth(), Math.floor), snap(bounds.getWest(), Math.floor)],
+        [snap(bounds.getNorth(), Math.ceil), snap(bounds.getEast(), Math.ceil)]
+      );
+    }
+    
+    /**
+     * Load and draw the density heatmap for the current filters and viewport, if it is shown
+     */
+    function loadHeatmap() {
+      if (!map.hasLayer(heatmapLayer)) return;
+      const requestId = ++heatmapRequestId;
+      
+      const params = new URLSearchParams(last_used_params || '');
+      params.set('bbox', snappedBounds().toBBoxString());
+      params.set('zoom', map.getZoom());
+      
+      fetch('/plugins/praksis-nhn-nautobot/api/samband/heatmap/?' + params.toString())
+        .then(response => {
+          if (!response.ok) {
+            throw new Error(`Network response was not ok (${response.status})`);
+          }
+          return response.json();
+        })
+        .then(data => {
+          if (requestId !== heatmapRequestId) return;
+          heatmapLayer.clearLayers();
+          
+          const [cellLat, cellLng] = data.cell_size;
+          data.cells.forEach(function([lat, lng, value, count]) {
+            // Square root scaling keeps small cells visible next to the busiest ones
+            const intensity = data.max > 0 ? Math.sqrt(value / data.max) : 0;
+            L.rectangle([[lat - cellLat / 2, lng - cellLng / 2], [lat + cellLat / 2, lng + cellLng / 2]], {
+              stroke: false,
+              fillColor: '#ff3d00',
+              fillOpacity: 0.1 + 0.6 * intensity,
+              interactive: false
+            }).addTo(heatmapLayer);
+          });
+        })
+        .catch(error => {
+          console.error("Error loading heatmap:", error);
+        });
+    }
+    
     /**
      * Populate legend with location type icons
      */
@@ -230,19 +399,178 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   
     /**
-     * Process map data and create markers and lines
+     * Draw server-side point clusters, zooming into a cluster when it is clicked
      */
-    function processMapData(data) {
-      document.getElementById('connection-count').textContent = 
-        `${data.count || 0} connection${data.count !== 1 ? 's' : ''}`;
+    function drawClusters(clusters) {
+      clusters.forEach(function(cluster) {
+        const size = Math.min(60, 24 + Math.round(Math.log10(cluster.count + 1) * 12));
+        const marker = L.marker(cluster.location, {
+          icon: L.divIcon({
+            html: `<div class="map-cluster" style="width: ${size}px; height: ${size}px; line-height: ${size}px;">${cluster.count}</div>`,
+            className: '',
+            iconSize: [size, size],
+            iconAnchor: [size / 2, size / 2]
+          })
+        });
+        
+        marker.bindTooltip(`${cluster.count} connection endpoint${cluster.count !== 1 ? 's' : ''}`);
+        marker.on('click', function() {
+          map.fitBounds(cluster.bounds, {
+            padding: [40, 40],
+            maxZoom: map.getZoom() + 3
+          });
+        });
+        
+        marker.addTo(clusterLayer);
+      });
+    }
+  
+    /**
+     * Draw a connection line with status-based color, showing the connection details on click
+     */
+    function addConnectionLine(connection, locationA, locationB) {
+      const connectionId = connection.id;
+      const status = connection.status || 'Unknown';
       
-      pointsLayer.clearLayers();
-      connectionsLayer.clearLayers();
-      radiusLayer.clearLayers();
+      const line = L.polyline([locationA, locationB], {
+        color: getStatusColor(status),
+        weight: 2.5,
+        opacity: 0.8,
+        smoothFactor: 1,
+        status: status
+      });
       
-      if (data.connections && data.connections.length > 0) {
-        var bounds = [];
+      line.bindTooltip(connection.name);
+      line.on('click', function(e) {
+        resetActiveElements();
         
+        // Show popup
+        fetchConnectionDetails(connectionId, function(details) {
+          if (details.error) return;
+          
+          var popupContent = `
+          <div style="min-width: 200px; max-width: 250px;">
+            <strong>${connection.name}</strong><br>
+            <strong>Status:</strong> ${status}<br>
+            <strong>Bandwidth:</strong> ${details.bandwidth || 'N/A'}<br>
+            <strong>Vendor:</strong> ${details.vendor || 'N/A'}<br>
+            <strong>Type:</strong> ${details.type_name || 'N/A'}<br>
+            ${details.regions.length ? `<strong>Region:</strong> ${details.regions.join(', ')}<br>` : ''}
+            <a href="/plugins/praksis-nhn-nautobot/samband/map/${connectionId}/" class="btn btn-primary btn-xs" style="color: white; font-size: 11px; padding: 2px 5px; margin-top: 5px;">View Details</a>
+          </div>
+          `;
+          
+          // First unbind any existing popup
+          line.unbindPopup();
+          highlightConnection(connectionId);
+          
+          L.popup()
+            .setLatLng(e.latlng)
+            .setContent(popupContent)
+            .openOn(map);
+        });
+      });
+      
+      if (!featureIdToLines[connectionId]) featureIdToLines[connectionId] = [];
+      featureIdToLines[connectionId].push(line);
+      line.addTo(connectionsLayer);
+      return line;
+    }
+  
+    /**
+     * Draw one marker per site from the shared points table and the connections between them
+     */
+    function drawSites(points, connections) {
+      // A site on several pages of one load keeps a single marker
+      const markers = points.map(function(point) {
+        const key = point.location.join(',');
+        if (!siteMarkers.has(key)) {
+          const marker = createSiteMarker(point);
+          marker.siteKey = key;
+          siteMarkers.set(key, marker);
+        }
+        return siteMarkers.get(key);
+      });
+      
+      connections.forEach(function(connection) {
+        const markerA = markers[connection.point_a];
+        const markerB = markers[connection.point_b];
+        markerA.siteConnections.push(connection);
+        if (markerB !== markerA) {
+          markerB.siteConnections.push(connection);
+        }
+        
+        // Markers are shared between connections, the lookup still lists both ends of each one
+        if (!featureIdToMarkers[connection.id]) featureIdToMarkers[connection.id] = [];
+        featureIdToMarkers[connection.id].push(markerA, markerB);
+        
+        addConnectionLine(connection, markerA.getLatLng(), markerB.getLatLng());
+      });
+    }
+  
+    /**
+     * Create the marker of a site, listing the connections at the site in its popup
+     */
+    function createSiteMarker(point) {
+      const marker = L.marker(point.location, {
+        icon: createLocationIcon(point.location_type || 'Unknown')
+      });
+      const here = marker.siteConnections = [];
+      
+      marker.bindTooltip(() => here.length === 1 ? here[0].name : `${here.length} connections`);
+      marker.on('click', function() {
+        resetActiveElements();
+        
+        const shown = here.slice(0, 20);
+        const rows = shown.map(connection => `
+          <div>
+            <span style="display: inline-block; width: 8px; height: 8px; border-radius: 50%; background-color: ${getStatusColor(connection.status || 'Unknown')}; margin-right: 4px;"></span>
+            <a href="/plugins/praksis-nhn-nautobot/samband/map/${connection.id}/">${connection.name}</a>
+          </div>
+        `).join('');
+        const more = here.length > shown.length ? `<div class="text-muted">and ${here.length - shown.length} more</div>` : '';
+        
+        marker.bindPopup(`
+          <div style="min-width: 200px; max-width: 250px; max-height: 250px; overflow-y: auto;">
+            <strong>${point.category || 'Site'}</strong> (${here.length} connection${here.length !== 1 ? 's' : ''})<br>
+            ${rows}${more}
+          </div>
+        `).openPopup();
+        
+        if (here.length === 1) {
+          highlightConnection(here[0].id);
+        }
+      });
+      
+      marker.addTo(pointsLayer);
+      return marker;
+    }
+  
+    /**
+     * Process map data and create markers and lines
+     */
+    function processMapData(data, append = false) {
+      // A further page of the same load is added to what is already drawn
+      if (!append) {
+        pointsLayer.clearLayers();
+        connectionsLayer.clearLayers();
+        radiusLayer.clearLayers();
+        clusterLayer.clearLayers();
+        siteMarkers = new Map();
+        loadedConnections = [];
+      }
+      loadedConnections = loadedConnections.concat(data.connections || []);
+      showingClusters = Boolean(data.clustered);
+      
+      const count = data.clustered ? (data.count || 0) : loadedConnections.length;
+      document.getElementById('connection-count').textContent = 
+        `${count} connection${count !== 1 ? 's' : ''}`;
+      
+      if (data.clustered) {
+        drawClusters(data.clusters || []);
+      } else if (data.points) {
+        drawSites(data.points, data.connections || []);
+      } else if (data.connections && data.connections.length > 0) {
         data.connections.forEach(function(connection) {
           const connectionId = connection.id;
           const pointA = connection.point_a || {};
@@ -256,9 +584,6 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
           }
           
-          // Determine colors for status
-          const statusColor = getStatusColor(status);
-          
           // Create Point A marker with icon
           var markerA = L.marker(pointA.location, {
             icon: createLocationIcon(locationType)
@@ -279,6 +604,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 <strong>Bandwidth:</strong> ${details.bandwidth || 'N/A'}<br>
                 <strong>Vendor:</strong> ${details.vendor || 'N/A'}<br>
                 <strong>Type:</strong> ${details.type_name || 'N/A'}<br>
+                ${details.regions.length ? `<strong>Region:</strong> ${details.regions.join(', ')}<br>` : ''}
                 <a href="/plugins/praksis-nhn-nautobot/samband/map/${connectionId}/" class="btn btn-primary btn-xs" style="color: white; font-size: 11px; padding: 2px 5px; margin-top: 5px;">View Details</a>
               </div>
               `;
@@ -308,6 +634,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 <strong>Bandwidth:</strong> ${details.bandwidth || 'N/A'}<br>
                 <strong>Vendor:</strong> ${details.vendor || 'N/A'}<br>
                 <strong>Type:</strong> ${details.type_name || 'N/A'}<br>
+                ${details.regions.length ? `<strong>Region:</strong> ${details.regions.join(', ')}<br>` : ''}
                 <a href="/plugins/praksis-nhn-nautobot/samband/map/${connectionId}/" class="btn btn-primary btn-xs" style="color: white; font-size: 11px; padding: 2px 5px; margin-top: 5px;">View Details</a>
               </div>
               `;
@@ -317,70 +644,22 @@ document.addEventListener('DOMContentLoaded', function() {
             });
           });
           
-          // Create connection line with status-based color
-          var line = L.polyline([pointA.location, pointB.location], {
-            color: statusColor,
-            weight: 2.5,
-            opacity: 0.8,
-            smoothFactor: 1,
-            status: status
-          });
-          
-          line.bindTooltip(connection.name);
-          line.on('click', function(e) {
-            resetActiveElements();
-            
-            // Show popup
-            fetchConnectionDetails(connectionId, function(details) {
-              if (details.error) return;
-              
-              var popupContent = `
-              <div style="min-width: 200px; max-width: 250px;">
-                <strong>${connection.name}</strong><br>
-                <strong>Status:</strong> ${status}<br>
-                <strong>Bandwidth:</strong> ${details.bandwidth || 'N/A'}<br>
-                <strong>Vendor:</strong> ${details.vendor || 'N/A'}<br>
-                <strong>Type:</strong> ${details.type_name || 'N/A'}<br>
-                <a href="/plugins/praksis-nhn-nautobot/samband/map/${connectionId}/" class="btn btn-primary btn-xs" style="color: white; font-size: 11px; padding: 2px 5px; margin-top: 5px;">View Details</a>
-              </div>
-              `;
-              
-              // First unbind any existing popup
-              line.unbindPopup();
-              highlightConnection(connectionId);
-              
-              L.popup()
-                .setLatLng(e.latlng)
-                .setContent(popupContent)
-                .openOn(map);
-            });
-          });
+          addConnectionLine(connection, pointA.location, pointB.location);
           
           // Store references for highlighting
           if (!featureIdToMarkers[connectionId]) featureIdToMarkers[connectionId] = [];
           featureIdToMarkers[connectionId].push(markerA, markerB);
           
-          if (!featureIdToLines[connectionId]) featureIdToLines[connectionId] = [];
-          featureIdToLines[connectionId].push(line);
-          
           // Add to map
           markerA.addTo(pointsLayer);
           markerB.addTo(pointsLayer);
-          line.addTo(connectionsLayer);
-          
-          // Track bounds for fitting view
-          bounds.push(pointA.location);
-          bounds.push(pointB.location);
         });
-        
-        // Fit map to bounds
-        if (bounds.length > 0) map.fitBounds(bounds);
       } else {
         console.warn("Damn.. No connections found.");
       }
       
       // Add radius circle if specified
-      if (data.radius) {
+      if (data.radius && !append) {
         radiusMarker = L.circle(data.radius.location, {
           radius: data.radius.radius_km * 1000,
           color: '#ff7800',
@@ -391,24 +670,46 @@ document.addEventListener('DOMContentLoaded', function() {
         currentRadius = data.radius.radius_km;
       }
       
-      // Update the connections list with the data
-      updateConnectionsList(data.connections || []);
+      // Update the connections list with the data, a further page only adds its own rows
+      const pageConnections = data.connections || [];
+      if (append && !data.clustered && loadedConnections.length > pageConnections.length) {
+        document.getElementById('list-connection-count').textContent = loadedConnections.length;
+        appendConnectionRows(pageConnections);
+      } else {
+        updateConnectionsList(loadedConnections, data.clustered);
+      }
     }
   
     /**
      * Update the connections list in the sidebar
      */
-    function updateConnectionsList(connections) {
+    function updateConnectionsList(connections, clustered) {
       const listEl = document.getElementById('connections-list');
       const countEl = document.getElementById('list-connection-count');
       
       countEl.textContent = connections.length;
       
+      if (clustered) {
+        listEl.innerHTML = '<tr><td colspan="2" class="text-center p-3 text-muted">Zoom in to list connections</td></tr>';
+        return;
+      }
+      
       if (connections.length === 0) {
         listEl.innerHTML = '<tr><td colspan="2" class="text-center p-3 text-muted">No connections to display</td></tr>';
         return;
       }
       
+      listEl.innerHTML = '';
+      appendConnectionRows(connections);
+    }
+  
+    /**
+     * Add rows for connections to the end of the sidebar list
+     */
+    function appendConnectionRows(connections) {
+      const listEl = document.getElementById('connections-list');
+      const firstNewRow = listEl.children.length;
+      
       let html = '';
       connections.forEach(connection => {
         const statusColor = getStatusColor(connection.status || 'Unknown');
@@ -426,10 +727,13 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
       });
       
-      listEl.innerHTML = html;
+      listEl.insertAdjacentHTML('beforeend', html);
       
-      // Add click handlers to rows
-      document.querySelectorAll('.connection-row').forEach(row => {
+      // Add click handlers to the new rows, and load the details on hover so the popup opens at once
+      Array.from(listEl.children).slice(firstNewRow).forEach(row => {
+        row.addEventListener('mouseenter', function() {
+          fetchConnectionDetails(this.dataset.id);
+        });
         row.addEventListener('click', function() {
           const connectionId = this.dataset.id;
           resetActiveElements();
@@ -564,25 +868,74 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   
     /**
-     * Fetch connection details from the API
+     * Get connection details from the cache, or queue them for the next batch request
      */
     function fetchConnectionDetails(connectionId, callback) {
-      fetch(`/plugins/praksis-nhn-nautobot/api/samband/map-data/?connection_id=${connectionId}`)
-        .then(response => response.json())
+      if (detailCache.has(connectionId)) {
+        callback(detailCache.get(connectionId));
+        return;
+      }
+      
+      if (!pendingDetails.has(connectionId)) {
+        pendingDetails.set(connectionId, []);
+      }
+      if (callback) {
+        pendingDetails.get(connectionId).push(callback);
+      }
+      
+      // Requests made close together, like a row hover followed by a click, share one fetch
+      if (!detailBatchTimeout) {
+        detailBatchTimeout = setTimeout(fetchPendingDetails, 50);
+      }
+    }
+  
+    /**
+     * Fetch the details of every queued connection from the batch details API
+     */
+    function fetchPendingDetails() {
+      detailBatchTimeout = null;
+      const batch = new Map(Array.from(pendingDetails).slice(0, 100));
+      batch.forEach((callbacks, connectionId) => pendingDetails.delete(connectionId));
+      if (pendingDetails.size > 0) {
+        detailBatchTimeout = setTimeout(fetchPendingDetails, 0);
+      }
+      
+      const requestVersion = datasetVersion;
+      const url = '/plugins/praksis-nhn-nautobot/api/samband/details/?ids=' + Array.from(batch.keys()).join(',');
+      fetch(url)
+        .then(response => {
+          if (!response.ok) {
+            throw new Error(`Network response was not ok (${response.status})`);
+          }
+          return response.json();
+        })
         .then(data => {
-          console.log("Connection details received:", data);
-          callback(data);
+          batch.forEach((callbacks, connectionId) => {
+            const details = data.details[connectionId] || { error: 'Connection not found' };
+            // Details fetched before a data change are not kept
+            if (!details.error && requestVersion === datasetVersion) {
+              detailCache.set(connectionId, details);
+            }
+            callbacks.forEach(callback => callback(details));
+          });
         })
         .catch(error => {
           console.error("Error fetching connection details:", error);
-          callback({ error: 'Could not load connection details' });
+          batch.forEach(callbacks => {
+            callbacks.forEach(callback => callback({ error: 'Could not load connection details' }));
+          });
         });
     }
   
     /**
-     * Load map data from the API
+     * Load map data for the current viewport from the API
+     *
+     * params holds the filters only; the viewport bbox and zoom are added here.
+     * With options.fit the map is fitted to everything that matches the filters.
      */
-    function loadMapData(params) {
+    function loadMapData(params, options = {}) {
+      const keepSelectedId = options.keepSelection ? selectedConnectionId : null;
+      const requestId = ++mapRequestId;
       resetActiveElements();
       featureIdToMarkers = {};
       featureIdToLines = {};
@@ -590,38 +943,321 @@ document.addEventListener('DOMContentLoaded', function() {
       document.getElementById('loading-indicator').style.display = 'block';
       document.getElementById('connection-count').textContent = 'Loading...';
       
-      let url = '/plugins/praksis-nhn-nautobot/api/samband/map-data/';
-      if (params) {
-        url += '?' + params;
-        console.log("Loading map data with params:", params);
+      const requestParams = new URLSearchParams(params || '');
+      requestParams.set('bbox', snappedBounds().toBBoxString());
+      requestParams.set('zoom', map.getZoom());
+      // Sites shared by many connections are sent and drawn once, in the compact columnar format
+      requestParams.set('points', '1');
+      requestParams.set('format', 'columnar');
+      if (options.fit) {
+        requestParams.set('extent', '1');
       }
       
-      console.log("URL:", url);
-      fetch(url)
+      // Connections come in pages that are drawn as they arrive
+      requestParams.set('page_size', MAP_PAGE_SIZE);
+      
+      function loadPage(cursor) {
+        if (cursor) {
+          requestParams.set('cursor', cursor);
+        }
+        const url = '/plugins/praksis-nhn-nautobot/api/samband/map-data/?' + requestParams.toString();
+        console.log("URL:", url);
+        return fetch(url)
+          .then(response => {
+            if (!response.ok) {
+              throw new Error(`Network response was not ok (${response.status})`);
+            }
+            return response.json();
+          })
+          .then(decodeColumnar)
+          .then(data => {
+            // A newer request has been sent while this one was in flight
+            if (requestId !== mapRequestId) return;
+            
+            if (cursor) {
+              processMapData(data, true);
+            } else {
+              showFirstPage(data);
+            }
+            
+            // Keep the selected connection highlighted when only the viewport changed
+            if (keepSelectedId && featureIdToMarkers[keepSelectedId]) {
+              highlightConnection(keepSelectedId);
+              highlightConnectionInList(keepSelectedId);
+            }
+            
+            if (data.next_cursor) {
+              document.getElementById('connection-count').textContent += ' (loading more...)';
+              return loadPage(data.next_cursor);
+            }
+          });
+      }
+      
+      function showFirstPage(data) {
+        // Redraw the tiles and recount the filter values when the filters or the data have changed
+        const tilesOutdated = last_used_params !== params || datasetVersion !== data.version;
+        if (tilesOutdated) {
+          loadFacets(params);
+        }
+        if (datasetVersion !== data.version) {
+          detailCache.clear();
+        }
+        datasetVersion = data.version;
+        syncToken = data.sync_token;
+        
+        // Store the current params
+        last_used_params = params;
+        if (tilesOutdated && map.hasLayer(tileLayer)) {
+          tileLayer.redraw();
+        }
+        console.log("last used params:", last_used_params);
+        
+        // Update all navigation links with current params
+        updateNavigationLinks();
+        
+        console.log(`Received ${data.count} connections:`, data);
+        processMapData(data);
+        loadHeatmap();
+        
+        // Moving the map triggers another load for the new viewport, which stops this one
+        if (options.fit && data.extent) {
+          map.fitBounds(data.extent, {
+            padding: [50, 50],
+            maxZoom: 14
+          });
+        }
+      }
+      
+      loadPage(null)
+        .catch(error => {
+          console.error("Error loading map data:", error);
+          document.getElementById('connection-count').textContent = '0 connections';
+        })
+        .finally(() => {
+          if (requestId === mapRequestId) {
+            document.getElementById('loading-indicator').style.display = 'none';
+          }
+        });
+    }
+  
+    /**
+     * Fetch the connections changed since the last load or sync and update the map with them
+     */
+    function syncMapData() {
+      if (!syncToken || document.hidden) return;
+      const requestId = mapRequestId;
+      
+      const requestParams = new URLSearchParams(last_used_params || '');
+      requestParams.set('since', syncToken);
+      fetch('/plugins/praksis-nhn-nautobot/api/samband/sync/?' + requestParams.toString())
         .then(response => {
+          // A token from an older version of the API cannot be read, so start over
+          if (response.status === 400 && requestId === mapRequestId) {
+            loadMapData(last_used_params, { keepSelection: true });
+            return null;
+          }
           if (!response.ok) {
             throw new Error(`Network response was not ok (${response.status})`);
           }
           return response.json();
         })
         .then(data => {
-          // Store the current params
-          last_used_params = params;
-          console.log("last used params:", last_used_params);
+          // A new load has replaced what this sync would update
+          if (!data || requestId !== mapRequestId) return;
+          
+          // The token is too old to know what was deleted, or clusters must be counted again
+          const hasChanges = data.changed.length > 0 || data.removed.length > 0;
+          if (data.reset || (hasChanges && showingClusters)) {
+            loadMapData(last_used_params, { keepSelection: true });
+            return;
+          }
           
-          // Update all navigation links with current params
-          updateNavigationLinks();
+          syncToken = data.sync_token;
+          if (!hasChanges) return;
           
-          console.log(`Received ${data.count} connections:`, data);
-          processMapData(data);
+          datasetVersion = data.version;
+          applyChanges(data.changed, data.removed);
+          loadFacets(last_used_params);
+          if (map.hasLayer(tileLayer)) {
+            tileLayer.redraw();
+          }
+          loadHeatmap();
+          
+          if (data.more) {
+            syncMapData();
+          }
         })
         .catch(error => {
-          console.error("Error loading map data:", error);
-          document.getElementById('connection-count').textContent = '0 connections';
+          console.error("Error syncing map data:", error);
+        });
+    }
+  
+    /**
+     * Show next to each filter checkbox how many connections there would be with it checked
+     */
+    function loadFacets(params) {
+      fetch('/plugins/praksis-nhn-nautobot/api/samband/facets/?' + new URLSearchParams(params || '').toString())
+        .then(response => {
+          if (!response.ok) {
+            throw new Error(`Network response was not ok (${response.status})`);
+          }
+          return response.json();
         })
-        .finally(() => {
-          document.getElementById('loading-indicator').style.display = 'none';
+        .then(data => {
+          Object.entries(data.facets).forEach(([field, values]) => {
+            const counts = new Map(values.map(item => [item.value, item.count]));
+            document.querySelectorAll(`input[type="checkbox"][name="${field}"]`).forEach(checkbox => {
+              const countEl = document.querySelector(`label[for="${checkbox.id}"] .facet-count`);
+              if (countEl) {
+                countEl.textContent = `(${counts.get(checkbox.value) || 0})`;
+              }
+            });
+          });
+        })
+        .catch(error => {
+          console.error("Error loading filter counts:", error);
+        });
+    }
+  
+    /**
+     * Listen for change events from the server, returning false if the browser cannot
+     */
+    function subscribeToChanges() {
+      if (!window.EventSource) return false;
+      
+      let source = null;
+      let polling = false;
+      const open = () => {
+        source = new EventSource('/plugins/praksis-nhn-nautobot/api/samband/events/');
+        // Saves and deletes are fetched through the sync API, which applies the filters of the map
+        ['saved', 'deleted'].forEach(type => source.addEventListener(type, scheduleSync));
+        // Catch up on changes made while the stream was reconnecting or the page was hidden
+        source.addEventListener('open', scheduleSync);
+        // The server turns the stream down when it has no broker or no free stream, so poll instead
+        source.addEventListener('error', () => {
+          if (source.readyState !== EventSource.CLOSED || polling) return;
+          polling = true;
+          setInterval(syncMapData, SYNC_INTERVAL);
         });
+      };
+      
+      // A hidden page gives its stream back to the server
+      document.addEventListener('visibilitychange', () => {
+        if (polling) return;
+        if (document.hidden) {
+          source.close();
+        } else {
+          open();
+        }
+      });
+      open();
+      return true;
+    }
+  
+    /**
+     * Sync shortly, so a burst of changes is fetched in one request
+     */
+    function scheduleSync() {
+      clearTimeout(syncTimeout);
+      syncTimeout = setTimeout(syncMapData, 500);
+    }
+  
+    /**
+     * Redraw changed connections and take removed ones off the map
+     */
+    function applyChanges(changed, removed) {
+      removed.concat(changed.map(connection => connection.id)).forEach(removeConnection);
+      
+      // Changed connections are drawn like a page of shared sites, reusing the markers already on the map
+      const points = [];
+      const connections = [];
+      changed.forEach(connection => {
+        // Connections that lost their coordinates stay off the map
+        if (connection.point_a.location.includes(null) || connection.point_b.location.includes(null)) return;
+        points.push(
+          { location: connection.point_a.location, category: connection.point_a.category, location_type: connection.location_type },
+          { location: connection.point_b.location, category: connection.point_b.category, location_type: connection.location_type }
+        );
+        connections.push(Object.assign({}, connection, { point_a: points.length - 2, point_b: points.length - 1 }));
+      });
+      drawSites(points, connections);
+      
+      loadedConnections = loadedConnections.concat(connections);
+      document.getElementById('connection-count').textContent = 
+        `${loadedConnections.length} connection${loadedConnections.length !== 1 ? 's' : ''}`;
+      updateConnectionsList(loadedConnections, false);
+      
+      if (selectedConnectionId && featureIdToMarkers[selectedConnectionId]) {
+        highlightConnection(selectedConnectionId);
+      }
+    }
+  
+    /**
+     * Take a connection off the map, along with site markers that no other connection uses
+     */
+    function removeConnection(connectionId) {
+      (featureIdToLines[connectionId] || []).forEach(line => connectionsLayer.removeLayer(line));
+      (featureIdToMarkers[connectionId] || []).forEach(marker => {
+        if (!marker.siteConnections) {
+          pointsLayer.removeLayer(marker);
+          return;
+        }
+        const remaining = marker.siteConnections.filter(connection => connection.id !== connectionId);
+        marker.siteConnections.splice(0, marker.siteConnections.length, ...remaining);
+        if (remaining.length === 0) {
+          pointsLayer.removeLayer(marker);
+          siteMarkers.delete(marker.siteKey);
+        }
+      });
+      
+      delete featureIdToLines[connectionId];
+      delete featureIdToMarkers[connectionId];
+      detailCache.delete(connectionId);
+      loadedConnections = loadedConnections.filter(connection => connection.id !== connectionId);
+    }
+  
+    /**
+     * Turn a columnar map-data response back into connection and point objects
+     */
+    function decodeColumnar(data) {
+      if (data.format !== 'columnar') return data;
+      
+      const columns = data.columns;
+      const scale = data.scale;
+      const statuses = data.dictionaries.status;
+      const locationTypes = data.dictionaries.location_type;
+      
+      const connections = columns.id.map(function(id, i) {
+        const connection = {
+          id: id,
+          name: columns.name[i],
+          status: statuses[columns.status[i]],
+          location_type: locationTypes[columns.location_type[i]],
+          length_km: columns.length_km[i]
+        };
+        if (columns.distance_km) {
+          connection.distance_km = columns.distance_km[i];
+        }
+        if (columns.point_a) {
+          // Indexes into the shared points
+          connection.point_a = columns.point_a[i];
+          connection.point_b = columns.point_b[i];
+        } else {
+          connection.point_a = { location: [columns.a_lat[i] / scale, columns.a_lng[i] / scale] };
+          connection.point_b = { location: [columns.b_lat[i] / scale, columns.b_lng[i] / scale] };
+        }
+        return connection;
+      });
+      
+      const decoded = Object.assign({}, data, { connections: connections });
+      if (data.points) {
+        decoded.points = data.points.lat.map((lat, i) => ({
+          location: [lat / scale, data.points.lng[i] / scale],
+          category: data.points.category[i],
+          location_type: locationTypes[data.points.location_type[i]]
+        }));
+      }
+      return decoded;
     }
   
     /**
@@ -975,7 +1611,7 @@ document.addEventListener('DOMContentLoaded', function() {
           params.append('transporttype', checkbox.value);
         });
         
-        loadMapData(params.toString());
+        loadMapData(params.toString(), { fit: true });
       });
   
       // Reset filters button
@@ -989,7 +1625,7 @@ document.addEventListener('DOMContentLoaded', function() {
         document.getElementById('radius').value = '50';
         
         remove_pin();
-        loadMapData();
+        loadMapData('', { fit: true });
       });
   
       // Use current location checkbox
@@ -1029,6 +1665,14 @@ document.addEventListener('DOMContentLoaded', function() {
         }
       });
   
+      // Reload the data for the new viewport after panning or zooming
+      map.on('moveend', function() {
+        clearTimeout(viewportTimeout);
+        viewportTimeout = setTimeout(() => {
+          loadMapData(last_used_params, { keepSelection: true });
+        }, 250);
+      });
+  
       // Handle window resize
       window.addEventListener('resize', function() {
         map.invalidateSize();
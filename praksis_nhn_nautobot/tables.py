@@ -80,6 +80,11 @@ class SambandTable(BaseTable):
         orderable=True,
         verbose_name="Transport type"
     )
+    length_km = tables.TemplateColumn(
+        template_code="""{% if record.length_km is not None %}{{ record.length_km|floatformat:1 }}{% endif %}""",
+        orderable=True,
+        verbose_name="Length (km)",
+    )
     parents = tables.TemplateColumn(
         template_code="""
             {% for parent in record.parents.all %}
@@ -125,6 +130,7 @@ class SambandTable(BaseTable):
             "type",
             "vendor",
             "transporttype",
+            "length_km",
             "parents",
             "map",
             "graph",
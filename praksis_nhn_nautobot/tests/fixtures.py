@@ -1,5 +1,7 @@
 """Create fixtures for tests."""
 
+from django.test import TestCase
+
 from praksis_nhn_nautobot.models import Samband
 
 
@@ -48,3 +50,25 @@ def create_n_samband(n=20):
             vendor=vendors[i % len(vendors)],
             transporttype=transport_types[i % len(transport_types)],
         )
+
+
+def create_committed_sambands(rows, **common):
+    """
+    Create Samband instances and run the handlers that wait for their transaction to commit.
+
+    Tests run inside a transaction that never commits, so without this the dataset version is not
+    bumped and the spatial index is not refreshed for the new sambands.
+
+    Args:
+        rows (list): Field values of each samband; name, sambandsnummer and smbnr_nhn are numbered when left out
+        **common: Field values of every samband
+
+    Returns:
+        list: The created sambands
+    """
+    sambands = []
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        for number, fields in enumerate(rows):
+            values = {"name": f"Samband {number}", "sambandsnummer": f"SB{number:03}", "smbnr_nhn": f"NHN{number:03}"}
+            sambands.append(Samband.objects.create(**{**values, **common, **fields}))
+    return sambands
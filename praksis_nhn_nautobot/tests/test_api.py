@@ -1,5 +1,7 @@
 """Unit tests for praksis_nhn_nautobot."""
 
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
@@ -8,6 +10,10 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.geo_service import MAX_ZOOM
+from praksis_nhn_nautobot.services.spatial_index import SambandSpatialIndex
+from praksis_nhn_nautobot.services.tile_service import tile_for_point
+from praksis_nhn_nautobot.tests.fixtures import create_committed_sambands
 
 User = get_user_model()
 
@@ -57,3 +63,336 @@ class SambandAPITest(BaseAPITestCase):
         response = self.client.post(url, data=payload, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Samband.objects.filter(name="API Created").exists())
+
+
+class MapAPITestCase(BaseAPITestCase):
+    """Base class for the map endpoint tests, with connections from Oslo to Bergen and to Trondheim."""
+
+    def setUp(self):
+        super().setUp()
+        self.sambands = create_committed_sambands(
+            [{"pop_b_geo_string": "60.3913, 5.3221"}, {"pop_b_geo_string": "63.4305, 10.3951"}],
+            location_type="Data Center",
+            pop_a_geo_string="59.9139, 10.7522",
+        )
+
+
+class SambandMapDataTest(MapAPITestCase):
+    """Test the map-data endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_map_data")
+
+    def test_shared_points(self):
+        """With points=1 each site is sent once and connections refer to it by index."""
+        response = self.client.get(self.url, {"points": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(len(data["points"]), 3)
+        self.assertEqual({connection["point_a"] for connection in data["connections"]}, {0})
+        self.assertEqual(data["points"][0]["location"], [59.9139, 10.7522])
+
+    def test_columnar_format(self):
+        """format=columnar sends parallel arrays with encoded statuses and quantized coordinates."""
+        response = self.client.get(self.url, {"format": "columnar"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        columns = data["columns"]
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["dictionaries"]["location_type"], ["Data Center"])
+        self.assertEqual(columns["location_type"], [0, 0])
+        self.assertEqual(columns["a_lat"], [5991390, 5991390])
+        self.assertEqual(data["scale"], 100000)
+
+    def test_clusters(self):
+        """At low zoom the PoPs are sent as clusters, and zoom levels beyond the grid range are clamped."""
+        for zoom in ("5", "-2000"):
+            response = self.client.get(self.url, {"zoom": zoom})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertTrue(data["clustered"])
+            self.assertEqual(data["count"], 2)
+            self.assertEqual(sum(cluster["count"] for cluster in data["clusters"]), 4)
+
+        data = self.client.get(self.url, {"zoom": "12"}).json()
+        self.assertNotIn("clusters", data)
+        self.assertEqual(len(data["connections"]), 2)
+
+    def test_radius_before_index_refresh(self):
+        """A connection the spatial index does not have yet is sent last, without a distance."""
+        index = SambandSpatialIndex()
+        first = self.sambands[0]
+        index.load([(first.pk, 59.9139, 10.7522, 60.3913, 5.3221)])
+        radius = {"lat": "59.9139", "lng": "10.7522", "radius": "10", "sort": "distance"}
+        with mock.patch("praksis_nhn_nautobot.api.views.get_spatial_index", return_value=index):
+            data = self.client.get(self.url, radius).json()
+            columns = self.client.get(self.url, {**radius, "format": "columnar"}).json()["columns"]
+        self.assertEqual([connection["id"] for connection in data["connections"]], [str(s.pk) for s in self.sambands])
+        self.assertNotIn("distance_km", data["connections"][1])
+        self.assertEqual(columns["distance_km"], [0, None])
+
+    def test_include_fields(self):
+        """Requested fields are sent when they have a value, unknown fields are ignored."""
+        response = self.client.get(self.url, {"include_fields": ["reference", "vendor", "unknown"], "sort": "length"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        connections = response.json()["connections"]
+        self.assertEqual([connection["reference"] for connection in connections], ["SB001", "SB000"])
+        self.assertNotIn("vendor", connections[0])
+        self.assertNotIn("unknown", connections[0])
+        self.assertEqual(connections[0]["point_b"]["location"], [63.4305, 10.3951])
+
+    def test_pages(self):
+        """With page_size the connections come in pk order, each page continuing after the cursor."""
+        first = self.client.get(self.url, {"page_size": "1"}).json()
+        self.assertEqual(first["count"], 1)
+        self.assertIsNotNone(first["next_cursor"])
+
+        last = self.client.get(self.url, {"page_size": "1", "cursor": first["next_cursor"]}).json()
+        self.assertIsNone(last["next_cursor"])
+        ids = [first["connections"][0]["id"], last["connections"][0]["id"]]
+        self.assertEqual(ids, sorted(str(samband.pk) for samband in Samband.objects.all()))
+
+    def test_invalid_cursor(self):
+        """A cursor that is not a connection id is rejected."""
+        response = self.client.get(self.url, {"page_size": "1", "cursor": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_polygon(self):
+        """A polygon that is not GeoJSON is rejected instead of being ignored."""
+        response = self.client.get(self.url, {"polygon": "not-json"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("error", response.json())
+
+    def test_server_timing(self):
+        """Responses report the database and serialization time."""
+        response = self.client.get(self.url)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+
+class SambandMapTileTest(MapAPITestCase):
+    """Test the z/x/y map tile endpoint."""
+
+    def tile_url(self, z, x, y):
+        """Get the URL of a tile."""
+        return reverse("plugins-api:praksis_nhn_nautobot-api:samband_map_tile", kwargs={"z": z, "x": x, "y": y})
+
+    def test_tile(self):
+        """A tile holds the lines crossing it and the PoPs inside it."""
+        response = self.client.get(self.tile_url(6, *tile_for_point(59.9139, 10.7522, 6)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tile = response.json()
+        self.assertEqual({line["id"] for line in tile["lines"]}, {str(samband.pk) for samband in self.sambands})
+        self.assertEqual(len([point for point in tile["points"] if point["end"] == "a"]), 2)
+
+        # Nothing is in the south-western quarter of the world
+        tile = self.client.get(self.tile_url(1, 0, 1)).json()
+        self.assertEqual(tile["lines"], [])
+
+    def test_filters(self):
+        """Tiles take the map filters, and reject invalid ones."""
+        url = self.tile_url(0, 0, 0)
+        self.assertEqual(len(self.client.get(url, {"vendor": "Telia"}).json()["lines"]), 0)
+        self.assertEqual(len(self.client.get(url).json()["lines"]), 2)
+        response = self.client.get(url, {"polygon": "not-json"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range(self):
+        """Tiles outside the zoom level are not found."""
+        self.assertEqual(self.client.get(self.tile_url(1, 2, 0)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.tile_url(19, 0, 0)).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SambandNearestTest(MapAPITestCase):
+    """Test the k-nearest connections endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_nearest")
+
+    def test_nearest(self):
+        """Connections come closest first, limited to k and to the radius."""
+        data = self.client.get(self.url, {"lat": "60.3913", "lng": "5.3221", "k": "2"}).json()
+        self.assertEqual([connection["id"] for connection in data["connections"]], [str(s.pk) for s in self.sambands])
+        self.assertEqual(data["connections"][0]["distance_km"], 0)
+
+        data = self.client.get(self.url, {"lat": "60.3913", "lng": "5.3221", "radius": "100"}).json()
+        self.assertEqual(data["count"], 1)
+
+    def test_invalid(self):
+        """A missing point, a k below one and an invalid polygon are rejected."""
+        for params in ({"lat": "60"}, {"lat": "60", "lng": "5", "k": "0"}, {"lat": "60", "lng": "5", "polygon": "x"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class SambandHeatmapTest(MapAPITestCase):
+    """Test the density heatmap endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_heatmap")
+
+    def test_heatmap(self):
+        """Both ends of every connection are counted in the cells."""
+        response = self.client.get(self.url, {"zoom": "5"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["weight"], "count")
+        self.assertEqual(sum(cell[3] for cell in data["cells"]), 4)
+        self.assertEqual(data["max"], 2)
+
+    def test_zoom_is_clamped(self):
+        """Zoom levels beyond the grid range are clamped instead of failing."""
+        for zoom, expected in (("5000", MAX_ZOOM), ("-2000", 0)):
+            response = self.client.get(self.url, {"zoom": zoom})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["zoom"], expected)
+
+    def test_invalid(self):
+        """An unknown weight, a zoom that is not a number and an invalid bbox are rejected."""
+        for params in ({"weight": "height"}, {"zoom": "near"}, {"bbox": "1,2"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class SambandSyncTest(MapAPITestCase):
+    """Test the sync endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_sync")
+
+    def test_sync(self):
+        """Without a token the client reloads, and with one it gets the changes since."""
+        data = self.client.get(self.url).json()
+        self.assertTrue(data["reset"])
+        self.assertEqual(data["changed"], [])
+
+        oslo_bergen, oslo_trondheim = self.sambands
+        deleted_pk = str(oslo_trondheim.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            oslo_bergen.name = "Oslo - Bergen"
+            oslo_bergen.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            oslo_trondheim.delete()
+
+        data = self.client.get(self.url, {"since": data["sync_token"]}).json()
+        self.assertFalse(data["reset"])
+        self.assertEqual([connection["name"] for connection in data["changed"]], ["Oslo - Bergen"])
+        self.assertEqual(data["removed"], [deleted_pk])
+
+    def test_invalid_token(self):
+        """Tokens that were not issued by the endpoint are rejected."""
+        response = self.client.get(self.url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        """Anonymous requests are rejected."""
+        self.client.credentials()
+        response = self.client.get(self.url)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+class SambandEventStreamTest(BaseAPITestCase):
+    """Test the event stream endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_events")
+
+    def test_streams_off(self):
+        """Without streams the client is told to use the sync API."""
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_requires_authentication(self):
+        """Anonymous requests are rejected."""
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SambandDetailsTest(BaseAPITestCase):
+    """Test the batch connection details endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.sambands = create_committed_sambands([{}, {}], pop_a_geo_string="59.9139, 10.7522")
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_details")
+
+    def test_details(self):
+        """Details of every existing id are returned and unknown ids are listed as missing."""
+        missing = "00000000-0000-0000-0000-000000000000"
+        ids = ",".join([str(samband.pk) for samband in self.sambands] + [missing])
+        response = self.client.get(self.url, {"ids": ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["missing"], [missing])
+        details = data["details"][str(self.sambands[1].pk)]
+        self.assertEqual(details["reference"], "SB001")
+        self.assertEqual(details["pop_a_coords"], [59.9139, 10.7522])
+        self.assertIsNone(details["pop_b_coords"])
+
+    def test_invalid_ids(self):
+        """Ids that are not UUIDs are rejected."""
+        response = self.client.get(self.url, {"ids": "not-an-id"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        """Anonymous requests are rejected."""
+        self.client.credentials()
+        response = self.client.get(self.url, {"ids": str(self.sambands[0].pk)})
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+class SambandChoicesTest(BaseAPITestCase):
+    """Test the filter value search endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        create_committed_sambands([{"vendor": vendor} for vendor in ["Telenor", "Telia", "Telia", ""]])
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_choices")
+
+    def test_search(self):
+        """Distinct values containing the query are returned in pages."""
+        data = self.client.get(self.url, {"field": "vendor", "q": "tel", "limit": "1"}).json()
+        self.assertEqual(data["results"], [{"id": "Telenor", "display": "Telenor"}])
+        self.assertIn("offset=1", data["next"])
+
+        data = self.client.get(self.url, {"field": "vendor", "offset": "1"}).json()
+        self.assertEqual(data["results"], [{"id": "Telia", "display": "Telia"}])
+        self.assertIsNone(data["next"])
+
+    def test_unknown_field(self):
+        """Only the filter fields can be searched."""
+        response = self.client.get(self.url, {"field": "name"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SambandGeoJSONExportTest(BaseAPITestCase):
+    """Test the GeoJSON export endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        Samband.objects.create(
+            name="Oslo - Bergen",
+            sambandsnummer="SB001",
+            smbnr_nhn="NHN001",
+            pop_a_geo_string="59.9139, 10.7522",
+            pop_b_geo_string="60.3913, 5.3221",
+        )
+        self.url = reverse("plugins-api:praksis_nhn_nautobot-api:samband_geojson")
+
+    def test_export(self):
+        """Authenticated users get the sambands as features."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"Oslo - Bergen", b"".join(response.streaming_content))
+
+    def test_requires_authentication(self):
+        """Anonymous requests are rejected."""
+        self.client.credentials()
+        response = self.client.get(self.url)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
@@ -0,0 +1,85 @@
+"""Unit tests for the cache service module."""
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse, QueryDict
+from django.test import RequestFactory, TestCase
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.cache_service import (
+    RESPONSE_CACHE_LOOKUPS,
+    bump_dataset_version,
+    conditional_on_dataset,
+    get_dataset_version,
+    get_or_build,
+    versioned_cache_key,
+)
+
+
+class ResponseCacheTest(TestCase):
+    """Tests for the versioned response cache."""
+
+    def test_get_or_build(self):
+        """The response is built once and counted as a miss, then a hit."""
+        hits = RESPONSE_CACHE_LOOKUPS.labels(namespace="test", result="hit")
+        hits_before = hits._value.get()  # pylint: disable=protected-access
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"count": 1}
+
+        self.assertEqual(get_or_build("test", "praksis_nhn_nautobot:test:key", build), {"count": 1})
+        self.assertEqual(get_or_build("test", "praksis_nhn_nautobot:test:key", build), {"count": 1})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(hits._value.get(), hits_before + 1)  # pylint: disable=protected-access
+
+    def test_cache_key(self):
+        """Parameter order does not change the key, an empty filter value does."""
+        keys = ["vendor", "status"]
+        key = versioned_cache_key("test", QueryDict("vendor=B&status=Active&vendor=A"), keys)
+        self.assertEqual(key, versioned_cache_key("test", QueryDict("vendor=A&vendor=B&status=Active&page=2"), keys))
+        self.assertNotEqual(
+            versioned_cache_key("test", QueryDict("vendor="), keys), versioned_cache_key("test", QueryDict(""), keys)
+        )
+
+    def test_parent_change_bumps_version(self):
+        """Linking a parent connection invalidates cached responses once the change commits."""
+        parent = Samband.objects.create(name="Parent", sambandsnummer="SB001", smbnr_nhn="NHN001")
+        child = Samband.objects.create(name="Child", sambandsnummer="SB002", smbnr_nhn="NHN002")
+        version = get_dataset_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            child.parents.add(parent)
+            self.assertEqual(get_dataset_version(), version)
+        self.assertEqual(get_dataset_version(), version + 1)
+
+
+class ConditionalOnDatasetTest(TestCase):
+    """Tests for the dataset ETag decorator."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = conditional_on_dataset(lambda request: JsonResponse({"ok": True}))
+
+    def get(self, path, **headers):
+        request = self.factory.get(path, **headers)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_not_modified(self):
+        """The same query in any parameter order gets a 304 until the dataset changes."""
+        response = self.get("/map-data/?vendor=B&vendor=A&status=Active")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        etag = response["ETag"]
+        reordered = "/map-data/?status=Active&vendor=A&vendor=B"
+        self.assertEqual(self.get(reordered, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        bump_dataset_version()
+        self.assertEqual(self.get(reordered, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_query_changes_etag(self):
+        """Different filters get different ETags."""
+        self.assertNotEqual(self.get("/map-data/?vendor=A")["ETag"], self.get("/map-data/?vendor=B")["ETag"])
+        # An empty value filters on a blank vendor, so it is not the same query as no filter
+        self.assertNotEqual(self.get("/map-data/?vendor=")["ETag"], self.get("/map-data/")["ETag"])
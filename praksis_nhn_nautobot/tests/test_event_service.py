@@ -0,0 +1,105 @@
+"""Unit tests for the event service module."""
+
+from itertools import islice
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services import event_service
+from praksis_nhn_nautobot.services.event_service import format_sse, get_redis_url, open_stream, publish
+
+User = get_user_model()
+
+STREAMS_ON = {"praksis_nhn_nautobot": {"event_max_streams": 1}}
+
+
+class EventServiceTest(TestCase):
+    """Tests for the event streams and the broker settings."""
+
+    def setUp(self):
+        self.broker = mock.Mock()
+        self.broker.subscribe.return_value.get.return_value = None
+        for name, value in (("_broker", self.broker), ("_broker_checked", True), ("_stream_slots", None)):
+            patcher = mock.patch.object(event_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="viewer")
+
+    def test_format_sse(self):
+        """Events are sent with the version as id and the type as event name."""
+        message = format_sse({"type": "deleted", "id": "1", "version": 2})
+        self.assertTrue(message.startswith("id: 2\nevent: deleted\ndata: {"))
+        self.assertTrue(message.endswith("\n\n"))
+
+    @override_settings(PLUGINS_CONFIG=STREAMS_ON)
+    def test_open_stream(self):
+        """Each process serves up to event_max_streams streams, and closing one frees its slot."""
+        stream = open_stream(self.user, 0, 0)
+        self.assertEqual(list(stream), ["retry: 5000\n\n"])
+        self.assertIsNone(open_stream(self.user, 0, 0))
+
+        stream.close()
+        stream.close()
+        self.broker.subscribe.return_value.close.assert_called_once()
+        self.assertIsNotNone(open_stream(self.user, 0, 0))
+
+    def test_streams_off(self):
+        """No stream is opened by default or without a broker."""
+        self.assertIsNone(open_stream(self.user, 0, 0))
+        with override_settings(PLUGINS_CONFIG=STREAMS_ON):
+            with mock.patch.object(event_service, "_broker", None):
+                self.assertIsNone(open_stream(self.user, 0, 0))
+
+    @override_settings(PLUGINS_CONFIG=STREAMS_ON)
+    def test_stream_filters_events(self):
+        """Users only get the events of sambands they may view, and of deleted ones."""
+        samband = Samband.objects.create(name="Core", sambandsnummer="SB001", smbnr_nhn="NHN001")
+        events = [
+            {"type": "saved", "id": str(samband.pk), "version": 2},
+            {"type": "deleted", "id": str(samband.pk), "version": 3},
+        ]
+        self.broker.subscribe.return_value.get.side_effect = [*events, None]
+        stream = open_stream(self.user, 1, 0)
+        messages = list(islice(stream, 3))
+        stream.close()
+        self.assertEqual(messages, ["retry: 5000\n\n", format_sse(events[1]), ": keepalive\n\n"])
+
+    def test_publish_streams_off(self):
+        """Nothing is published while the streams are off."""
+        publish({"type": "deleted", "id": "1", "version": 2})
+        self.broker.publish.assert_not_called()
+
+    @override_settings(
+        PLUGINS_CONFIG={},
+        CACHES={"default": {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": "redis://redis:6379/1"}},
+    )
+    def test_get_redis_url(self):
+        """The Redis of the Nautobot cache is used unless event_redis_url is set."""
+        self.assertEqual(get_redis_url(), "redis://redis:6379/1")
+        with override_settings(PLUGINS_CONFIG={"praksis_nhn_nautobot": {"event_redis_url": "redis://events:6379/0"}}):
+            self.assertEqual(get_redis_url(), "redis://events:6379/0")
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            with override_settings(CELERY_BROKER_URL="redis://redis:6379/0"):
+                self.assertEqual(get_redis_url(), "redis://redis:6379/0")
+            with override_settings(CELERY_BROKER_URL="amqp://rabbitmq"):
+                self.assertIsNone(get_redis_url())
+
+    @override_settings(PLUGINS_CONFIG=STREAMS_ON)
+    def test_saved_and_parents(self):
+        """Saves and parent edits are published after the transaction commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            parent = Samband.objects.create(name="Core", status="Active", sambandsnummer="SB001", smbnr_nhn="NHN001")
+        event = self.broker.publish.call_args.args[0]
+        self.assertEqual((event["type"], event["id"], event["status"]), ("saved", str(parent.pk), "Active"))
+
+        # Nothing is published while the transaction is open
+        self.broker.publish.reset_mock()
+        child = Samband.objects.create(name="Edge", sambandsnummer="SB002", smbnr_nhn="NHN002")
+        self.broker.publish.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            child.parents.add(parent)
+        event = self.broker.publish.call_args.args[0]
+        self.assertEqual((event["type"], event["id"], event["parents"]), ("parents", str(child.pk), [str(parent.pk)]))
@@ -0,0 +1,50 @@
+"""Unit tests for the export service module."""
+
+import json
+
+from django.test import TestCase
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.export_service import (
+    GEOJSON_DEFAULT_PROPERTIES,
+    iter_geojson,
+    parse_geojson_properties,
+)
+
+
+class GeoJSONExportTest(TestCase):
+    """Tests for the streaming GeoJSON export."""
+
+    def setUp(self):
+        self.samband = Samband.objects.create(
+            name="Oslo - Bergen",
+            sambandsnummer="SB001",
+            smbnr_nhn="NHN001",
+            status="Active",
+            pop_a_geo_string="59.9139, 10.7522",
+            pop_b_geo_string="60.3913, 5.3221",
+        )
+        Samband.objects.create(name="Unlocated", sambandsnummer="SB002", smbnr_nhn="NHN002")
+
+    def test_feature_collection(self):
+        """Located connections become LineStrings in [lng, lat] order."""
+        document = json.loads("".join(iter_geojson(Samband.objects.all(), ["name", "status"])))
+        self.assertEqual(document["type"], "FeatureCollection")
+        self.assertEqual(len(document["features"]), 1)
+
+        feature = document["features"][0]
+        self.assertEqual(feature["id"], str(self.samband.pk))
+        self.assertEqual(feature["geometry"]["coordinates"], [[10.7522, 59.9139], [5.3221, 60.3913]])
+        self.assertEqual(feature["properties"], {"name": "Oslo - Bergen", "status": "Active"})
+
+    def test_empty_collection(self):
+        """An empty queryset still gives a valid document."""
+        document = json.loads("".join(iter_geojson(Samband.objects.none(), ["name"])))
+        self.assertEqual(document["features"], [])
+
+    def test_parse_properties(self):
+        """Requested properties are split, deduplicated and validated."""
+        self.assertEqual(parse_geojson_properties([]), list(GEOJSON_DEFAULT_PROPERTIES))
+        self.assertEqual(parse_geojson_properties(["name,vendor", "name"]), ["name", "vendor"])
+        with self.assertRaises(ValueError):
+            parse_geojson_properties(["parents"])
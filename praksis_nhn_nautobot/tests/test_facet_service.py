@@ -0,0 +1,48 @@
+"""Unit tests for the facet service module."""
+
+from django.test import TestCase
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.facet_service import compute_facets, get_facets
+from praksis_nhn_nautobot.tests.fixtures import create_committed_sambands
+
+
+class FacetServiceTest(TestCase):
+    """Tests for compute_facets and get_facets."""
+
+    def setUp(self):
+        create_committed_sambands(
+            [
+                {"vendor": vendor, "status": status}
+                for vendor, status in [
+                    ("Telenor", "Active"),
+                    ("Telenor", "Planned"),
+                    ("Telia", "Active"),
+                    ("", "Active"),
+                ]
+            ]
+        )
+
+    def test_counts(self):
+        """Values are counted and sorted, empty values are left out."""
+        facets = compute_facets(Samband.objects.all())
+        self.assertEqual(facets["vendor"], [{"value": "Telenor", "count": 2}, {"value": "Telia", "count": 1}])
+        self.assertEqual(facets["status"], [{"value": "Active", "count": 3}, {"value": "Planned", "count": 1}])
+        self.assertEqual(facets["type"], [])
+
+    def test_selected(self):
+        """Each field is counted against the selections in the other fields only."""
+        facets = compute_facets(Samband.objects.all(), {"vendor": ["Telia"], "status": ["Planned"]})
+        self.assertEqual(facets["vendor"], [{"value": "Telenor", "count": 1}])
+        self.assertEqual(facets["status"], [{"value": "Active", "count": 1}])
+
+        facets = compute_facets(Samband.objects.all(), {"vendor": ["Telenor"]})
+        self.assertEqual(facets["vendor"], [{"value": "Telenor", "count": 2}, {"value": "Telia", "count": 1}])
+        self.assertEqual(facets["status"], [{"value": "Active", "count": 1}, {"value": "Planned", "count": 1}])
+
+    def test_get_facets(self):
+        """Cached facets are rebuilt once the dataset changes."""
+        self.assertEqual(len(get_facets()["vendor"]), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Samband.objects.create(name="New", vendor="Broadnet", sambandsnummer="SB009", smbnr_nhn="NHN009")
+        self.assertEqual(get_facets()["vendor"][0], {"value": "Broadnet", "count": 1})
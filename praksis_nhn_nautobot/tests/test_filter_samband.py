@@ -48,3 +48,13 @@ class SambandFilterTestCase(TestCase):
         params = {"name": "Nonexistent"}
         qs = self.filterset(params, models.Samband.objects.all()).qs
         self.assertEqual(qs.count(), 0)
+
+    def test_filter_by_length(self):
+        """Filter by span length range."""
+        samband = models.Samband.objects.get(name="Samband One")
+        samband.pop_a_geo_string = "59.9139, 10.7522"
+        samband.pop_b_geo_string = "60.3913, 5.3221"
+        samband.save()
+        params = {"length_km__gte": 300, "length_km__lte": 310}
+        qs = self.filterset(params, models.Samband.objects.all()).qs
+        self.assertEqual(list(qs), [samband])
@@ -1,8 +1,12 @@
 """Test samband forms."""
 
+from unittest import mock
+
+from django.forms import CharField
 from django.test import TestCase
 
 from praksis_nhn_nautobot import forms
+from praksis_nhn_nautobot.tests.fixtures import create_committed_sambands
 
 
 class SambandTest(TestCase):
@@ -31,3 +35,23 @@ class SambandTest(TestCase):
         form = forms.SambandForm(data={"description": "Development Testing"})
         self.assertFalse(form.is_valid())
         self.assertIn("This field is required.", form.errors["name"])
+
+
+class SambandFilterFormTest(TestCase):
+    """Test the Samband filter form choices."""
+
+    def setUp(self):
+        create_committed_sambands([{"location": location} for location in ["Oslo", "Bergen", "Oslo"]])
+
+    def test_choices(self):
+        """Choices are the distinct values, sorted after the empty choice."""
+        form = forms.SambandFilterForm()
+        self.assertEqual(form.fields["location"].choices, [("", "Any"), ("Bergen", "Bergen"), ("Oslo", "Oslo")])
+
+    def test_typeahead(self):
+        """Fields with more values than the limit become typeahead inputs that keep the selected value."""
+        with mock.patch.object(forms.SambandFilterForm, "max_choices", 1):
+            form = forms.SambandFilterForm(data={"location": "Oslo"})
+        self.assertIsInstance(form.fields["location"], CharField)
+        self.assertEqual(list(form.fields["location"].widget.choices), [("Oslo", "Oslo")])
+        self.assertTrue(form.is_valid())
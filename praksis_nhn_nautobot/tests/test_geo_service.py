@@ -0,0 +1,128 @@
+"""Unit tests for the geo service module."""
+
+import numpy as np
+from django.test import TestCase
+
+from praksis_nhn_nautobot.services.geo_service import (
+    MAX_ZOOM,
+    bounding_box,
+    calculate_distance,
+    cluster_cell_size,
+    grid_density,
+    haversine_distances,
+    parse_geo_coordinates,
+    parse_geo_coordinates_batch,
+    segments_intersect_bbox,
+)
+
+
+class ParseGeoCoordinatesTest(TestCase):
+    """Tests for the geo string parser."""
+
+    def test_formats(self):
+        """Decimal, hemisphere and DMS strings give the same coordinates."""
+        for geo_string in (
+            "59.9139, 10.7522",
+            "59.9139° N, 10.7522° E",
+            "10.7522° E, 59.9139° N",
+            "59°54'50.04\"N 10°45'07.92\"E",
+        ):
+            lat, lng = parse_geo_coordinates(geo_string)
+            self.assertAlmostEqual(lat, 59.9139, places=6, msg=geo_string)
+            self.assertAlmostEqual(lng, 10.7522, places=6, msg=geo_string)
+
+    def test_southern_and_western_hemispheres(self):
+        """Only the hemisphere letter makes a coordinate negative."""
+        self.assertEqual(parse_geo_coordinates("33.9° S, 70.6° W"), (-33.9, -70.6))
+        self.assertEqual(parse_geo_coordinates("-33.9, -70.6"), (-33.9, -70.6))
+
+    def test_trailing_altitude(self):
+        """An altitude after the coordinates is ignored."""
+        self.assertEqual(parse_geo_coordinates("59.9139,10.7522,100"), (59.9139, 10.7522))
+        self.assertEqual(parse_geo_coordinates("60.3927° N, 5.3245° E, 12.5 m"), (60.3927, 5.3245))
+
+    def test_invalid(self):
+        """Strings that are not coordinates give (None, None)."""
+        for geo_string in ("", None, "Oslo", "SOUTH 1, 2", "95, 10", "59°61'N, 10°E", "60° N, 5° N"):
+            self.assertEqual(parse_geo_coordinates(geo_string), (None, None), msg=geo_string)
+
+    def test_batch(self):
+        """The batch API keeps the input order."""
+        self.assertEqual(
+            parse_geo_coordinates_batch(["60, 5", "bad", "60, 5"]),
+            [(60.0, 5.0), (None, None), (60.0, 5.0)],
+        )
+
+
+class BoundingBoxTest(TestCase):
+    """Tests for bounding_box."""
+
+    def test_box_contains_circle_edge(self):
+        """Points exactly on the circle lie inside the box."""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(63.4305, 10.3951, 50)
+
+        self.assertAlmostEqual(calculate_distance(63.4305, 10.3951, max_lat, 10.3951), 50, places=3)
+        self.assertAlmostEqual(calculate_distance(63.4305, 10.3951, min_lat, 10.3951), 50, places=3)
+        self.assertLess(min_lng, 10.3951)
+        self.assertGreater(max_lng, 10.3951)
+        # The widest longitude of the circle is further north than the centre, but still in the box
+        self.assertGreater(calculate_distance(63.4305, 10.3951, 63.4305, max_lng), 50)
+
+    def test_box_near_pole_spans_all_longitudes(self):
+        """A circle reaching the pole covers every longitude."""
+        _, max_lat, min_lng, max_lng = bounding_box(89.9, 0, 50)
+        self.assertEqual(max_lat, 90.0)
+        self.assertEqual((min_lng, max_lng), (-180.0, 180.0))
+
+    def test_box_across_antimeridian_spans_all_longitudes(self):
+        """A circle crossing the antimeridian falls back to every longitude."""
+        _, _, min_lng, max_lng = bounding_box(0, 179.9, 50)
+        self.assertEqual((min_lng, max_lng), (-180.0, 180.0))
+
+
+class VectorizedDistanceTest(TestCase):
+    """Tests for the NumPy distance engine."""
+
+    def setUp(self):
+        self.b_lats = np.array([63.4305, 69.6492, 59.9139])
+        self.b_lngs = np.array([10.3951, 18.9553, 10.7522])
+
+    def test_matches_scalar_haversine(self):
+        """The vectorized distances equal the scalar calculation."""
+        distances = haversine_distances(59.9139, 10.7522, self.b_lats, self.b_lngs)
+        for lat, lng, distance in zip(self.b_lats, self.b_lngs, distances):
+            self.assertAlmostEqual(distance, calculate_distance(59.9139, 10.7522, lat, lng), places=6)
+
+
+class SegmentIntersectionTest(TestCase):
+    """Tests for the vectorized line/box check."""
+
+    def test_lines_touching_box(self):
+        """Lines crossing or ending in the box match, lines beside it and incomplete lines do not."""
+        # Crossing, ending inside, passing beside, missing an endpoint
+        a_lats = np.array([59.0, 60.5, 59.0, 60.5])
+        a_lngs = np.array([10.5, 10.5, 12.0, 10.5])
+        b_lats = np.array([62.0, 63.0, 62.0, np.nan])
+        b_lngs = np.array([10.5, 10.5, 12.0, np.nan])
+        touches = segments_intersect_bbox(a_lats, a_lngs, b_lats, b_lngs, 60, 61, 10, 11)
+        self.assertEqual(touches.tolist(), [True, True, False, False])
+
+
+class GridDensityTest(TestCase):
+    """Tests for the heatmap grid aggregation."""
+
+    def test_counts_and_weights(self):
+        """Points are counted and weighted per cell, missing weights count as zero."""
+        lats = np.array([59.1, 59.4, 60.2])
+        lngs = np.array([10.1, 10.8, 10.5])
+        cell_lats, cell_lngs, counts, totals = grid_density(lats, lngs, 1.0, 1.0, np.array([100, np.nan, 10]))
+        self.assertEqual(cell_lats.tolist(), [59.5, 60.5])
+        self.assertEqual(cell_lngs.tolist(), [10.5, 10.5])
+        self.assertEqual(counts.tolist(), [2, 1])
+        self.assertEqual(totals.tolist(), [100.0, 10.0])
+
+    def test_cluster_cell_size(self):
+        """Cells halve with each zoom level, and zoom levels outside the grid range are clamped."""
+        self.assertEqual(cluster_cell_size(6, 0)[1], cluster_cell_size(5, 0)[1] / 2)
+        self.assertEqual(cluster_cell_size(-2000, 60), cluster_cell_size(0, 60))
+        self.assertEqual(cluster_cell_size(5000, 60), cluster_cell_size(MAX_ZOOM, 60))
@@ -43,3 +43,37 @@ class SambandModelTest(TestCase):
         self.assertEqual(samband.status, "")
         self.assertEqual(samband.vendor, "")
         self.assertEqual(samband.transporttype, "")
+
+    def test_pop_coordinates_parsed_on_save(self):
+        """Test that the PoP geo strings are stored as numeric coordinates."""
+        self.samband.pop_a_geo_string = "60.3927° N, 5.3245° E"
+        self.samband.pop_b_geo_string = "59.9139, 10.7522"
+        self.samband.save()
+        self.samband.refresh_from_db()
+        self.assertAlmostEqual(self.samband.pop_a_latitude, 60.3927)
+        self.assertAlmostEqual(self.samband.pop_a_longitude, 5.3245)
+        self.assertAlmostEqual(self.samband.pop_b_latitude, 59.9139)
+        self.assertAlmostEqual(self.samband.pop_b_longitude, 10.7522)
+
+    def test_pop_coordinates_cleared_with_geo_string(self):
+        """Test that clearing a geo string also clears its coordinates."""
+        self.samband.pop_a_geo_string = "60.3927, 5.3245"
+        self.samband.save()
+        self.samband.pop_a_geo_string = ""
+        self.samband.save(update_fields=["pop_a_geo_string"])
+        self.samband.refresh_from_db()
+        self.assertIsNone(self.samband.pop_a_latitude)
+        self.assertIsNone(self.samband.pop_a_longitude)
+
+    def test_length_km_calculated_on_save(self):
+        """Test that the span length follows the PoP coordinates."""
+        self.samband.pop_a_geo_string = "59.9139, 10.7522"
+        self.samband.pop_b_geo_string = "60.3913, 5.3221"
+        self.samband.save()
+        self.samband.refresh_from_db()
+        self.assertAlmostEqual(self.samband.length_km, 305.1, delta=1)
+
+        self.samband.pop_b_geo_string = ""
+        self.samband.save(update_fields=["pop_b_geo_string"])
+        self.samband.refresh_from_db()
+        self.assertIsNone(self.samband.length_km)
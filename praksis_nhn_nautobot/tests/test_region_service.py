@@ -0,0 +1,84 @@
+"""Unit tests for the region service module."""
+
+import json
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from praksis_nhn_nautobot import filters
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.region_service import (
+    filter_by_polygons,
+    parse_polygon,
+    points_in_polygons,
+    regions_for_samband,
+)
+from praksis_nhn_nautobot.tests.fixtures import create_committed_sambands
+
+# Roughly southern Norway, as [longitude, latitude] positions
+SOUTH_NORWAY = {
+    "type": "Polygon",
+    "coordinates": [[[4.5, 57.5], [12.5, 57.5], [12.5, 62.0], [4.5, 62.0], [4.5, 57.5]]],
+}
+
+
+class PointInPolygonTest(TestCase):
+    """Tests for the vectorized point-in-polygon check."""
+
+    def test_polygon_with_hole(self):
+        """Points in the hole of a polygon are outside."""
+        polygons = parse_polygon(
+            {
+                "type": "Polygon",
+                "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10]], [[4, 4], [6, 4], [6, 6], [4, 6]]],
+            }
+        )
+        inside = points_in_polygons(np.array([2.0, 5.0, 11.0, np.nan]), np.array([2.0, 5.0, 5.0, 1.0]), polygons)
+        self.assertEqual(inside.tolist(), [True, False, False, False])
+
+    def test_parse_invalid(self):
+        """Geometries that are not polygons are rejected."""
+        for value in ("not json", json.dumps({"type": "Point", "coordinates": [10, 60]})):
+            with self.assertRaises(ValueError):
+                parse_polygon(value)
+
+
+@override_settings(PLUGINS_CONFIG={"praksis_nhn_nautobot": {"regions": {"Sør": SOUTH_NORWAY}}})
+class RegionFilterTest(TestCase):
+    """Tests for filtering sambands by polygon and region."""
+
+    def setUp(self):
+        self.oslo_bergen, self.trondheim_tromso = create_committed_sambands(
+            [
+                {
+                    "name": "Oslo - Bergen",
+                    "pop_a_geo_string": "59.9139, 10.7522",
+                    "pop_b_geo_string": "60.3913, 5.3221",
+                },
+                {
+                    "name": "Trondheim - Tromso",
+                    "pop_a_geo_string": "63.4305, 10.3951",
+                    "pop_b_geo_string": "69.6492, 18.9553",
+                },
+            ]
+        )
+
+    def test_filter_by_polygons(self):
+        """Connections with a PoP inside the polygon match."""
+        qs = filter_by_polygons(Samband.objects.all(), parse_polygon(SOUTH_NORWAY))
+        self.assertEqual(list(qs), [self.oslo_bergen])
+
+    def test_regions_for_samband(self):
+        """Region membership is looked up per samband."""
+        self.assertEqual(regions_for_samband(self.oslo_bergen), ["Sør"])
+        self.assertEqual(regions_for_samband(self.trondheim_tromso), [])
+
+    def test_filterset(self):
+        """The REST filterset accepts polygons and region names and rejects unknown regions."""
+        filterset = filters.SambandFilterSet({"polygon": json.dumps(SOUTH_NORWAY)}, Samband.objects.all())
+        self.assertEqual(list(filterset.qs), [self.oslo_bergen])
+
+        filterset = filters.SambandFilterSet({"region": "Sør"}, Samband.objects.all())
+        self.assertEqual(list(filterset.qs), [self.oslo_bergen])
+
+        self.assertFalse(filters.SambandFilterSet({"region": "Nowhere"}, Samband.objects.all()).is_valid())
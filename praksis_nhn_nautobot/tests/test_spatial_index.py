@@ -0,0 +1,127 @@
+"""Unit tests for the spatial index module."""
+
+from django.test import TestCase
+
+from praksis_nhn_nautobot.models import Samband
+from praksis_nhn_nautobot.services.geo_service import calculate_distance
+from praksis_nhn_nautobot.services.spatial_index import (
+    SambandSpatialIndex,
+    get_spatial_index,
+    lines_in_bbox_q,
+    nearest_sambands,
+    restrict_to_matches,
+)
+from praksis_nhn_nautobot.tests.fixtures import create_committed_sambands
+
+OSLO = (59.9139, 10.7522)
+BERGEN = (60.3913, 5.3221)
+TRONDHEIM = (63.4305, 10.3951)
+TROMSO = (69.6492, 18.9553)
+
+
+class SambandSpatialIndexTest(TestCase):
+    """Tests for SambandSpatialIndex."""
+
+    def setUp(self):
+        self.index = SambandSpatialIndex()
+        self.index.load(
+            [
+                ("oslo-bergen", *OSLO, *BERGEN),
+                ("trondheim-tromso", *TRONDHEIM, *TROMSO),
+                ("bergen-only", *BERGEN, None, None),
+                ("no-coordinates", None, None, None, None),
+            ],
+            version=1,
+        )
+
+    def test_load(self):
+        """Connections without coordinates are not indexed."""
+        self.assertEqual(len(self.index), 3)
+        self.assertNotIn("no-coordinates", self.index)
+
+    def test_within_radius(self):
+        """Connections match on either PoP and report the distance to the nearest one."""
+        result = self.index.within_radius(*BERGEN, 10)
+        self.assertEqual(set(result), {"oslo-bergen", "bergen-only"})
+        self.assertAlmostEqual(result["oslo-bergen"], 0.0)
+
+    def test_within_bbox(self):
+        """Connections with a PoP inside the box match."""
+        self.assertEqual(self.index.within_bbox(63, 64, 10, 11), {"trondheim-tromso"})
+
+    def test_lines_in_bbox(self):
+        """Lines crossing the box with both PoPs outside it match."""
+        self.assertEqual(self.index.within_bbox(66, 67, 12, 17), set())
+        self.assertEqual(self.index.lines_in_bbox(66, 67, 12, 17), {"trondheim-tromso"})
+
+        self.index.remove("trondheim-tromso")
+        self.assertEqual(self.index.lines_in_bbox(66, 67, 12, 17), set())
+
+    def test_lines_near_bbox(self):
+        """Lines whose bounding box overlaps the box are candidates, even when the line misses it."""
+        self.assertEqual(self.index.lines_near_bbox(68, 69, 11, 12), {"trondheim-tromso"})
+        self.assertEqual(self.index.lines_in_bbox(68, 69, 11, 12), set())
+
+    def test_nearest(self):
+        """Nearest connections are returned closest first."""
+        result = self.index.nearest(*OSLO, k=3)
+        self.assertEqual([pk for _, pk in result], ["oslo-bergen", "bergen-only", "trondheim-tromso"])
+        self.assertAlmostEqual(result[1][0], calculate_distance(*OSLO, *BERGEN))
+
+    def test_nearest_among(self):
+        """Only the given connections are ranked, unknown and unlocated ones are left out."""
+        result = self.index.nearest_among(*TROMSO, ["oslo-bergen", "trondheim-tromso", "no-coordinates", "gone"], k=5)
+        self.assertEqual([pk for _, pk in result], ["trondheim-tromso", "oslo-bergen"])
+        self.assertAlmostEqual(result[0][0], 0.0)
+
+    def test_update_and_remove(self):
+        """Moving and removing a connection is reflected in queries."""
+        self.index.update("bergen-only", *TROMSO, None, None)
+        self.assertEqual(set(self.index.within_radius(*TROMSO, 10)), {"trondheim-tromso", "bergen-only"})
+
+        self.index.remove("trondheim-tromso")
+        self.assertEqual(set(self.index.within_radius(*TROMSO, 10)), {"bergen-only"})
+
+
+class NearestSambandsTest(TestCase):
+    """Tests for nearest_sambands."""
+
+    def setUp(self):
+        create_committed_sambands(
+            [
+                {
+                    "name": name,
+                    "vendor": vendor,
+                    "pop_a_geo_string": "{}, {}".format(*point_a),
+                    "pop_b_geo_string": "{}, {}".format(*point_b),
+                }
+                for name, vendor, point_a, point_b in [
+                    ("Oslo - Bergen", "Telenor", OSLO, BERGEN),
+                    ("Trondheim - Tromso", "Telia", TRONDHEIM, TROMSO),
+                    ("Bergen - Trondheim", "Telia", BERGEN, TRONDHEIM),
+                ]
+            ]
+        )
+
+    def test_nearest_in_queryset(self):
+        """Only sambands in the queryset are returned, closest first."""
+        result = nearest_sambands(Samband.objects.filter(vendor="Telia"), *OSLO, k=2)
+        self.assertEqual([samband.name for _, samband in result], ["Bergen - Trondheim", "Trondheim - Tromso"])
+        self.assertAlmostEqual(result[0][0], calculate_distance(*OSLO, *BERGEN), places=6)
+
+    def test_max_distance(self):
+        """Sambands beyond the maximum distance are left out."""
+        result = nearest_sambands(Samband.objects.all(), *TROMSO, k=3, max_distance_km=100)
+        self.assertEqual([samband.name for _, samband in result], ["Trondheim - Tromso"])
+
+    def test_restrict_to_matches(self):
+        """The SQL candidates are narrowed to the index matches, from either side."""
+        box = (59, 61, 4, 12)
+        index = get_spatial_index()
+        candidates = index.lines_near_bbox(*box)
+        oslo_bergen = Samband.objects.get(name="Oslo - Bergen").pk
+        self.assertEqual(len(candidates), 2)
+
+        for matches in (set(), {oslo_bergen}, candidates):
+            sambands = restrict_to_matches(Samband.objects.all(), lines_in_bbox_q(*box), candidates, matches)
+            self.assertEqual(set(sambands.values_list("pk", flat=True)), matches)
@@ -0,0 +1,111 @@
+"""Unit tests for the sync service module."""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from praksis_nhn_nautobot.models import Samband, SambandChange
+from praksis_nhn_nautobot.services import sync_service
+from praksis_nhn_nautobot.services.cache_service import bump_dataset_version, get_dataset_version
+from praksis_nhn_nautobot.services.sync_service import (
+    current_sync_token,
+    get_changes,
+    make_sync_token,
+    parse_sync_token,
+    prune_changes,
+    record_change,
+    stamp_changes,
+)
+from praksis_nhn_nautobot.tests.fixtures import create_committed_sambands
+
+
+class SyncServiceTest(TestCase):
+    """Tests for get_changes and the recorded changes."""
+
+    def setUp(self):
+        self.oslo, self.bergen = create_committed_sambands([{"name": "Oslo"}, {"name": "Bergen"}], vendor="Telia")
+        self.since = parse_sync_token(current_sync_token())
+
+    def test_changes(self):
+        """Saved sambands are changed, and deleted ones or ones leaving the set are removed."""
+        deleted_pk = str(self.bergen.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bergen.delete()
+        self.assertTrue(SambandChange.objects.filter(samband_id=deleted_pk, deleted=True).exists())
+
+        changes = get_changes(Samband.objects.all(), self.since, 10)
+        self.assertEqual(list(changes["changed"]), [])
+        self.assertEqual(changes["removed"], [deleted_pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oslo.vendor = "Telenor"
+            self.oslo.save()
+        self.assertEqual(list(get_changes(Samband.objects.all(), self.since, 10)["changed"]), [self.oslo])
+        changes = get_changes(Samband.objects.filter(vendor="Telia"), self.since, 10)
+        self.assertEqual(set(changes["removed"]), {str(self.oslo.pk), deleted_pk})
+        self.assertFalse(changes["reset"])
+
+        # Nothing is left once the client has synced to the returned token
+        changes = get_changes(Samband.objects.all(), parse_sync_token(changes["sync_token"]), 10)
+        self.assertEqual(changes["removed"], [])
+
+    def test_unstamped_changes(self):
+        """Changes whose transaction has not stamped them yet are sent right away."""
+        self.oslo.vendor = "Telenor"
+        self.oslo.save()
+        self.assertTrue(SambandChange.objects.filter(samband_id=self.oslo.pk, version__isnull=True).exists())
+        self.assertEqual(list(get_changes(Samband.objects.all(), self.since, 10)["changed"]), [self.oslo])
+
+    def test_long_transaction(self):
+        """A change committed after a sync is sent even though it was made before it."""
+        self.oslo.vendor = "Telenor"
+        self.oslo.save()
+        change = SambandChange.objects.get(samband_id=self.oslo.pk, version__isnull=True)
+        # Another transaction commits and a client syncs past it first
+        bump_dataset_version()
+        since = parse_sync_token(current_sync_token())
+        stamp_changes([change.pk], bump_dataset_version())
+        self.assertEqual(list(get_changes(Samband.objects.all(), since, 10)["changed"]), [self.oslo])
+
+    def test_limit(self):
+        """Changes beyond the limit follow with the next sync token."""
+        for samband in (self.oslo, self.bergen):
+            with self.captureOnCommitCallbacks(execute=True):
+                samband.save()
+
+        changes = get_changes(Samband.objects.all(), self.since, 1)
+        self.assertTrue(changes["more"])
+        self.assertEqual(list(changes["changed"]), [self.oslo])
+
+        changes = get_changes(Samband.objects.all(), parse_sync_token(changes["sync_token"]), 1)
+        self.assertFalse(changes["more"])
+        self.assertEqual(list(changes["changed"]), [self.bergen])
+
+    def test_reset(self):
+        """A token older than the retention or ahead of the dataset version asks the client to reload everything."""
+        version, now = get_dataset_version(), timezone.now()
+        self.assertTrue(get_changes(Samband.objects.all(), (version, now - timedelta(days=365)), 10)["reset"])
+        self.assertTrue(get_changes(Samband.objects.all(), (version + 1, now), 10)["reset"])
+        self.assertFalse(get_changes(Samband.objects.all(), (version, now), 10)["reset"])
+
+    def test_prune(self):
+        """Changes are pruned once they are older than the retention, every PRUNE_INTERVAL recorded changes."""
+        SambandChange.objects.update(changed=timezone.now() - timedelta(days=365))
+        with mock.patch.object(sync_service, "prune_changes") as prune:
+            for _ in range(sync_service.PRUNE_INTERVAL):
+                record_change(self.oslo.pk)
+        prune.assert_called_once()
+
+        prune_changes()
+        self.assertEqual(SambandChange.objects.count(), sync_service.PRUNE_INTERVAL)
+
+    def test_parse_sync_token(self):
+        """Tokens hold the dataset version and when they were issued."""
+        version, issued = parse_sync_token(make_sync_token(42))
+        self.assertEqual(version, 42)
+        self.assertLess(abs(timezone.now() - issued), timedelta(seconds=5))
+        for value in ("yesterday", "2025-04-28T10:00:00+00:00", "42"):
+            with self.assertRaises(ValueError):
+                parse_sync_token(value)
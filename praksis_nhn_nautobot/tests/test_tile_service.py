@@ -0,0 +1,30 @@
+"""Unit tests for the tile service module."""
+
+from django.test import TestCase
+
+from praksis_nhn_nautobot.services.tile_service import is_valid_tile, tile_bounds, tile_for_point
+
+
+class TileServiceTest(TestCase):
+    """Tests for the tile helpers."""
+
+    def test_world_tile_bounds(self):
+        """The single zoom 0 tile covers the Web Mercator world."""
+        south, north, west, east = tile_bounds(0, 0, 0)
+        self.assertAlmostEqual(north, 85.0511, places=4)
+        self.assertAlmostEqual(south, -85.0511, places=4)
+        self.assertEqual((west, east), (-180, 180))
+
+    def test_tile_for_point_contains_point(self):
+        """The tile found for a point has the point inside its bounds."""
+        for z in (0, 5, 12):
+            x, y = tile_for_point(59.9139, 10.7522, z)
+            south, north, west, east = tile_bounds(z, x, y)
+            self.assertTrue(south <= 59.9139 <= north)
+            self.assertTrue(west <= 10.7522 <= east)
+
+    def test_is_valid_tile(self):
+        """Tiles outside the grid for their zoom level are rejected."""
+        self.assertTrue(is_valid_tile(2, 3, 3))
+        self.assertFalse(is_valid_tile(2, 4, 0))
+        self.assertFalse(is_valid_tile(-1, 0, 0))
@@ -0,0 +1,58 @@
+"""Unit tests for the timing service module."""
+
+from django.test import TestCase
+
+from praksis_nhn_nautobot.services.timing_service import (
+    PHASES,
+    RequestTimings,
+    begin_request,
+    end_request,
+    get_request_timings,
+    start_phase,
+    timed,
+)
+
+
+class TimingServiceTest(TestCase):
+    """Tests for RequestTimings and the request helpers."""
+
+    def test_outside_request(self):
+        """Timing outside a timed request does nothing."""
+        self.assertIsNone(get_request_timings())
+        with timed("geo"):
+            pass
+        start_phase("render")
+        self.assertIsNone(get_request_timings())
+
+    def test_timed(self):
+        """Time spent in timed blocks is added to the phase of the current request."""
+        timings, token = begin_request()
+        try:
+            self.assertIs(get_request_timings(), timings)
+            with timed("geo"):
+                pass
+            with timed("geo"):
+                pass
+        finally:
+            end_request(token)
+        self.assertIsNone(get_request_timings())
+        self.assertGreater(timings.durations["geo"], 0)
+        self.assertEqual(set(timings.durations), set(PHASES))
+
+    def test_open_phases(self):
+        """Phases still open when the request finishes are closed."""
+        timings = RequestTimings()
+        timings.start("render")
+        timings.stop("serialize")
+        total = timings.finish()
+        self.assertGreater(timings.durations["render"], 0)
+        self.assertEqual(timings.durations["serialize"], 0)
+        self.assertGreaterEqual(total, timings.durations["render"])
+
+    def test_queries(self):
+        """Queries run through the execute wrapper are counted and timed."""
+        timings = RequestTimings()
+        result = timings.execute_wrapper(lambda *args: "rows", "SELECT 1", (), False, {})
+        self.assertEqual(result, "rows")
+        self.assertEqual(timings.queries, 1)
+        self.assertGreaterEqual(timings.durations["db"], 0)
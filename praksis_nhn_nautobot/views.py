@@ -17,9 +17,9 @@ from nautobot.core.views import generic
 from praksis_nhn_nautobot import filters, forms, models, tables
 from praksis_nhn_nautobot.api import serializers
 from praksis_nhn_nautobot.api.serializers import SambandSerializer
+from praksis_nhn_nautobot.services.facet_service import get_facets
 from praksis_nhn_nautobot.services.graph_service import SambandGraphService
-
-from .models import Samband
+from praksis_nhn_nautobot.services.timing_service import start_phase, timed
 
 
 class SambandUIViewSet(NautobotUIViewSet):
@@ -229,8 +229,10 @@ class SambandGraphFocusView(generic.ObjectView):
         depth = int(request.GET.get("depth", 2))
 
         hierarchy_data = SambandGraphService.get_relations(instance, depth)
-        serialized_data = SambandSerializer(hierarchy_data, many=True, context={"request": self.request}).data
-        graph_data = SambandGraphService.create_network_graph(serialized_data)
+        with timed("serialize"):
+            serialized_data = SambandSerializer(hierarchy_data, many=True, context={"request": self.request}).data
+        with timed("graph"):
+            graph_data = SambandGraphService.create_network_graph(serialized_data)
 
         # Visualization options for focal view (hierarchical layout)
         options = {
@@ -271,6 +273,8 @@ class SambandGraphFocusView(generic.ObjectView):
         context["network_options"] = options
         context["depth"] = depth
 
+        # ObjectView renders the page after this returns
+        start_phase("render")
         return context
 
 
@@ -282,7 +286,8 @@ class SambandGraphView(generic.View):
     def get(self, request, *args, **kwargs):
         """Handle GET requests."""
         context = self.get_context_data(**kwargs)
-        return render(request, self.template_name, context)
+        with timed("render"):
+            return render(request, self.template_name, context)
     
     def get_queryset(self):
         """Use the filterset defined in filters.py to apply filtering."""
@@ -299,8 +304,10 @@ class SambandGraphView(generic.View):
         context = {}
         queryset = self.get_queryset()
 
-        serialized_data = SambandSerializer(queryset, many=True, context={"request": self.request}).data
-        graph_data = SambandGraphService.create_network_graph(serialized_data)
+        with timed("serialize"):
+            serialized_data = SambandSerializer(queryset, many=True, context={"request": self.request}).data
+        with timed("graph"):
+            graph_data = SambandGraphService.create_network_graph(serialized_data)
 
         # Visualization options
         options = {
@@ -355,27 +362,14 @@ class SambandMultipleMapView(TemplateView):
     template_name = "praksis_nhn_nautobot/samband_map_clientside.html"
 
     def get_filter_options(self):
-        """Get unique filter options for the map."""
-        # Get unique filter values
-        vendors = Samband.objects.values_list("vendor", flat=True).distinct().order_by("vendor")
-        statuses = Samband.objects.values_list("status", flat=True).distinct().order_by("status")
-        citylist = Samband.objects.values_list("location", flat=True).distinct().order_by("location")
-        location_types = Samband.objects.values_list("location_type", flat=True).distinct().order_by("location_type")
-        transport_types = Samband.objects.values_list("transporttype", flat=True).distinct().order_by("transporttype")
-
-        # Filter out None/empty values
-        vendors = [v for v in vendors if v]
-        statuses = [s for s in statuses if s]
-        citylist = [c for c in citylist if c]
-        location_types = [lt for lt in location_types if lt]
-        transport_types = [tt for tt in transport_types if tt]
-
+        """Get the filter options for the map, each a dict with the value and its number of connections."""
+        facets = get_facets()
         return {
-            "vendors": vendors,
-            "statuses": statuses,
-            "citylist": citylist,
-            "location_types": location_types,
-            "transport_types": transport_types,
+            "vendors": facets["vendor"],
+            "statuses": facets["status"],
+            "citylist": facets["location"],
+            "location_types": facets["location_type"],
+            "transport_types": facets["transporttype"],
         }
 
     def get_context_data(self, **kwargs):